@@ -0,0 +1,275 @@
+"""
+Stage level benchmarks of jumpcutter over deterministic media synthesized locally with ffmpeg lavfi sources.
+
+    python benchmark.py generate --folder build/bench
+    python benchmark.py run --folder build/bench --results results.json
+    python benchmark.py compare baseline.json results.json
+    python benchmark.py stretch
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+import numpy as np
+
+from editor.editor import Editor
+from editor.outputs import DirectVideoOutput
+from editor.time_stretch import TIME_STRETCH_BACKENDS, TIME_STRETCH_PHASEVOCODER, get_time_stretcher
+from parameters import InputParameter
+from utils import io_utils
+from utils.probe_utils import probe_media
+from utils.shell_utils import do_shell
+
+DURATIONS = {'1m': 60, '30m': 1800, '3h': 10800}
+# seconds of tone and seconds of the whole period of a burst.
+CUT_DENSITIES = {'sparse': (15, 20), 'dense': (1, 2)}
+RESOLUTIONS = {'360p': '640x360', '1080p': '1920x1080'}
+
+
+def get_input_name(duration, density, resolution):
+    return f'bench_{duration}_{density}_{resolution}.mp4'
+
+
+def generate(folder, durations, densities, resolutions):
+    os.makedirs(folder, exist_ok=True)
+    for duration in durations:
+        for density in densities:
+            for resolution in resolutions:
+                input_file = os.path.join(folder, get_input_name(duration, density, resolution))
+                if os.path.exists(input_file):
+                    continue
+
+                tone, period = CUT_DENSITIES[density]
+                do_shell(
+                    f'ffmpeg -hide_banner -v warning -y '
+                    f'-f lavfi -i "testsrc2=size={RESOLUTIONS[resolution]}:rate=30:duration={DURATIONS[duration]}" '
+                    f'-f lavfi -i "sine=frequency=440:sample_rate=44100:duration={DURATIONS[duration]},'
+                    f'volume=\'if(lt(mod(t,{period}),{tone}),1,0.001)\':eval=frame" '
+                    f'-c:v libx264 -preset ultrafast -pix_fmt yuv420p -c:a aac -shortest "{input_file}"'
+                )
+
+
+class StageTimer:
+    def __init__(self, input_name):
+        self.input_name = input_name
+        self.results = []
+
+    @staticmethod
+    def get_usage():
+        if not resource:
+            return time.process_time(), 0, 0
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return (usage.ru_utime + usage.ru_stime, children_usage.ru_utime + children_usage.ru_stime,
+                max(usage.ru_maxrss, children_usage.ru_maxrss))
+
+    def measure(self, stage, action, *args, **kwargs):
+        cpu_start, children_cpu_start, _ = self.get_usage()
+        wall_start = time.perf_counter()
+        result = action(*args, **kwargs)
+        wall_time = time.perf_counter() - wall_start
+        cpu_end, children_cpu_end, peak_rss = self.get_usage()
+
+        self.results.append({
+            'input': self.input_name,
+            'stage': stage,
+            'wall_time': wall_time,
+            'cpu_time': cpu_end - cpu_start,
+            'children_cpu_time': children_cpu_end - children_cpu_start,
+            # ru_maxrss is in KB on Linux, bytes on macOS. it's the peak of the process so far, not of the stage.
+            'peak_rss': peak_rss * (1 if sys.platform == 'darwin' else 1024),
+        })
+        print(f"[Benchmark] {self.input_name} {stage}: {wall_time:.3f}s")
+        return result
+
+
+def run_input(input_file, work_folder, silent_speed):
+    timer = StageTimer(os.path.basename(input_file))
+    # the benchmark options are not arguments of InputParameter, so the command line is not parsed.
+    parameter = InputParameter(argv=[], input_file=input_file,
+                               output_file=os.path.join(work_folder, f'edited_{os.path.basename(input_file)}'),
+                               temp_folder=os.path.join(work_folder, 'temp'),
+                               silent_speed=silent_speed, analysis_cache=0)
+
+    io_utils.create_path(parameter.temp_folder)
+    try:
+        timer.measure('probe', probe_media, input_file)
+        timer.measure('probe_parameters', parameter.probe_media)
+        timer.measure('extract_audio', parameter.read_audio)
+
+        editor = Editor(parameter)
+
+        def get_loud_frame():
+            parameter.analyze_audio()
+            return editor.get_loud_frame()
+
+        has_loud_audio = timer.measure('get_loud_frame', get_loud_frame)
+        edit_plan = timer.measure('get_edit_plan', editor.get_edit_plan, has_loud_audio)
+
+        def time_stretch():
+            audio_data = parameter.load_audio_data()
+            sample_starts, sample_ends = edit_plan.get_sample_ranges(parameter.samples_per_frame)
+            for sample_start, sample_end, speed in zip(sample_starts.tolist(), sample_ends.tolist(),
+                                                       edit_plan.speeds.tolist()):
+                editor.render_audio(audio_data[sample_start:sample_end], speed)
+
+        timer.measure('time_stretch', time_stretch)
+
+        parameter.detect_sections()
+        output = DirectVideoOutput(parameter=parameter)
+
+        def write_filter_script():
+            editor.render_edit_plan(output, edit_plan)
+            output.write_filter_script(f"{parameter.temp_folder}/filter_script.txt",
+                                       output.get_video_filter(output.video_edit_config), output.get_audio_filter())
+
+        timer.measure('filter_script', write_filter_script)
+        timer.measure('encode', output.render, '')
+    finally:
+        io_utils.delete_path(parameter.temp_folder)
+    return timer.results
+
+
+def run(folder, results_file, silent_speed, names=None):
+    input_files = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                         if name.startswith('bench_') and name.endswith('.mp4'))
+    if names:
+        input_files = [input_file for input_file in input_files if any(name in input_file for name in names)]
+
+    work_folder = os.path.join(folder, 'work')
+    os.makedirs(work_folder, exist_ok=True)
+    results = []
+    for input_file in input_files:
+        results.extend(run_input(input_file, work_folder, silent_speed))
+
+    report = {
+        'created': datetime.datetime.now().isoformat(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'silent_speed': silent_speed,
+        'results': results,
+    }
+    with open(results_file, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results: {results_file}")
+
+
+def compare(baseline_file, results_file, tolerance, min_time=0.05):
+    with open(baseline_file, 'r', encoding='utf-8') as file:
+        baseline = {(result['input'], result['stage']): result for result in json.load(file)['results']}
+    with open(results_file, 'r', encoding='utf-8') as file:
+        results = json.load(file)['results']
+
+    regressions = []
+    print(f"{'input':40s} {'stage':18s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for result in results:
+        baseline_result = baseline.get((result['input'], result['stage']))
+        if not baseline_result:
+            continue
+        change = result['wall_time'] / baseline_result['wall_time'] - 1 if baseline_result['wall_time'] else 0
+        # stages this short are dominated by noise.
+        regressed = change > tolerance and result['wall_time'] - baseline_result['wall_time'] > min_time
+        marker = ' !' if regressed else ''
+        print(f"{result['input']:40s} {result['stage']:18s} {baseline_result['wall_time']:9.3f}s "
+              f"{result['wall_time']:9.3f}s {change * 100:+7.1f}%{marker}")
+        if regressed:
+            regressions.append(result)
+
+    print(f"{len(regressions)} stages regressed by more than {tolerance * 100:.0f}%.")
+    return not regressions
+
+
+def synthesize_audio(duration, sample_rate=44100):
+    # tone bursts over noise, roughly the spectrum and dynamics of speech.
+    rng = np.random.default_rng(0)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    envelope = (np.sin(2 * np.pi * 3 * t) > 0) * 0.8 + 0.05
+    tone = np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 440 * t) + 0.25 * np.sin(2 * np.pi * 1250 * t)
+    mono = envelope * tone / 1.75 + 0.02 * rng.standard_normal(t.shape[0])
+    return (np.stack([mono, np.roll(mono, 7)], axis=1) * 20000).astype(np.int16)
+
+
+def run_stretch(duration, segment_duration, speeds, results_file=None, sample_rate=44100):
+    audio_data = synthesize_audio(duration, sample_rate)
+    segment_length = int(segment_duration * sample_rate)
+    results = []
+    print(f"{'backend':14s} {'speed':>6s} {'audio s/CPU s':>14s} {'vs phasevocoder':>16s}")
+    for speed in speeds:
+        baseline = None
+        for backend in TIME_STRETCH_BACKENDS:
+            stretcher = get_time_stretcher(backend)
+            cpu_start = time.process_time()
+            for start in range(0, audio_data.shape[0], segment_length):
+                stretcher.stretch(audio_data[start:start + segment_length], speed)
+            cpu_time = time.process_time() - cpu_start
+            throughput = duration / cpu_time if cpu_time else float('inf')
+            if backend == TIME_STRETCH_PHASEVOCODER:
+                baseline = throughput
+            results.append({'backend': backend, 'speed': speed, 'cpu_time': cpu_time, 'throughput': throughput})
+            print(f"{backend:14s} {speed:6g} {throughput:14.1f} {throughput / baseline:15.1f}x")
+
+    if results_file:
+        with open(results_file, 'w', encoding='utf-8') as file:
+            json.dump({'duration': duration, 'segment_duration': segment_duration, 'results': results}, file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stage level benchmarks of jumpcutter.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help='synthesize the benchmark inputs.')
+    generate_parser.add_argument('--folder', type=str, default='build/bench')
+    generate_parser.add_argument('--durations', type=str, default=','.join(DURATIONS),
+                                 help=f'comma separated durations of {list(DURATIONS)}.')
+    generate_parser.add_argument('--densities', type=str, default=','.join(CUT_DENSITIES),
+                                 help=f'comma separated cut densities of {list(CUT_DENSITIES)}.')
+    generate_parser.add_argument('--resolutions', type=str, default=','.join(RESOLUTIONS),
+                                 help=f'comma separated resolutions of {list(RESOLUTIONS)}.')
+
+    run_parser = commands.add_parser('run', help='time every stage over the generated inputs.')
+    run_parser.add_argument('--folder', type=str, default='build/bench')
+    run_parser.add_argument('--results', type=str, default='benchmark_results.json')
+    run_parser.add_argument('--silent_speed', type=float, default=5,
+                            help='a finite speed, so the time stretching stage does real work.')
+    run_parser.add_argument('--inputs', type=str, help='comma separated name filters of the inputs.')
+
+    compare_parser = commands.add_parser('compare', help='compare two results files.')
+    compare_parser.add_argument('baseline', type=str)
+    compare_parser.add_argument('results', type=str)
+    compare_parser.add_argument('--tolerance', type=float, default=0.1,
+                                help='the relative wall time increase considered a regression.')
+    compare_parser.add_argument('--min_time', type=float, default=0.05,
+                                help='wall time increases in seconds below this are never regressions.')
+
+    stretch_parser = commands.add_parser('stretch', help='the throughput of every time stretch backend.')
+    stretch_parser.add_argument('--duration', type=float, default=60, help='seconds of synthesized audio.')
+    stretch_parser.add_argument('--segment_duration', type=float, default=2,
+                                help='the audio is stretched in segments of this many seconds, like edit points.')
+    stretch_parser.add_argument('--speeds', type=str, default='1.5,3,8')
+    stretch_parser.add_argument('--results', type=str)
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        generate(args.folder, args.durations.split(','), args.densities.split(','), args.resolutions.split(','))
+    elif args.command == 'run':
+        run(args.folder, args.results, args.silent_speed, args.inputs.split(',') if args.inputs else None)
+    elif args.command == 'stretch':
+        run_stretch(args.duration, args.segment_duration, [float(speed) for speed in args.speeds.split(',')],
+                    args.results)
+    elif not compare(args.baseline, args.results, args.tolerance, args.min_time):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import numpy as np
+
+from editor.edit_point import EditPoint
+
+
+class EditPlan:
+    """
+    The segments of an edit as numpy columns: the input frames [start_frame, end_frame) of every segment, whether it's
+    sounded, its speed, and once the audio lengths are known, the output frames [output_start_frame, output_end_frame).
+    """
+
+    def __init__(self, start_frames, end_frames, should_keep, speeds):
+        self.start_frames = np.asarray(start_frames, dtype=np.int64)
+        self.end_frames = np.asarray(end_frames, dtype=np.int64)
+        self.should_keep = np.asarray(should_keep, dtype=bool)
+        self.speeds = np.asarray(speeds, dtype=np.float64)
+        self.output_start_frames = None
+        self.output_end_frames = None
+
+    @staticmethod
+    def from_runs(boundaries, should_keep, new_speed):
+        # new_speed is [silent speed, sounded speed], like InputParameter.new_speed.
+        should_keep = np.asarray(should_keep).astype(bool)
+        return EditPlan(boundaries[:-1], boundaries[1:], should_keep, np.where(should_keep, new_speed[1], new_speed[0]))
+
+    def __len__(self):
+        return self.start_frames.shape[0]
+
+    def __iter__(self):
+        for start_frame, end_frame, should_keep in zip(self.start_frames.tolist(), self.end_frames.tolist(),
+                                                       self.should_keep.tolist()):
+            yield EditPoint(start_frame, end_frame, should_keep)
+
+    def get_sample_ranges(self, samples_per_frame):
+        # the audio samples [start, end) of every segment, truncated like int(frame * samples_per_frame).
+        return ((self.start_frames * samples_per_frame).astype(np.int64),
+                (self.end_frames * samples_per_frame).astype(np.int64))
+
+    def get_stretched_lengths(self, samples_per_frame, sample_count):
+        # the audio length of every segment after time stretching, without rendering it.
+        sample_starts, sample_ends = self.get_sample_ranges(samples_per_frame)
+        sample_lengths = np.minimum(sample_ends, sample_count) - sample_starts
+        return np.maximum(0, (sample_lengths / self.speeds).astype(np.int64))
+
+    def set_output_lengths(self, output_lengths, samples_per_frame, output_start=0):
+        """
+        Places the segments one after another in the output, given their audio lengths in samples.
+        output_start is the count of the output samples before the first segment, when an edit is planned in batches.
+        Returns the count of the output audio samples.
+        """
+        output_ends = output_start + np.cumsum(np.asarray(output_lengths, dtype=np.int64))
+        output_starts = output_ends - output_lengths
+        self.output_start_frames = np.ceil(output_starts / samples_per_frame).astype(np.int64)
+        self.output_end_frames = np.ceil(output_ends / samples_per_frame).astype(np.int64)
+        return int(output_ends[-1]) if output_ends.shape[0] else output_start
+
+    @property
+    def output_frame_counts(self):
+        return self.output_end_frames - self.output_start_frames
+
+    @property
+    def is_removed(self):
+        # segments shorter than 2 output frames are cut off, there is no frame to hold motion events.
+        return self.output_frame_counts <= 1
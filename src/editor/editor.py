@@ -1,13 +1,24 @@
 import math
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
-from audiotsm import phasevocoder
-from audiotsm.io.array import ArrayReader, ArrayWriter
 
-from editor.edit_point import EditPoint
-from editor.outputs import EdlOutput, DirectVideoOutput
-from parameters import InputParameter, get_max_volume
+from editor.edit_plan import EditPlan
+from editor.loudness import get_frame_peaks, dilate_frames, get_runs
+from editor.outputs import AudioOutput, EdlOutput, DirectVideoOutput
+from editor.sweep import sweep, suggest_threshold, print_sweep_results
+from editor.time_stretch import TIME_STRETCH_PHASEVOCODER, TIME_STRETCH_RESAMPLE, get_time_stretcher
+from parameters import InputParameter
+from utils import profile_utils
+
+# the count of the segments stretched ahead of the output, per stretching thread.
+STRETCH_AHEAD_FACTOR = 4
+
+
+def get_stretched_length(sample_count, speed):
+    return max(0, int(sample_count / speed))
 
 
 class Editor:
@@ -15,47 +26,44 @@ class Editor:
     def __init__(self, parameter: InputParameter):
         self.parameter = parameter
         self.last_progress = 0
+        self.frame_peaks = None
+        # the time stretchers keep no state between chunks, the stretching threads share them.
+        self.time_stretchers = {}
+
+    def get_frame_peaks(self):
+        # the raw per-frame peak envelope, reusable by any stage that needs the loudness of frames.
+        if self.frame_peaks is None:
+            # streamed audio comes with its envelope already computed.
+            self.frame_peaks = self.parameter.frame_peaks
+        if self.frame_peaks is None:
+            self.frame_peaks = get_frame_peaks(self.parameter.audio_data, self.parameter.samples_per_frame,
+                                               self.parameter.audio_frame_count)
+        return self.frame_peaks
 
     def get_loud_frame(self):
-        has_loud_audio = np.zeros(self.parameter.audio_frame_count)
+        frame_volumes = self.get_frame_peaks() / self.parameter.max_audio_volume
+        has_loud_audio = (frame_volumes >= self.parameter.silent_threshold).astype(np.float64)
 
         # keep start
-        for i in range(0, self.parameter.keep_frames_from_start):
-            has_loud_audio[i] = 1
-
-        # check content
-        frames_count_to_cut = self.parameter.audio_frame_count - self.parameter.keep_frames_from_end
-        for i in range(self.parameter.keep_frames_from_start, frames_count_to_cut):
-            start = int(i * self.parameter.samples_per_frame)
-            end = min(int((i + 1) * self.parameter.samples_per_frame), self.parameter.audio_sample_count)
-            audio_chunks = self.parameter.audio_data[start:end]
-            max_chunks_volume = float(get_max_volume(audio_chunks)) / self.parameter.max_audio_volume
-            if max_chunks_volume >= self.parameter.silent_threshold:
-                has_loud_audio[i] = 1
+        has_loud_audio[:max(0, int(self.parameter.keep_frames_from_start))] = 1
 
         # keep end
-        for i in range(frames_count_to_cut, self.parameter.audio_frame_count):
-            has_loud_audio[i] = 1
+        frames_count_to_cut = self.parameter.audio_frame_count - int(self.parameter.keep_frames_from_end)
+        has_loud_audio[max(0, frames_count_to_cut):] = 1
 
         return has_loud_audio
 
-    def get_edit_points(self, has_loud_audio):
-        edit_points = [EditPoint(0, 0, 0)]
-        should_include_frame = np.zeros(self.parameter.audio_frame_count)
-        for i in range(self.parameter.audio_frame_count):
-            start = int(max(0, i - self.parameter.frame_margin))
-            end = int(min(self.parameter.audio_frame_count, i + 1 + self.parameter.frame_margin))
-            should_include_frame[i] = np.max(has_loud_audio[start:end])
-            if i >= 1 and should_include_frame[i] != should_include_frame[i - 1]:  # Did we flip?
-                edit_points.append(EditPoint(edit_points[-1].end_frame, i, should_include_frame[i - 1]))
-
-        edit_points.append(EditPoint(edit_points[-1].end_frame, self.parameter.audio_frame_count,
-                                     should_include_frame[self.parameter.audio_frame_count - 1]))
-        return edit_points[1:]
+    def get_edit_plan(self, has_loud_audio):
+        should_include_frame = dilate_frames(has_loud_audio, self.parameter.frame_margin)
+        boundaries, should_keep = get_runs(should_include_frame)
+        return EditPlan.from_runs(boundaries, should_keep, self.parameter.new_speed)
 
     def get_output(self):
-        return EdlOutput(parameter=self.parameter) \
-            if self.parameter.output_type == 'edl' else DirectVideoOutput(parameter=self.parameter)
+        if self.parameter.output_type == 'edl':
+            return EdlOutput(parameter=self.parameter)
+        if self.parameter.audio_only:
+            return AudioOutput(parameter=self.parameter)
+        return DirectVideoOutput(parameter=self.parameter)
 
     def fade_out_silence(self, audio_data):
         fade_mask = np.arange(self.parameter.audio_fade_envelope_size) / self.parameter.audio_fade_envelope_size
@@ -63,49 +71,125 @@ class Editor:
         audio_data[:self.parameter.audio_fade_envelope_size] *= mask
         audio_data[- self.parameter.audio_fade_envelope_size:] *= 1 - mask
 
+    def get_time_stretch_backend(self, should_keep, speed):
+        if self.parameter.resample_speed and speed >= self.parameter.resample_speed:
+            return TIME_STRETCH_RESAMPLE
+        return self.parameter.time_stretch[int(should_keep)]
+
+    def get_time_stretcher(self, backend):
+        if backend not in self.time_stretchers:
+            self.time_stretchers.setdefault(backend, get_time_stretcher(backend))
+        return self.time_stretchers[backend]
+
+    def render_audio(self, audio_chunk, speed, backend=TIME_STRETCH_PHASEVOCODER):
+        altered_audio_data_length = get_stretched_length(audio_chunk.shape[0], speed)
+        if altered_audio_data_length < self.parameter.audio_fade_envelope_size:
+            # audio is less than 0.01 sec, let's just remove it. it's always the case for jumpcutting speeds.
+            return np.zeros((altered_audio_data_length, audio_chunk.shape[1]), dtype=np.float32)
+
+        if speed == 1:
+            altered_audio_data = audio_chunk.astype(np.float32)
+        else:
+            altered_audio_data = self.get_time_stretcher(backend).stretch(audio_chunk, speed)
+
+        if altered_audio_data.shape[0] < self.parameter.audio_fade_envelope_size:
+            altered_audio_data[:] = 0
+        else:
+            self.fade_out_silence(altered_audio_data)
+        return altered_audio_data
+
+    def render_segment(self, audio_data, segment):
+        sample_start, sample_end, speed, should_keep = segment
+        return self.render_audio(audio_data[sample_start:sample_end], speed,
+                                 self.get_time_stretch_backend(should_keep, speed))
+
+    def render_segments(self, audio_data, segments):
+        # the segments are stretched independently by a pool of threads, and yielded in order.
+        workers = self.parameter.stretch_workers
+        if workers <= 1:
+            for segment in segments:
+                yield self.render_segment(audio_data, segment)
+            return
+
+        # only a few segments are stretched ahead, so the pending results stay small.
+        render_segment = profile_utils.propagate(self.render_segment)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = deque()
+            for segment in segments:
+                futures.append(executor.submit(render_segment, audio_data, segment))
+                if len(futures) >= workers * STRETCH_AHEAD_FACTOR:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+
+    def render_edit_plan(self, output, edit_plan):
+        # returns the count of the output audio samples.
+        output.plan_edit(edit_plan)
+        if output.needs_audio:
+            audio_data = self.parameter.load_audio_data()
+            sample_starts, sample_ends = edit_plan.get_sample_ranges(self.parameter.samples_per_frame)
+            output.allocate_audio(int(np.sum(edit_plan.get_stretched_lengths(self.parameter.samples_per_frame,
+                                                                             self.parameter.audio_sample_count))))
+            output_lengths = np.zeros(len(edit_plan), dtype=np.int64)
+            segments = zip(sample_starts.tolist(), sample_ends.tolist(), edit_plan.speeds.tolist(),
+                           edit_plan.should_keep.tolist())
+            for i, (altered_audio_data, end_frame) in enumerate(zip(
+                    self.render_segments(audio_data, segments), edit_plan.end_frames.tolist())):
+                output_lengths[i] = altered_audio_data.shape[0]
+                output.apply_audio(altered_audio_data)
+                self.print_progress(end_frame, self.parameter.audio_frame_count)
+        else:
+            # the output only consumes positions, compute them from the segment lengths and speeds.
+            output_lengths = edit_plan.get_stretched_lengths(self.parameter.samples_per_frame,
+                                                             self.parameter.audio_sample_count)
+
+        output_sample_count = edit_plan.set_output_lengths(output_lengths, self.parameter.samples_per_frame)
+        output.apply_edit_plan(edit_plan)
+        return output_sample_count
+
     def execute(self):
+        self.parameter.report_progress('edit')
         # get values of audio frames, 0 for silence, 1 for loudness.
-        has_loud_audio = self.get_loud_frame()
+        with profile_utils.stage('get_loud_frame', python=True):
+            has_loud_audio = self.get_loud_frame()
         # get edit points of silence and loudness.
-        edit_points = self.get_edit_points(has_loud_audio)
+        with profile_utils.stage('get_edit_plan', python=True):
+            edit_plan = self.get_edit_plan(has_loud_audio)
 
-        start_frame = 0
         output = self.get_output()
-        for edit_point in edit_points:
-            audio_chunk = self.parameter.audio_data[
-                          int(edit_point.start_frame * self.parameter.samples_per_frame):
-                          int(edit_point.end_frame * self.parameter.samples_per_frame)
-                          ]
-
-            # need channels * frames, transpose data first.
-            reader = ArrayReader(np.transpose(audio_chunk))
-            writer = ArrayWriter(reader.channels)
-            tsm = phasevocoder(reader.channels, speed=self.parameter.new_speed[int(edit_point.should_keep)])
-            tsm.run(reader, writer)
-            altered_audio_data = np.transpose(writer.data)
-
-            altered_audio_data_length = altered_audio_data.shape[0]
-            if altered_audio_data_length < self.parameter.audio_fade_envelope_size:
-                altered_audio_data[:] = 0  # audio is less than 0.01 sec, let's just remove it.
-            else:
-                self.fade_out_silence(altered_audio_data)
-            end_frame = start_frame + altered_audio_data_length
-
-            start_output_frame = int(math.ceil(start_frame / self.parameter.samples_per_frame))
-            end_output_frame = int(math.ceil(end_frame / self.parameter.samples_per_frame))
-
-            output.apply_edit_point(edit_point, altered_audio_data, start_output_frame, end_output_frame)
-            self.print_progress(edit_point.end_frame, self.parameter.audio_frame_count)
-
-            start_frame = end_frame
-
-        last_output_frame = math.ceil(start_frame / self.parameter.samples_per_frame)
+        # the time stretching of the audio, when the output consumes it.
+        with profile_utils.stage('render_edit_plan', python=True):
+            output_sample_count = self.render_edit_plan(output, edit_plan)
+
+        last_output_frame = math.ceil(output_sample_count / self.parameter.samples_per_frame)
         print(f"Frames to be kept: {last_output_frame}/{self.parameter.audio_frame_count}, "
               f"{100 - last_output_frame * 100.0 / self.parameter.audio_frame_count:.1f}% removed")
 
-        output.close()
+        self.parameter.report_progress('render')
+        with profile_utils.stage('output_close'):
+            output.close()
+
+    def sweep(self, thresholds=None, frame_margins=None):
+        # analysis only, evaluates many settings over the envelope without rendering anything.
+        frame_volumes = self.get_frame_peaks() / self.parameter.max_audio_volume
+        suggested_threshold = suggest_threshold(frame_volumes)
+
+        thresholds = thresholds or self.parameter.sweep_thresholds or sorted({
+            self.parameter.silent_threshold,
+            *(min(1.0, suggested_threshold * scale) for scale in [0.25, 0.5, 1, 2, 4])
+        })
+        frame_margins = frame_margins or self.parameter.sweep_margins or [0, 1, 2, 3, 5]
+        with profile_utils.stage('sweep', python=True):
+            results = sweep(frame_volumes, thresholds, frame_margins, self.parameter.frame_rate,
+                            self.parameter.keep_frames_from_start, self.parameter.keep_frames_from_end,
+                            self.parameter.new_speed)
+
+        print_sweep_results(results)
+        print(f"Suggested silent threshold: {suggested_threshold:.4f}")
+        return results
 
     def print_progress(self, current, total):
+        self.parameter.report_progress('edit', current / total)
         progress = current * 100 / total
         if current == total:
             self.last_progress = progress
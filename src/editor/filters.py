@@ -0,0 +1,179 @@
+import numpy as np
+
+CUT_BACKEND_EXPRESSION = 'expression'
+CUT_BACKEND_TREE = 'tree'
+CUT_BACKENDS = [CUT_BACKEND_TREE, CUT_BACKEND_EXPRESSION]
+
+
+def get_between_expression(variable, interval):
+    return f"between({variable}, {interval[0]}, {interval[1]})"
+
+
+def get_sum_expression(variable, intervals):
+    # ffmpeg evaluates every term for every frame, the cost grows with the count of intervals.
+    return "+".join(get_between_expression(variable, interval) for interval in intervals)
+
+
+def get_tree_expression(variable, intervals, low=0, high=None):
+    # a binary search over the sorted intervals. ffmpeg only evaluates the taken branch of if(),
+    # so every frame costs O(log(intervals)) comparisons.
+    if high is None:
+        high = len(intervals)
+    if high - low == 1:
+        return get_between_expression(variable, intervals[low])
+
+    middle = (low + high) // 2
+    return (f"if(lt({variable}, {intervals[middle][0]}), "
+            f"{get_tree_expression(variable, intervals, low, middle)}, "
+            f"{get_tree_expression(variable, intervals, middle, high)})")
+
+
+def get_removal_expression(variable, intervals, backend=CUT_BACKEND_TREE):
+    """
+    Returns an expression which is non-zero when the variable falls into any of the closed intervals.
+    The intervals must be sorted and disjoint.
+    """
+    if not intervals:
+        return "0"
+    if backend == CUT_BACKEND_EXPRESSION:
+        return get_sum_expression(variable, intervals)
+    if backend == CUT_BACKEND_TREE:
+        return get_tree_expression(variable, intervals)
+    raise ValueError(f"Unknown cut backend: {backend}")
+
+
+def split_chunks(intervals, frame_count, chunk_count):
+    """
+    Splits the frames [0, frame_count) into at most chunk_count ranges holding balanced counts of kept frames.
+    The ranges only start right after a removed interval, so no interval is split.
+    Returns (start, end, the intervals of the range relative to its start, kept frames before the range) tuples.
+    """
+    if not intervals or chunk_count <= 1:
+        return [(0, frame_count, list(intervals), 0)]
+
+    interval_starts = np.array([interval[0] for interval in intervals])
+    interval_ends = np.array([interval[1] for interval in intervals])
+    boundaries = interval_ends + 1
+    kept_before = boundaries - np.cumsum(interval_ends - interval_starts + 1)
+
+    available = boundaries < frame_count
+    boundaries, kept_before = boundaries[available], kept_before[available]
+    total_kept_count = frame_count - int(np.sum(interval_ends - interval_starts + 1))
+    targets = total_kept_count * np.arange(1, chunk_count) / chunk_count
+    selected = np.unique(np.searchsorted(kept_before, targets))
+    selected = selected[selected < boundaries.shape[0]]
+
+    chunk_starts = [0] + boundaries[selected].tolist()
+    chunk_ends = chunk_starts[1:] + [frame_count]
+    chunk_offsets = [0] + kept_before[selected].tolist()
+    first_intervals = np.searchsorted(interval_starts, chunk_starts).tolist() + [len(intervals)]
+
+    return [
+        (start, end, [(a - start, b - start) for a, b in intervals[first_intervals[i]:first_intervals[i + 1]]], offset)
+        for i, (start, end, offset) in enumerate(zip(chunk_starts, chunk_ends, chunk_offsets))
+    ]
+
+
+def split_fixed_chunks(intervals, frame_count, chunk_frame_count):
+    """
+    Splits the frames [0, frame_count) into ranges of chunk_frame_count frames, the intervals crossing a range end are
+    split too. A range only depends on the intervals within it, so it stays the same as long as its cuts do.
+    Returns the same tuples as split_chunks, ranges without kept frames are left out.
+    """
+    interval_starts = np.array([interval[0] for interval in intervals], dtype=np.int64)
+    interval_ends = np.array([interval[1] for interval in intervals], dtype=np.int64)
+
+    chunks = []
+    kept_before = 0
+    for start in range(0, frame_count, chunk_frame_count):
+        end = min(start + chunk_frame_count, frame_count)
+        first, last = np.searchsorted(interval_ends, start), np.searchsorted(interval_starts, end)
+        starts = np.maximum(interval_starts[first:last], start) - start
+        ends = np.minimum(interval_ends[first:last], end - 1) - start
+        kept_count = end - start - int(np.sum(ends - starts + 1))
+        if kept_count > 0:
+            chunks.append((start, end, list(zip(starts.tolist(), ends.tolist())), kept_before))
+        kept_before += kept_count
+    return chunks
+
+
+def get_kept_spans(intervals, frame_count):
+    # the frames [start, end) between the sorted closed removed intervals.
+    spans = []
+    kept_start = 0
+    for start, end in intervals:
+        if start > kept_start:
+            spans.append((kept_start, min(start, frame_count)))
+        kept_start = max(kept_start, end + 1)
+    if kept_start < frame_count:
+        spans.append((kept_start, frame_count))
+    return [(start, end) for start, end in spans if end > start]
+
+
+def split_smart_pieces(intervals, frame_count, keyframes, min_copy_frame_count):
+    """
+    Splits the kept frames into the pieces of a smart render, as (start, end, whether it's copied) tuples.
+    The whole GOPs of a kept span are copied, the partial GOPs at its ends are re-encoded. Spans without
+    min_copy_frame_count frames of whole GOPs are re-encoded as a whole.
+    """
+    # the last GOP ends with the input.
+    keyframes = np.unique(np.append(np.minimum(np.asarray(keyframes, dtype=np.int64), frame_count), frame_count))
+    pieces = []
+    for start, end in get_kept_spans(intervals, frame_count):
+        # the first key frame in the span, and the last one, where the copied GOPs end.
+        first, last = np.searchsorted(keyframes, start), np.searchsorted(keyframes, end, side='right') - 1
+        copy_start = int(keyframes[first]) if first < keyframes.shape[0] else end
+        copy_end = int(keyframes[last]) if last >= 0 else start
+        if copy_end - copy_start < min_copy_frame_count:
+            pieces.append((start, end, False))
+            continue
+        if copy_start > start:
+            pieces.append((start, copy_start, False))
+        pieces.append((copy_start, copy_end, True))
+        if end > copy_end:
+            pieces.append((copy_end, end, False))
+    return pieces
+
+
+def get_line_expression(variable, offset, scale):
+    if scale == 1:
+        return f"({variable}{offset:+})"
+    return f"({offset}+{variable}*{scale})"
+
+
+def get_retime_expression(variable, starts, output_starts, scales):
+    """
+    Returns a piecewise linear expression, which maps the variable in the piece from starts[i] to
+    output_starts[i] + (variable - starts[i]) * scales[i]. The starts must be sorted. Like get_tree_expression,
+    ffmpeg finds the piece by a binary search, and pieces continuing the line of the piece before are merged.
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    scales = np.asarray(scales, dtype=np.float64)
+    offsets = np.asarray(output_starts, dtype=np.float64) - starts * scales
+    if starts.shape[0] == 0:
+        return variable
+
+    merged = np.concatenate(([True], (scales[1:] != scales[:-1]) | ~np.isclose(offsets[1:], offsets[:-1])))
+    starts, offsets, scales = starts[merged].tolist(), offsets[merged].tolist(), scales[merged].tolist()
+
+    def get_expression(low, high):
+        if high - low == 1:
+            return get_line_expression(variable, offsets[low], scales[low])
+        middle = (low + high) // 2
+        return f"if(lt({variable}, {starts[middle]}), {get_expression(low, middle)}, {get_expression(middle, high)})"
+
+    return get_expression(0, len(starts))
+
+
+def get_atempo_filters(speed):
+    # older ffmpeg takes atempo factors from 0.5 to 2, larger changes are chained.
+    factors = []
+    while speed > 2:
+        factors.append(2.0)
+        speed /= 2
+    while speed < 0.5:
+        factors.append(0.5)
+        speed /= 0.5
+    if speed != 1:
+        factors.append(speed)
+    return ",".join(f"atempo={factor}" for factor in factors)
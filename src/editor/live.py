@@ -0,0 +1,172 @@
+import math
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+from editor.edit_plan import EditPlan
+from editor.loudness import FramePeakAccumulator, dilate_frames, get_runs
+from editor.outputs import LiveEdlOutput, LiveSegmentOutput
+from parameters import InputParameter
+from utils import io_utils, profile_utils
+from utils.shell_utils import open_shell, wait_shell
+
+# the video of a moment may be written after its audio, frames are only decided this many seconds after they're
+# analyzed, so their video is in the input when they are rendered.
+LIVE_INTERLEAVE_DELAY = 1
+LIVE_READ_SIZE = 1 << 14
+
+
+class LiveEditor:
+    """
+    Cuts an input which is still being written. Its audio is analyzed as the input grows, and a frame is decided once
+    the frames within its margin are analyzed. A run of decided frames is a final segment once a different run follows
+    it, or once it's a live segment long, so the output lags the input by seconds instead of the whole recording.
+    """
+
+    def __init__(self, parameter: InputParameter):
+        self.parameter = parameter
+        # the loudness of the frames [frame_offset, frame_count), older frames are final and dropped.
+        self.has_loud_audio = np.zeros(0, dtype=np.float64)
+        self.frame_offset = 0
+        self.frame_count = 0
+        # the first frame which doesn't belong to a final segment yet.
+        self.open_start = 0
+        self.output_sample_count = 0
+        self.split_frame_count = max(1, int(round(parameter.live_segment_duration * parameter.frame_rate)))
+        self.delay_frame_count = int(math.ceil(LIVE_INTERLEAVE_DELAY * parameter.frame_rate))
+        self.feed_error = None
+
+    def get_output(self):
+        return LiveEdlOutput(parameter=self.parameter) \
+            if self.parameter.output_type == 'edl' else LiveSegmentOutput(parameter=self.parameter)
+
+    def add_frame_peaks(self, frame_peaks, max_volume):
+        # the loudness is relative to the loudest sample so far, the frames decided before can't be revised.
+        if max_volume > 0:
+            has_loud_audio = (frame_peaks / max_volume >= self.parameter.silent_threshold).astype(np.float64)
+        else:
+            has_loud_audio = np.zeros(frame_peaks.shape[0], dtype=np.float64)
+
+        # keep start
+        has_loud_audio[:max(0, int(self.parameter.keep_frames_from_start) - self.frame_count)] = 1
+
+        self.has_loud_audio = np.concatenate((self.has_loud_audio, has_loud_audio))
+        self.frame_count += frame_peaks.shape[0]
+
+    def get_final_plan(self, finished=False):
+        # returns the edit plan of the segments which became final, or None.
+        frame_margin = self.parameter.frame_margin
+        if finished:
+            # keep end, only the frames which are not final yet can still be kept.
+            frames_count_to_cut = self.frame_count - int(self.parameter.keep_frames_from_end)
+            self.has_loud_audio[max(0, frames_count_to_cut - self.frame_offset):] = 1
+            decided_end = self.frame_count
+        else:
+            decided_end = self.frame_count - int(math.floor(frame_margin)) - self.delay_frame_count
+        if decided_end <= self.open_start:
+            return None
+
+        should_include_frame = dilate_frames(self.has_loud_audio, frame_margin)[
+            self.open_start - self.frame_offset:decided_end - self.frame_offset]
+        boundaries, should_keep = get_runs(should_include_frame)
+        boundaries = boundaries + self.open_start
+        if not finished and decided_end - boundaries[-2] < self.split_frame_count:
+            # the last run may go on, it's final once it's a live segment long.
+            boundaries, should_keep = boundaries[:-1], should_keep[:-1]
+        if should_keep.shape[0] == 0:
+            return None
+
+        edit_plan = EditPlan.from_runs(boundaries, should_keep, self.parameter.new_speed)
+        self.open_start = int(boundaries[-1])
+        # the frames within the margin before the open run are still needed to decide it.
+        frame_offset = max(self.frame_offset, self.open_start - int(math.ceil(frame_margin)))
+        self.has_loud_audio = self.has_loud_audio[frame_offset - self.frame_offset:]
+        self.frame_offset = frame_offset
+
+        output_lengths = edit_plan.get_stretched_lengths(self.parameter.samples_per_frame,
+                                                         self.parameter.audio_sample_count)
+        self.output_sample_count = edit_plan.set_output_lengths(output_lengths, self.parameter.samples_per_frame,
+                                                                self.output_sample_count)
+        return edit_plan
+
+    def apply_final_plan(self, output, edit_plan):
+        if edit_plan is None:
+            return
+        output.apply_edit_plan(edit_plan)
+        self.print_progress()
+
+    def feed_input(self, process):
+        # the growing input is tailed in python and piped to ffmpeg, which reads it like any stream.
+        try:
+            for data in io_utils.follow_file(self.parameter.input_file, self.parameter.live_timeout,
+                                             self.parameter.live_input_complete.is_set):
+                process.stdin.write(data)
+        except BrokenPipeError:
+            # ffmpeg failed, its exit code tells.
+            pass
+        except Exception as e:
+            self.feed_error = e
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def execute(self):
+        parameter = self.parameter
+        parameter.report_progress('edit')
+        analysis_sample_rate, channels = parameter.get_analysis_format()
+        accumulator = FramePeakAccumulator(analysis_sample_rate / parameter.frame_rate)
+        output = self.get_output()
+
+        process = open_shell(f'ffmpeg -hide_banner -v error -i - -ac {channels} -ar {str(analysis_sample_rate)} '
+                             f'-vn -f s16le -', stdin=subprocess.PIPE)
+        feeder = threading.Thread(target=self.feed_input, args=(process,), daemon=True)
+        feeder.start()
+
+        sample_size = channels * 2
+        pending = b''
+        with profile_utils.stage('follow_input', python=True):
+            while True:
+                data = process.stdout.read1(LIVE_READ_SIZE)
+                if not data:
+                    break
+                data = pending + data
+                usable_size = len(data) // sample_size * sample_size
+                pending = data[usable_size:]
+                accumulator.update(np.frombuffer(data[:usable_size], dtype='<i2').reshape(-1, channels))
+                parameter.set_audio_format(accumulator.sample_count, analysis_sample_rate)
+                self.add_frame_peaks(accumulator.take(), accumulator.max_volume)
+                self.apply_final_plan(output, self.get_final_plan())
+
+            process.stdout.close()
+            feeder.join()
+            if self.feed_error:
+                raise self.feed_error
+            if wait_shell(process) != 0 or accumulator.sample_count == 0:
+                raise RuntimeError(f"Audio stream of {parameter.input_file} can not be decoded.")
+
+            accumulator.finish()
+            self.add_frame_peaks(accumulator.take(), accumulator.max_volume)
+            self.apply_final_plan(output, self.get_final_plan(finished=True))
+
+        parameter.max_audio_volume = accumulator.max_volume
+        parameter.audio_frame_count = self.frame_count
+        parameter.duration = self.frame_count / parameter.frame_rate
+        sys.stdout.write("\n")
+        last_output_frame = math.ceil(self.output_sample_count / parameter.samples_per_frame)
+        print(f"Frames to be kept: {last_output_frame}/{self.frame_count}, "
+              f"{100 - last_output_frame * 100.0 / max(1, self.frame_count):.1f}% removed")
+
+        parameter.report_progress('render')
+        with profile_utils.stage('output_close'):
+            output.close()
+
+    def print_progress(self):
+        frame_rate = self.parameter.frame_rate
+        output_duration = self.output_sample_count / self.parameter.audio_sample_rate
+        sys.stdout.write(f"\rLive: analyzed {self.frame_count / frame_rate:.1f}s, "
+                         f"final {self.open_start / frame_rate:.1f}s, output {output_duration:.1f}s")
+        sys.stdout.flush()
@@ -0,0 +1,135 @@
+import math
+
+import numpy as np
+
+# frames are reduced in blocks of about this many samples, to keep the temporary per-sample arrays small.
+BLOCK_SAMPLES = 1 << 20
+
+
+def get_frame_starts(frame_count, samples_per_frame, first_frame=0):
+    # same truncation as int(i * samples_per_frame) for the frame indices [first_frame, frame_count).
+    return (np.arange(first_frame, frame_count, dtype=np.float64) * samples_per_frame).astype(np.int64)
+
+
+def get_frame_peaks(audio_data, samples_per_frame, frame_count=None):
+    """
+    Returns the peak volume, max(max(s), -min(s)), of every video frame of the audio data.
+    Frame i covers the samples [int(i * samples_per_frame), int((i + 1) * samples_per_frame)).
+    """
+    sample_count = audio_data.shape[0]
+    if frame_count is None:
+        frame_count = int(math.ceil(sample_count / samples_per_frame))
+
+    frame_peaks = np.zeros(frame_count, dtype=np.float64)
+    starts = get_frame_starts(frame_count, samples_per_frame)
+    ends = np.minimum(np.append(starts[1:], int(frame_count * samples_per_frame)), sample_count)
+
+    # frames beyond the audio data have no samples and stay silent.
+    valid_frame_count = int(np.count_nonzero(starts < ends))
+    block_frames = max(1, int(BLOCK_SAMPLES // samples_per_frame))
+    for block_start in range(0, valid_frame_count, block_frames):
+        block_end = min(block_start + block_frames, valid_frame_count)
+        sample_start = starts[block_start]
+        block = audio_data[sample_start:ends[block_end - 1]]
+        if block.ndim > 1:
+            high, low = block.max(axis=1), block.min(axis=1)
+        else:
+            high, low = block, block
+
+        offsets = starts[block_start:block_end] - sample_start
+        frame_peaks[block_start:block_end] = np.maximum(
+            np.maximum.reduceat(high, offsets).astype(np.float64),
+            -np.minimum.reduceat(low, offsets).astype(np.float64)
+        )
+
+    return frame_peaks
+
+
+def dilate_frames(has_loud_audio, frame_margin):
+    """
+    Marks every frame within frame_margin frames of a loud frame, a sliding window max in linear time.
+    The window of frame i is [int(max(0, i - frame_margin)), int(i + 1 + frame_margin)).
+    """
+    frame_count = has_loud_audio.shape[0]
+    left_margin = int(math.ceil(frame_margin))
+    right_margin = int(math.floor(frame_margin))
+
+    loud_count = np.concatenate(([0], np.cumsum(has_loud_audio != 0)))
+    indices = np.arange(frame_count)
+    window_start = np.maximum(indices - left_margin, 0)
+    window_end = np.minimum(indices + 1 + right_margin, frame_count)
+    return (loud_count[window_end] > loud_count[window_start]).astype(np.float64)
+
+
+def get_runs(frames):
+    # run-length encodes frames into the boundaries [0, ..., frame_count] and the value of each run.
+    flips = np.flatnonzero(frames[1:] != frames[:-1]) + 1
+    boundaries = np.concatenate(([0], flips, [frames.shape[0]]))
+    return boundaries, frames[boundaries[:-1]]
+
+
+class FramePeakAccumulator:
+    """
+    Computes the same envelope as get_frame_peaks from audio fed block by block,
+    so the whole audio never needs to be resident.
+    """
+
+    def __init__(self, samples_per_frame):
+        self.samples_per_frame = samples_per_frame
+        self.sample_count = 0
+        self.max_volume = 0.0
+
+        self.frame_count = 0
+        self.frame_peaks = []
+        self.taken_count = 0
+        # per-sample peaks of the samples not belonging to a finished frame yet.
+        self.pending_start = 0
+        self.pending_high = np.zeros(0, dtype=np.int16)
+        self.pending_low = np.zeros(0, dtype=np.int16)
+
+    def update(self, block):
+        if block.ndim > 1:
+            high, low = block.max(axis=1), block.min(axis=1)
+        else:
+            high, low = block, block
+        if high.shape[0] == 0:
+            return
+
+        self.sample_count += high.shape[0]
+        self.max_volume = max(self.max_volume, float(high.max()), -float(low.min()))
+        self.pending_high = np.concatenate((self.pending_high, high))
+        self.pending_low = np.concatenate((self.pending_low, low))
+
+        # the frames ending within the received samples are complete.
+        candidate_count = int(self.sample_count / self.samples_per_frame) - self.frame_count + 2
+        ends = get_frame_starts(self.frame_count + candidate_count + 1, self.samples_per_frame, self.frame_count + 1)
+        self.flush(int(np.count_nonzero(ends <= self.sample_count)))
+
+    def flush(self, frame_count):
+        if frame_count <= 0:
+            return
+
+        starts = get_frame_starts(self.frame_count + frame_count + 1, self.samples_per_frame, self.frame_count)
+        offsets = starts - self.pending_start
+        end = min(offsets[-1], self.pending_high.shape[0])
+        self.frame_peaks.append(np.maximum(
+            np.maximum.reduceat(self.pending_high[:end], offsets[:-1]).astype(np.float64),
+            -np.minimum.reduceat(self.pending_low[:end], offsets[:-1]).astype(np.float64)
+        ))
+
+        self.frame_count += frame_count
+        self.pending_start += end
+        self.pending_high = self.pending_high[end:]
+        self.pending_low = self.pending_low[end:]
+
+    def finish(self):
+        # the last frame may be incomplete.
+        total_frame_count = int(math.ceil(self.sample_count / self.samples_per_frame))
+        self.flush(total_frame_count - self.frame_count)
+        return np.concatenate(self.frame_peaks) if self.frame_peaks else np.zeros(0, dtype=np.float64)
+
+    def take(self):
+        # the frame peaks completed since the last call, for consumers following the audio as it's decoded.
+        frame_peaks = self.frame_peaks[self.taken_count:]
+        self.taken_count = len(self.frame_peaks)
+        return np.concatenate(frame_peaks) if frame_peaks else np.zeros(0, dtype=np.float64)
@@ -0,0 +1,94 @@
+import numpy as np
+from timecode import Timecode
+
+from editor.edit_plan import EditPlan
+
+# how the timestamps in removed segments are remapped: to the output time of the cut, or to nan.
+REMOVED_SNAP = 'snap'
+REMOVED_DROP = 'drop'
+REMOVED_POLICIES = [REMOVED_SNAP, REMOVED_DROP]
+
+
+class TimeMapping:
+    """
+    The time mapping of an edit as numpy columns: the input frames [start_frame, end_frame) of every segment are
+    played in the output frames [output_start_frame, output_end_frame). Stored as an npz file, it's the indexed
+    counterpart of the text mapping, and timestamps are remapped in bulk by a binary search over the segments.
+    """
+
+    def __init__(self, start_frames, end_frames, output_start_frames, output_end_frames, is_removed, frame_rate):
+        self.start_frames = np.asarray(start_frames, dtype=np.int64)
+        self.end_frames = np.asarray(end_frames, dtype=np.int64)
+        self.output_start_frames = np.asarray(output_start_frames, dtype=np.int64)
+        self.output_end_frames = np.asarray(output_end_frames, dtype=np.int64)
+        self.is_removed = np.asarray(is_removed, dtype=bool)
+        self.frame_rate = float(frame_rate)
+
+    @staticmethod
+    def from_edit_plan(edit_plan: EditPlan, frame_rate):
+        return TimeMapping(edit_plan.start_frames, edit_plan.end_frames, edit_plan.output_start_frames,
+                           edit_plan.output_end_frames, edit_plan.is_removed, frame_rate)
+
+    @staticmethod
+    def concatenate(mappings):
+        # the mappings of consecutive batches of segments, like the ones of a followed input.
+        return TimeMapping(*(np.concatenate([getattr(mapping, name) for mapping in mappings]) for name in
+                             ['start_frames', 'end_frames', 'output_start_frames', 'output_end_frames',
+                              'is_removed']), mappings[0].frame_rate)
+
+    def __len__(self):
+        return self.start_frames.shape[0]
+
+    def save(self, path):
+        with open(path, 'wb') as mapping_file:
+            np.savez(mapping_file, start_frames=self.start_frames, end_frames=self.end_frames,
+                     output_start_frames=self.output_start_frames, output_end_frames=self.output_end_frames,
+                     is_removed=self.is_removed, frame_rate=np.array(self.frame_rate))
+
+    @staticmethod
+    def load(path):
+        with np.load(path) as mapping:
+            return TimeMapping(mapping['start_frames'], mapping['end_frames'], mapping['output_start_frames'],
+                               mapping['output_end_frames'], mapping['is_removed'], float(mapping['frame_rate']))
+
+    @staticmethod
+    def load_text(path, frame_rate):
+        """
+        Reads the text mapping, which lists the end timecode of every segment in the input and in the output.
+        Segments shorter than 2 output frames are taken as removed, like EditPlan.is_removed.
+        """
+        with open(path, 'r') as mapping_file:
+            lines = [line.split() for line in mapping_file if line.strip()]
+        # the timecodes are 1-based, like format_frames writes them.
+        end_frames = np.array([Timecode(frame_rate, end).frames - 1 for end, _ in lines], dtype=np.int64)
+        output_end_frames = np.array([Timecode(frame_rate, end).frames - 1 for _, end in lines], dtype=np.int64)
+        start_frames = np.concatenate(([0], end_frames[:-1]))
+        output_start_frames = np.concatenate(([0], output_end_frames[:-1]))
+        return TimeMapping(start_frames, end_frames, output_start_frames, output_end_frames,
+                           output_end_frames - output_start_frames <= 1, frame_rate)
+
+    def remap_frames(self, frames, removed=REMOVED_SNAP):
+        """
+        Maps input frame positions to output frame positions. Positions in sped up segments are scaled, positions
+        in removed segments are moved to the cut, or to nan. Positions past the ends are clamped.
+        """
+        frames = np.asarray(frames, dtype=np.float64)
+        if len(self) == 0:
+            return np.zeros_like(frames)
+        segments = np.minimum(np.searchsorted(self.end_frames, frames, side='right'), len(self) - 1)
+        start_frames = self.start_frames[segments]
+        frame_counts = np.maximum(self.end_frames[segments] - start_frames, 1)
+        output_frame_counts = self.output_end_frames[segments] - self.output_start_frames[segments]
+        into_segment = np.clip(frames - start_frames, 0, frame_counts)
+
+        output_frames = self.output_start_frames[segments] + into_segment * output_frame_counts / frame_counts
+        is_removed = self.is_removed[segments]
+        if removed == REMOVED_DROP:
+            return np.where(is_removed, np.nan, output_frames)
+        if removed == REMOVED_SNAP:
+            return np.where(is_removed, self.output_start_frames[segments], output_frames)
+        raise ValueError(f"Unknown removed policy: {removed}")
+
+    def remap(self, times, removed=REMOVED_SNAP):
+        # the same as remap_frames, for timestamps in seconds.
+        return self.remap_frames(np.asarray(times, dtype=np.float64) * self.frame_rate, removed) / self.frame_rate
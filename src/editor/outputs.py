@@ -1,21 +1,47 @@
+import hashlib
 import locale
+import math
 import os
-from shutil import copyfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from scipy.io import wavfile
-from timecode import Timecode
 
-from editor.edit_point import EditPoint
-from editor.section import Section
+from editor.edit_plan import EditPlan
+from editor.filters import get_atempo_filters, get_removal_expression, get_retime_expression, split_chunks, \
+    split_fixed_chunks, split_smart_pieces
+from editor.mapping import TimeMapping
+from editor.section import SECTION_BAR_HEIGHT, Section
 from parameters import InputParameter
-from utils.shell_utils import do_shell, STRING, take_until
-from utils.timecode_utils import format_timecode
+from utils import profile_utils
+from utils.cache_utils import RenderCache, get_default_cache_folder, remove_entry
+from utils.probe_utils import get_encoders, probe_keyframes
+from utils.shell_utils import do_shell, open_shell, wait_shell
+from utils.timecode_utils import format_frames
 
 OS_ENCODING = locale.getpreferredencoding()
+# changes whenever the chunks are rendered differently for the same cuts.
+RENDER_CACHE_VERSION = 1
+# the encoders re-encoding the cut GOPs of a smart render, by the codec of the copied GOPs.
+SMART_RENDER_ENCODERS = {'h264': 'libx264', 'hevc': 'libx265'}
+# the containers which take the codec parameters in band, where they change between copied and re-encoded GOPs.
+SMART_RENDER_CONTAINERS = ['.ts', '.mts', '.m2ts', '.mkv']
+# the encoder profiles by the profiles ffprobe reports, the others are left to the encoder.
+SMART_RENDER_PROFILES = {
+    'h264': {'Constrained Baseline': 'baseline', 'Baseline': 'baseline', 'Main': 'main', 'High': 'high',
+             'High 10': 'high10', 'High 4:2:2': 'high422', 'High 4:4:4 Predictive': 'high444'},
+    'hevc': {'Main': 'main', 'Main 10': 'main10', 'Main Still Picture': 'mainstillpicture'},
+}
+# seconds of whole GOPs worth copying, shorter kept spans are re-encoded as a whole.
+SMART_RENDER_MIN_COPY_DURATION = 1
+# samples per channel written to the encoder at a time, when streaming the audio buffer.
+AUDIO_WRITE_BLOCK_SIZE = 1 << 16
 
 
 class BaseOutput(object):
+    # whether the output consumes the time stretched audio, or only the output frame positions.
+    needs_audio = False
 
     def __init__(self, parameter: InputParameter):
         self.parameter = parameter
@@ -25,21 +51,54 @@ class BaseOutput(object):
         self.input_file_name_without_extension = self.input_file_name[:self.input_file_name.rfind('.')]
 
         self.mappings = []
+        self.mappings_appended = False
+        self.time_mappings = []
 
-    def apply_edit_point(self, edit_point: EditPoint, audio_data, start_output_frame, end_output_frame):
+    def plan_edit(self, edit_plan: EditPlan):
+        # the segments of the edit, before their audio is rendered and placed.
+        pass
+
+    def allocate_audio(self, sample_count):
+        # the estimated count of the output audio samples, before any audio is applied.
+        pass
+
+    def apply_audio(self, audio_data):
+        # the time stretched audio of the next segment, only given to the outputs which need audio.
+        pass
+
+    def format_mappings(self, edit_plan: EditPlan):
+        frame_rate = self.parameter.frame_rate
+        return np.char.add(np.char.add(format_frames(edit_plan.end_frames, frame_rate), ' '),
+                           format_frames(edit_plan.output_end_frames, frame_rate)).tolist()
+
+    def apply_edit_plan(self, edit_plan: EditPlan):
         if self.parameter.mapping:
-            edit_point_output_start = Timecode(self.parameter.frame_rate, frames=start_output_frame + 1)
-            edit_point_output_end = Timecode(self.parameter.frame_rate, frames=end_output_frame + 1)
+            self.mappings = self.format_mappings(edit_plan)
+        if self.parameter.mapping_index:
+            self.time_mappings = [TimeMapping.from_edit_plan(edit_plan, self.parameter.frame_rate)]
 
-            edit_point_start = Timecode(self.parameter.frame_rate, frames=edit_point.start_frame + 1)
-            edit_point_end = Timecode(self.parameter.frame_rate, frames=edit_point.end_frame + 1)
-            self.mappings.append(f"{edit_point_end} {edit_point_output_end}")
+    def append_mappings(self, edit_plan: EditPlan):
+        # live outputs write the mappings of every batch of final segments right away, the first batch truncates.
+        if self.parameter.mapping:
+            with open(self.parameter.mapping, 'a' if self.mappings_appended else 'w') as mapping_file:
+                mapping_file.write("".join(f"{mapping}\n" for mapping in self.format_mappings(edit_plan)))
+            self.mappings_appended = True
+        if self.parameter.mapping_index:
+            # an npz can't be appended to, it's rewritten with all the batches so far.
+            self.time_mappings.append(TimeMapping.from_edit_plan(edit_plan, self.parameter.frame_rate))
+            self.write_mapping_index()
+
+    def write_mapping_index(self):
+        mapping_index = f"{self.parameter.mapping_index}.tmp.npz"
+        TimeMapping.concatenate(self.time_mappings).save(mapping_index)
+        os.replace(mapping_index, self.parameter.mapping_index)
 
     def close(self):
         if self.parameter.mapping:
             with open(self.parameter.mapping, 'w') as mapping_file:
-                for mapping in self.mappings:
-                    mapping_file.write(f"{mapping}\n")
+                mapping_file.write("".join(f"{mapping}\n" for mapping in self.mappings))
+        if self.parameter.mapping_index and self.time_mappings:
+            self.write_mapping_index()
 
 
 class EdlOutput(BaseOutput):
@@ -51,52 +110,75 @@ class EdlOutput(BaseOutput):
                 self.input_file_dir,
                 f'{self.input_file_name_without_extension}.edl'
             )
+        self.events = []
 
-        self.edl_file = open(self.parameter.output_file, "w", encoding=OS_ENCODING)
-        self.edl_file.write(f'TITLE: {self.input_file_name_without_extension}\n\n')
-
-        self.index = 1
+    def apply_edit_plan(self, edit_plan: EditPlan):
+        super().apply_edit_plan(edit_plan)
+        self.events = self.format_events(edit_plan)
 
-    def apply_edit_point(self, edit_point: EditPoint, audio_data, start_output_frame, end_output_frame):
-        super().apply_edit_point(edit_point, audio_data, start_output_frame, end_output_frame)
-
-        edit_point_output_start = Timecode(self.parameter.frame_rate, frames=start_output_frame + 1)
-        edit_point_output_end = Timecode(self.parameter.frame_rate, frames=end_output_frame + 1)
+    def format_events(self, edit_plan: EditPlan, first_index=1):
         # provide one frame buffer for motion events. if the output length is less than 2 frames, cut it off.
-        if edit_point_output_end.frames - edit_point_output_start.frames > 1:
-            edit_point_start = Timecode(self.parameter.frame_rate, frames=edit_point.start_frame + 1)
-            edit_point_end = Timecode(self.parameter.frame_rate, frames=edit_point.end_frame + 1)
-
-            self.edl_file.write(
-                f'{self.index:03d}  AX       AA/V  C        '
-                f'{edit_point_start} {edit_point_end} {edit_point_output_start} {edit_point_output_end}\n')
-            self.edl_file.write(f'* FROM CLIP NAME: {self.input_file_name}\n')
-
-            if not edit_point.should_keep:
-                # M2   AX       086.7                      00:00:16:16
-                output_length = edit_point_output_end - edit_point_output_start
-                original_length = edit_point_end - edit_point_start
-                if output_length != original_length:
-                    # adobe premiere may complain about the motion events with such an 'accurate' new_frame_rate.
-                    # so we leave one frame as a buffer to hold the whole input video frames after speed changes.
-                    # it's safe to subtract 1 from output_length as we have already guaranteed 2 frames at least.
-                    new_frame_rate = original_length.frames / (output_length.frames - 1) * self.parameter.frame_rate
-                    self.edl_file.write(
-                        f'M2   AX       '
-                        f'{new_frame_rate:05.1f}'
-                        f'                      '
-                        f'{edit_point_start}\n'
-                    )
-
-            self.edl_file.write('\n')
-            self.index += 1
+        rows = np.flatnonzero(~edit_plan.is_removed)
+        frame_rate = self.parameter.frame_rate
+        starts = format_frames(edit_plan.start_frames[rows], frame_rate)
+        ends = format_frames(edit_plan.end_frames[rows], frame_rate)
+        output_starts = format_frames(edit_plan.output_start_frames[rows], frame_rate)
+        output_ends = format_frames(edit_plan.output_end_frames[rows], frame_rate)
+
+        # M2   AX       086.7                      00:00:16:16
+        output_lengths = edit_plan.output_frame_counts[rows]
+        original_lengths = edit_plan.end_frames[rows] - edit_plan.start_frames[rows]
+        has_motion = ~edit_plan.should_keep[rows] & (output_lengths != original_lengths)
+        # adobe premiere may complain about the motion events with such an 'accurate' new_frame_rate.
+        # so we leave one frame as a buffer to hold the whole input video frames after speed changes.
+        # it's safe to subtract 1 from output_length as we have already guaranteed 2 frames at least.
+        new_frame_rates = original_lengths / (output_lengths - 1) * frame_rate
+
+        events = []
+        for index, (start, end, output_start, output_end, motion, new_frame_rate) in enumerate(zip(
+                starts.tolist(), ends.tolist(), output_starts.tolist(), output_ends.tolist(), has_motion.tolist(),
+                new_frame_rates.tolist()), first_index):
+            event = (f'{index:03d}  AX       AA/V  C        {start} {end} {output_start} {output_end}\n'
+                     f'* FROM CLIP NAME: {self.input_file_name}\n')
+            if motion:
+                event += f'M2   AX       {new_frame_rate:05.1f}                      {start}\n'
+            events.append(event + '\n')
+        return events
 
     def close(self):
         super().close()
-        self.edl_file.close()
+        with open(self.parameter.output_file, "w", encoding=OS_ENCODING) as edl_file:
+            edl_file.write(f'TITLE: {self.input_file_name_without_extension}\n\n' + "".join(self.events))
+
+
+class LiveEdlOutput(EdlOutput):
+    """
+    Appends the events of every batch of final segments to the EDL while the input still grows,
+    so the EDL is usable at any time.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.event_count = 0
+        with open(self.parameter.output_file, "w", encoding=OS_ENCODING) as edl_file:
+            edl_file.write(f'TITLE: {self.input_file_name_without_extension}\n\n')
 
+    def apply_edit_plan(self, edit_plan: EditPlan):
+        self.append_mappings(edit_plan)
+        events = self.format_events(edit_plan, self.event_count + 1)
+        self.event_count += len(events)
+        with open(self.parameter.output_file, "a", encoding=OS_ENCODING) as edl_file:
+            edl_file.write("".join(events))
 
-class DirectVideoOutput(BaseOutput):
+    def close(self):
+        print(f"Output file: {self.parameter.output_file}")
+
+
+class MediaOutput(BaseOutput):
+    """
+    The outputs rendering a media file beside the input, or in place of it. The time stretched audio given to
+    them is assembled into one preallocated buffer.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -106,41 +188,145 @@ class DirectVideoOutput(BaseOutput):
                 f'{self.input_file_name_without_extension}_edited{self.input_file_name[self.input_file_name.rfind("."):]}'
             )
 
+        self.output_audio_data = None
+        self.output_sample_count = 0
+
+    def allocate_audio(self, sample_count):
+        self.output_audio_data = np.zeros((sample_count, self.parameter.load_audio_data().shape[1]),
+                                          dtype=np.float32)
+        self.output_sample_count = 0
+
+    def apply_audio(self, audio_data):
+        end = self.output_sample_count + audio_data.shape[0]
+        if end > self.output_audio_data.shape[0]:
+            # the time stretched lengths may exceed the estimation, grow geometrically.
+            self.output_audio_data = np.resize(self.output_audio_data,
+                                               (max(end, self.output_audio_data.shape[0] * 3 // 2),
+                                                self.output_audio_data.shape[1]))
+        np.divide(audio_data, self.parameter.get_output_max_volume(),
+                  out=self.output_audio_data[self.output_sample_count:end])
+        self.output_sample_count = end
+
+    def finish_output_file(self):
+        if not os.path.exists(self.parameter.output_file):
+            raise FileExistsError(f"{self.parameter.output_file} is not existing. Check the errors before.")
+
+        if self.parameter.replace:
+            from send2trash import send2trash
+
+            send2trash(self.parameter.input_file)
+            os.rename(self.parameter.output_file, self.parameter.input_file)
+            print(f"Output file: {self.parameter.input_file}")
+        else:
+            print(f"Output file: {self.parameter.output_file}")
+
+
+class AudioOutput(MediaOutput):
+    """
+    Renders audio only inputs without another decode by ffmpeg: the segments stretched by the editor are assembled
+    in the audio buffer, which is streamed as raw samples into a single encode.
+    """
+    needs_audio = True
+
+    def close(self):
+        super().close()
+        channels = self.output_audio_data.shape[1]
+        process = open_shell(
+            f'ffmpeg -hide_banner -v warning -y -f f32le -ar {int(self.parameter.sample_rate)} -ac {channels} -i - '
+            f'"{self.parameter.output_file}"', stdin=subprocess.PIPE
+        )
+        try:
+            for start in range(0, self.output_sample_count, AUDIO_WRITE_BLOCK_SIZE):
+                end = min(start + AUDIO_WRITE_BLOCK_SIZE, self.output_sample_count)
+                process.stdin.write(self.output_audio_data[start:end].data)
+        except BrokenPipeError:
+            # ffmpeg failed, its exit code tells.
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        process.stdout.close()
+        if wait_shell(process) != 0:
+            raise RuntimeError(f"Encoding {self.parameter.output_file} failed. Check the errors before.")
+
+        self.finish_output_file()
+
+
+class DirectVideoOutput(MediaOutput):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
         self.output_video_frame_count = self.parameter.video_frame_count
         self.audio_edit_config = []
         self.video_edit_config = []
 
+        # sped up segments are re-timed in the filter graph, with the audio time stretched by the editor. decided
+        # by plan_edit, once the segments are known.
+        self.variable_speed = False
+        # the pieces of the re-timing, for the kept segments: their first frame after the cuts, their first output
+        # frame, and their output frames per input frame.
+        self.retime_cut_starts = np.zeros(0, dtype=np.int64)
+        self.retime_output_starts = np.zeros(0, dtype=np.int64)
+        self.retime_scales = np.zeros(0, dtype=np.float64)
+
         self.sections = []
+        self.section_bar_file = f"{self.parameter.temp_folder}/section_bar.png"
+        self.section_bar_hash = None
         if self.parameter.input_sections:
             with open(self.parameter.input_sections, 'r', encoding='utf-8') as toc_file:
                 self.sections = Section.parse(toc_file.read(), self.parameter.frame_rate)
 
-    def apply_edit_point(self, edit_point: EditPoint, audio_data, start_output_frame, end_output_frame):
-        super().apply_edit_point(edit_point, audio_data, start_output_frame, end_output_frame)
+    def plan_edit(self, edit_plan: EditPlan):
+        # re-timing is only needed if a segment at a speed besides 1 is longer than 1 output frame, as it's not
+        # removed then. segments removed at any speed, like with --silent_speed 99999, are cut as usual.
+        output_lengths = (edit_plan.end_frames - edit_plan.start_frames) / edit_plan.speeds
+        self.variable_speed = bool(np.any((edit_plan.speeds != 1) & (output_lengths > 1)))
+        self.needs_audio = self.variable_speed
 
-        edit_point_output_start = Timecode(self.parameter.frame_rate, frames=start_output_frame + 1)
-        edit_point_output_end = Timecode(self.parameter.frame_rate, frames=end_output_frame + 1)
+    def apply_edit_plan(self, edit_plan: EditPlan):
+        super().apply_edit_plan(edit_plan)
 
         # provide one frame buffer for motion events. if the output length is less than 2 frames, cut it off.
-        if edit_point_output_end.frames - edit_point_output_start.frames <= 1:
-            edit_point_start = Timecode(self.parameter.frame_rate, frames=edit_point.start_frame + 1)
-            edit_point_end = Timecode(self.parameter.frame_rate, frames=edit_point.end_frame + 1)
-            self.video_edit_config.append(f"between(n, {edit_point_start.frames}, {edit_point_end.frames - 1})")
-            self.audio_edit_config.append(f"between(t, {edit_point_start.float}, {edit_point_end.float})")
+        removed = edit_plan.is_removed
+        # the removed input frames are [start_frame + 1, end_frame], 1-based like Timecode frames.
+        removed_starts = edit_plan.start_frames[removed] + 1
+        removed_ends = edit_plan.end_frames[removed] + 1
+        self.video_edit_config = list(zip(removed_starts.tolist(), (removed_ends - 1).tolist()))
+        self.audio_edit_config = list(zip((removed_starts / self.parameter.frame_rate).tolist(),
+                                          (removed_ends / self.parameter.frame_rate).tolist()))
+        self.output_video_frame_count -= int(np.sum(removed_ends - removed_starts))
+
+        if self.variable_speed:
+            kept = ~removed
+            cut_lengths = (edit_plan.end_frames - edit_plan.start_frames)[kept]
+            self.retime_cut_starts = np.cumsum(cut_lengths) - cut_lengths
+            self.retime_output_starts = edit_plan.output_start_frames[kept]
+            self.retime_scales = edit_plan.output_frame_counts[kept] / np.maximum(cut_lengths, 1)
+            # the cut off segments still leave their audio shorter than 2 frames.
+            self.output_video_frame_count = int(edit_plan.output_end_frames[-1]) if len(edit_plan) else 0
+            output_frame_counts = np.where(removed, 0, edit_plan.output_frame_counts)
+        else:
+            # the video of the segments is either removed or kept as it is.
+            output_frame_counts = np.where(removed, 0, edit_plan.end_frames - edit_plan.start_frames)
 
-            self.output_video_frame_count -= edit_point_end.frames - edit_point_start.frames
+        if self.sections:
+            Section.apply_edits(self.sections, edit_plan.start_frames, edit_plan.end_frames, output_frame_counts)
 
-            if self.sections:
-                for section in self.sections:
-                    section.apply_edit_point(edit_point)
+    def write_audio(self):
+        # the time stretched audio of a variable speed output, muxed in place of the cut input audio.
+        audio_file = f'{self.parameter.temp_folder}/audio_edited.wav'
+        wavfile.write(audio_file, int(self.parameter.sample_rate), self.output_audio_data[:self.output_sample_count])
+        return audio_file
 
     def select_encoder(self):
         if self.parameter.use_hardware_acc:
-            result = do_shell(f'ffmpeg -hide_banner -encoders', stdout=STRING)
-            h264_encoders = [encoder[1] for encoder in [
-                line.strip().split(' ', 2)[:2] for line in
-                take_until(result.splitlines(), lambda line: line.strip() == '------')
-            ] if encoder[0] == 'V....D' and '264' in encoder[1]]
+            cache_folder = (self.parameter.cache_folder or get_default_cache_folder()) \
+                if self.parameter.analysis_cache else None
+            h264_encoders = [encoder[1] for encoder in get_encoders(cache_folder)
+                             if encoder[0] == 'V....D' and '264' in encoder[1]]
 
             print(f'h264 encoders: {h264_encoders}')
 
@@ -162,112 +348,478 @@ class DirectVideoOutput(BaseOutput):
             return f'-c:v {selected_encoder}'
         return ''
 
-    def close(self):
-        super().close()
-        with open(f"{self.parameter.temp_folder}/filter_script.txt", "w", encoding='utf-8') as config_file:
-            if self.sections:
-                config_file.write("select='not(\n")
-                config_file.write("+".join(self.video_edit_config))
-                config_file.write(")',setpts=N/FR/TB[a]; \n")
-
-                config_file.write("aselect='not(\n")
-                config_file.write("+".join(self.audio_edit_config))
-                config_file.write(")', asetpts=N/SR/TB")
-
-                config_file.write(";\n")
-                config_file.write(f"color=c=#55555555:s={self.parameter.video_width}x50[bar];\n")
-                config_file.write(f"[a][bar]overlay=w*n/{self.output_video_frame_count}-w:H-h:shortest=1,")
-
-                Section.compute_frames(self.sections, self.output_video_frame_count)
-
-                for section in self.sections:
-                    x = section.start_frame * self.parameter.video_width / self.output_video_frame_count
-                    w = section.frame_count * self.parameter.video_width / self.output_video_frame_count
-                    config_file.write(f"drawbox="
-                                      f"x={x}:y=ih-50:w={w-1}:h=50:t=fill:c=#00005555,"
-                                      f"drawtext=x={x}+({w}-tw)/2:y=h-50+(50-th)/2:fontsize=24:"
-                                      f"fontcolor=white:text='{section.title}':font='Microsoft YaHei',")
-            else:
-                if not self.parameter.audio_only:
-                    config_file.write("select='not(\n")
-                    config_file.write("+".join(self.video_edit_config))
-                    config_file.write(")',setpts=N/FR/TB; \n")
-
-                config_file.write("aselect='not(\n")
-                config_file.write("+".join(self.audio_edit_config))
-                config_file.write(")', asetpts=N/SR/TB")
+    def get_cut_filter(self, video_edit_config, output_frame_offset=0, cut_range=None):
+        video_removal = get_removal_expression('n', video_edit_config, self.parameter.cut_backend)
+        if not self.variable_speed:
+            return f"select='not(\n{video_removal})',setpts=N/FR/TB"
+
+        # the frames left by the cuts are placed at their output frames, fps drops the frames of sped up segments
+        # and tpad makes sure no frame lacks at the end. cut_range is the frames after the cuts a chunk renders.
+        cut_start, cut_end = cut_range or (0, self.get_cut_frame_count())
+        first = max(0, np.searchsorted(self.retime_cut_starts, cut_start, side='right') - 1)
+        last = np.searchsorted(self.retime_cut_starts, cut_end)
+        retime = get_retime_expression('N', self.retime_cut_starts[first:last] - cut_start,
+                                       self.retime_output_starts[first:last] - output_frame_offset,
+                                       self.retime_scales[first:last])
+        return self.get_retime_filter(video_removal, retime, self.parameter.frame_rate)
+
+    @staticmethod
+    def get_retime_filter(video_removal, retime, frame_rate):
+        return (f"select='not(\n{video_removal})',setpts='(\n{retime})/FR/TB',"
+                f"fps={frame_rate},tpad=stop_mode=clone:stop=2")
+
+    def get_output_frame(self, cut_frame):
+        # the output frame of a frame after the cuts, rounded like the fps filter.
+        if not self.variable_speed or not len(self.retime_cut_starts):
+            return cut_frame
+        piece = max(0, np.searchsorted(self.retime_cut_starts, cut_frame, side='right') - 1)
+        return int(round(self.retime_output_starts[piece]
+                         + (cut_frame - self.retime_cut_starts[piece]) * self.retime_scales[piece]))
+
+    def get_cut_frame_count(self):
+        # the count of the input frames left by the cuts.
+        frame_count = self.parameter.video_frame_count
+        return frame_count - sum(min(end, frame_count - 1) - start + 1 for start, end in self.video_edit_config
+                                 if start < frame_count)
+
+    def get_video_filter(self, video_edit_config, output_frame_offset=0, cut_range=None, section_input=1):
+        cut_filter = self.get_cut_filter(video_edit_config, output_frame_offset, cut_range)
+        if not self.sections:
+            return cut_filter
+
+        # output_frame_offset is the count of the output frames rendered before, when rendering in chunks.
+        # the sections are drawn once into the image of input section_input, the cost per frame is two overlays.
+        output_frame = f"(n+{output_frame_offset})" if output_frame_offset else "n"
+        return (f"{cut_filter}[a]; \n"
+                f"color=c=#55555555:s={self.parameter.video_width}x{SECTION_BAR_HEIGHT}[bar];\n"
+                f"[a][bar]overlay=w*{output_frame}/{self.output_video_frame_count}-w:H-h:shortest=1[b];\n"
+                f"[b][{section_input}:v]overlay=0:H-h")
+
+    def render_section_bar(self):
+        Section.render_bar(self.sections, self.parameter.video_width, self.output_video_frame_count,
+                           self.section_bar_file)
+        with open(self.section_bar_file, 'rb') as bar_file:
+            self.section_bar_hash = hashlib.sha1(bar_file.read()).hexdigest()
+
+    def get_section_bar_input(self):
+        return f'-i "{self.section_bar_file}" ' if self.sections else ''
+
+    def get_audio_filter(self):
+        audio_removal = get_removal_expression('t', self.audio_edit_config, self.parameter.cut_backend)
+        return f"aselect='not(\n{audio_removal})', asetpts=N/SR/TB"
+
+    @staticmethod
+    def write_filter_script(path, *filters):
+        with open(path, "w", encoding='utf-8') as config_file:
+            config_file.write("; \n".join(filters))
+
+    def get_frame_rate_option(self):
+        # setpts=N/FR/TB leaves no frame rate to the encoder, which would fall back to 25 fps and drop frames.
+        return f'-r {self.parameter.frame_rate} '
+
+    def render(self, hw_encoder):
+        filter_script = f"{self.parameter.temp_folder}/filter_script.txt"
+        if self.variable_speed:
+            self.render_variable_speed(filter_script, hw_encoder)
+            return
+
+        self.write_filter_script(filter_script, self.get_video_filter(self.video_edit_config), self.get_audio_filter())
 
-        # Use ffmpeg filter to cut videos directly if possible.
-        hw_encoder = self.select_encoder()
+        do_shell(
+            f'ffmpeg -hide_banner -v warning -stats -thread_queue_size 1024 '
+            f'-y -filter_complex_script "{filter_script}" '
+            f'-i "{self.parameter.input_file}" {self.get_section_bar_input()}{hw_encoder} '
+            f'{self.get_frame_rate_option()}"{self.parameter.output_file}"'
+        )
 
+    def render_variable_speed(self, filter_script, hw_encoder):
+        audio_file = self.write_audio()
+        # the output is as long as the time stretched audio, the last frame is held when the video is shorter.
+        self.write_filter_script(filter_script,
+                                 self.get_video_filter(self.video_edit_config, section_input=2) + "[outv]")
         do_shell(
             f'ffmpeg -hide_banner -v warning -stats -thread_queue_size 1024 '
-            f'-y -filter_complex_script "{self.parameter.temp_folder}/filter_script.txt" '
-            f'-i "{self.parameter.input_file}" {hw_encoder} "{self.parameter.output_file}"'
+            f'-y -filter_complex_script "{filter_script}" '
+            f'-i "{self.parameter.input_file}" -i "{audio_file}" {self.get_section_bar_input()}'
+            f'-map "[outv]" -map 1:a {hw_encoder} '
+            f'{self.get_frame_rate_option()}-frames:v {self.output_video_frame_count} "{self.parameter.output_file}"'
         )
 
-        if not os.path.exists(self.parameter.output_file):
-            raise FileExistsError(f"{self.parameter.output_file} is not existing. Check the errors before.")
+    def render_audio_track(self, filter_script, audio_file):
+        # the audio of the cut video, rendered in one pass.
+        if self.variable_speed:
+            return do_shell(f'ffmpeg -hide_banner -v warning -y -i "{self.write_audio()}" "{audio_file}"')
+        return do_shell(
+            f'ffmpeg -hide_banner -v warning -thread_queue_size 1024 '
+            f'-y -i "{self.parameter.input_file}" -filter_complex_script "{filter_script}" -vn "{audio_file}"'
+        )
 
-        if self.parameter.replace:
-            from send2trash import send2trash
+    def join_video(self, video_files, audio_file):
+        concat_list = f"{self.parameter.temp_folder}/chunks.txt"
+        with open(concat_list, "w", encoding='utf-8') as concat_file:
+            for video_file in video_files:
+                concat_file.write(f"file '{os.path.abspath(video_file)}'\n")
 
-            send2trash(self.parameter.input_file)
-            os.rename(self.parameter.output_file, self.parameter.input_file)
-            print(f"Output file: {self.parameter.input_file}")
+        do_shell(
+            f'ffmpeg -hide_banner -v warning -y -f concat -safe 0 -i "{concat_list}" -i "{audio_file}" '
+            f'-map 0:v -map 1:a -c copy "{self.parameter.output_file}"'
+        )
+
+    def render_chunks(self, hw_encoder):
+        # the video is encoded in chunks split at the cuts by parallel workers, then joined losslessly.
+        # the audio is rendered in one pass, so there are no encoder delay gaps at the chunk joins.
+        frame_rate = self.parameter.frame_rate
+        render_cache = RenderCache(self.parameter.render_cache_folder, self.parameter.render_cache_size) \
+            if self.parameter.render_cache else None
+        if render_cache:
+            # fixed ranges of the input, a re-run finds the chunks whose cuts didn't change in the cache.
+            chunks = split_fixed_chunks(self.video_edit_config, self.parameter.video_frame_count,
+                                        max(1, int(round(self.parameter.render_chunk_duration * frame_rate))))
         else:
-            print(f"Output file: {self.parameter.output_file}")
+            chunks = split_chunks(self.video_edit_config, self.parameter.video_frame_count,
+                                  self.parameter.encode_workers)
+        workers = self.parameter.encode_workers if self.parameter.parallel_encode else 1
+        extension = self.input_file_name[self.input_file_name.rfind("."):]
+        threads = max(1, (os.cpu_count() or 1) // min(workers, len(chunks)))
+
+        def render_cached(render, name, *settings):
+            # renders into the temp folder, or into the render cache unless the cache already holds the result.
+            if not render_cache:
+                output_file = f"{self.parameter.temp_folder}/{name}{extension}"
+                render(output_file)
+                return output_file
+
+            key = render_cache.get_key(self.parameter.input_file, RENDER_CACHE_VERSION, *settings)
+            cached_file = render_cache.load(key, extension)
+            if cached_file:
+                print(f"Render cache hit: {name}")
+                return cached_file
+            temp_file = render_cache.get_temp_path(key, extension)
+            if render(temp_file) != 0:
+                remove_entry(temp_file)
+                raise RuntimeError(f"Rendering {name} failed. Check the errors before.")
+            return render_cache.store(key, extension, temp_file)
+
+        # the frames after the cuts of every chunk, they're placed from the output frame of their start.
+        cut_ends = [chunk[3] for chunk in chunks[1:]] + [self.get_cut_frame_count()]
+
+        def render_chunk(index, chunk):
+            start, end, video_edit_config, cut_start = chunk
+            output_frame_offset = self.get_output_frame(cut_start)
+            video_filter = self.get_video_filter(video_edit_config, output_frame_offset, (cut_start, cut_ends[index]))
+            frame_count = ''
+            if self.variable_speed:
+                # the last chunk holds its last frame, until the time stretched audio ends.
+                output_end = self.output_video_frame_count if index == len(chunks) - 1 \
+                    else self.get_output_frame(cut_ends[index])
+                frame_count = f'-frames:v {output_end - output_frame_offset} '
+            filter_script = f"{self.parameter.temp_folder}/filter_script{index:04d}.txt"
+            self.write_filter_script(filter_script, video_filter)
+
+            # seek half a frame early, so the first frame of the chunk is not lost to rounding.
+            seek = f'-ss {(start - 0.5) / frame_rate} ' if start > 0 else ''
+            duration = f'-t {(end - start) / frame_rate} ' if end < self.parameter.video_frame_count else ''
+
+            def render(chunk_file):
+                return do_shell(
+                    f'ffmpeg -hide_banner -v warning -thread_queue_size 1024 '
+                    f'-y {seek}{duration}-i "{self.parameter.input_file}" {self.get_section_bar_input()}'
+                    f'-filter_complex_script "{filter_script}" -an {hw_encoder} -threads {threads} -r {frame_rate} '
+                    f'{frame_count}"{chunk_file}"'
+                )
+
+            chunk_file = render_cached(render, f"chunk{index:04d}", start, end, video_filter, hw_encoder, frame_rate,
+                                       frame_count, self.section_bar_hash)
+            if not os.path.exists(chunk_file):
+                raise FileExistsError(f"{chunk_file} is not existing. Check the errors before.")
+            return chunk_file
+
+        def render_audio():
+            audio_filter = self.get_audio_filter()
+            filter_script = f"{self.parameter.temp_folder}/filter_script_audio.txt"
+            self.write_filter_script(filter_script, audio_filter)
+
+            if self.variable_speed and render_cache:
+                # the time stretched audio is only known by its samples.
+                audio_filter = hashlib.sha1(self.output_audio_data[:self.output_sample_count]).hexdigest()
+            return render_cached(lambda audio_file: self.render_audio_track(filter_script, audio_file),
+                                 "audio_track", audio_filter)
+
+        print(f"Rendering {len(chunks)} chunks with {workers} workers.")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            audio_future = executor.submit(profile_utils.propagate(render_audio))
+            chunk_files = list(executor.map(profile_utils.propagate(render_chunk), range(len(chunks)), chunks))
+            audio_file = audio_future.result()
+
+        self.join_video(chunk_files, audio_file)
+        if render_cache:
+            # the chunks of this output were used last, they're evicted last.
+            render_cache.evict()
+
+    def can_smart_render(self):
+        if not self.parameter.smart_render:
+            return False
+        if self.sections:
+            print("Smart render is disabled, the section bar is drawn over every frame.")
+            return False
+        if self.variable_speed:
+            print("Smart render is disabled, the sped up segments are re-timed.")
+            return False
+        if self.parameter.video_codec not in SMART_RENDER_ENCODERS:
+            print(f"Smart render is disabled, {self.parameter.video_codec} can not be re-encoded to match.")
+            return False
+        extension = os.path.splitext(self.parameter.output_file)[1].lower()
+        if extension not in SMART_RENDER_CONTAINERS:
+            print(f"Smart render is disabled, {extension} keeps one set of codec parameters for the whole stream. "
+                  f"Use a .ts or .mkv output.")
+            return False
+        return True
 
+    def get_smart_encoder(self):
+        # the cut GOPs are re-encoded with the profile and level of the input, so a decoder set up for the copied
+        # GOPs can decode them.
+        codec = self.parameter.video_codec
+        encoder = f'-c:v {SMART_RENDER_ENCODERS[codec]} -b:v {int(self.parameter.bit_rate)}k '
+        if self.parameter.pixel_format:
+            encoder += f'-pix_fmt {self.parameter.pixel_format} '
+        profile = SMART_RENDER_PROFILES[codec].get(self.parameter.video_profile)
+        if profile:
+            encoder += f'-profile:v {profile} '
+        level = self.parameter.video_level
+        if level and codec == 'h264':
+            encoder += f'-level:v {level / 10:g} '
+        elif level and codec == 'hevc':
+            encoder += f'-x265-params level-idc={level / 30:g} '
+        return encoder
+
+    def render_smart(self):
+        # the whole GOPs between the cuts are copied, only the partial GOPs at the cuts are re-encoded.
+        # the pieces are MPEG-TS, which repeats the codec parameters in band, so copied and re-encoded pieces join.
+        frame_rate = self.parameter.frame_rate
+        with profile_utils.stage('probe_keyframes'):
+            keyframes = probe_keyframes(self.parameter.input_file, frame_rate)
+        pieces = split_smart_pieces(self.video_edit_config, self.parameter.video_frame_count, keyframes,
+                                    int(math.ceil(SMART_RENDER_MIN_COPY_DURATION * frame_rate)))
+        encoder = self.get_smart_encoder()
+        workers = self.parameter.encode_workers if self.parameter.parallel_encode else 1
+        threads = max(1, (os.cpu_count() or 1) // workers)
+
+        def render_piece(index, piece):
+            start, end, copy = piece
+            piece_file = f"{self.parameter.temp_folder}/piece{index:05d}.ts"
+            if copy:
+                # a stream copy starts at the key frame before the seek position.
+                options = f'-ss {(start + 0.25) / frame_rate} -i "{self.parameter.input_file}" -c:v copy ' \
+                          f'-avoid_negative_ts make_zero'
+            else:
+                # seek half a frame early, so the first frame of the piece is not lost to rounding.
+                seek = f'-ss {(start - 0.5) / frame_rate} ' if start > 0 else ''
+                options = f'{seek}-i "{self.parameter.input_file}" {encoder}-threads {threads} -r {frame_rate}'
+            do_shell(
+                f'ffmpeg -hide_banner -v warning -thread_queue_size 1024 -y {options} '
+                f'-map 0:v:0 -an -frames:v {end - start} "{piece_file}"'
+            )
+            if not os.path.exists(piece_file):
+                raise FileExistsError(f"{piece_file} is not existing. Check the errors before.")
+            return piece_file
+
+        def render_audio():
+            filter_script = f"{self.parameter.temp_folder}/filter_script_audio.txt"
+            self.write_filter_script(filter_script, self.get_audio_filter())
+            extension = self.input_file_name[self.input_file_name.rfind("."):]
+            audio_file = f"{self.parameter.temp_folder}/audio_track{extension}"
+            self.render_audio_track(filter_script, audio_file)
+            return audio_file
+
+        copied_frame_count = sum(end - start for start, end, copy in pieces if copy)
+        print(f"Smart render: {len(pieces)} pieces, {copied_frame_count}/{self.output_video_frame_count} "
+              f"frames copied.")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            audio_future = executor.submit(profile_utils.propagate(render_audio))
+            piece_files = list(executor.map(profile_utils.propagate(render_piece), range(len(pieces)), pieces))
+            audio_file = audio_future.result()
+
+        self.join_video(piece_files, audio_file)
 
-# Deprecated. Will be removed soon.
-class LegacyVideoOutput(BaseOutput):
+    def close(self):
+        super().close()
+        if self.sections:
+            Section.compute_frames(self.sections, self.output_video_frame_count)
+            self.render_section_bar()
+
+        # Use ffmpeg filter to cut videos directly if possible.
+        hw_encoder = self.select_encoder()
+
+        if self.can_smart_render():
+            self.render_smart()
+        elif self.parameter.parallel_encode or self.parameter.render_cache:
+            self.render_chunks(hw_encoder)
+        else:
+            self.render(hw_encoder)
+
+        self.finish_output_file()
+
+
+class LiveSegmentOutput(BaseOutput):
+    """
+    Renders the final segments of an input which is still being written into MPEG-TS chunks of about
+    live_segment_duration seconds, listed by an HLS playlist rewritten after every chunk. Chunks start at segment
+    boundaries, so no cut is split, and one worker renders them in order while the analysis goes on.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-
         if not self.parameter.output_file:
             self.parameter.output_file = os.path.join(
                 self.input_file_dir,
-                f'{self.input_file_name_without_extension}_edited{self.input_file_name[self.input_file_name.rfind("."):]}'
+                f'{self.input_file_name_without_extension}_live.m3u8'
             )
-
+        self.output_dir = os.path.dirname(os.path.abspath(self.parameter.output_file))
+        self.output_name = os.path.splitext(os.path.basename(self.parameter.output_file))[0]
+        self.chunk_frame_count = max(1, int(round(self.parameter.live_segment_duration * self.parameter.frame_rate)))
+
+        # the input frames [chunk_start, chunk_end) of the next chunk, and its final segments as (start_frame,
+        # end_frame, output_start_frame, output_end_frame, removed, speed, output duration) tuples.
+        self.chunk_start = 0
+        self.chunk_end = 0
+        self.chunk_segments = []
+        # the file names and durations of the rendered chunks, in the order of the playlist.
+        self.chunks = []
+        self.chunk_futures = []
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.write_playlist()
+
+    def apply_edit_plan(self, edit_plan: EditPlan):
+        self.append_mappings(edit_plan)
+        # the time stretched audio lengths the live editor placed the segments by.
+        output_durations = edit_plan.get_stretched_lengths(self.parameter.samples_per_frame,
+                                                           self.parameter.audio_sample_count) \
+            / self.parameter.audio_sample_rate
+        for segment in zip(edit_plan.start_frames.tolist(), edit_plan.end_frames.tolist(),
+                           edit_plan.output_start_frames.tolist(), edit_plan.output_end_frames.tolist(),
+                           edit_plan.is_removed.tolist(), edit_plan.speeds.tolist(), output_durations.tolist()):
+            self.chunk_segments.append(segment)
+            self.chunk_end = segment[1]
+            if self.chunk_end - self.chunk_start >= self.chunk_frame_count:
+                self.submit_chunk()
+
+    def submit_chunk(self):
+        # chunks removed as a whole have nothing to play, the chunks after them are still placed by the mapping.
+        if not all(segment[4] for segment in self.chunk_segments):
+            self.chunk_futures.append(self.executor.submit(
+                profile_utils.propagate(self.render_chunk), len(self.chunk_futures), self.chunk_start, self.chunk_end, self.chunk_segments))
+        self.chunk_start = self.chunk_end
+        self.chunk_segments = []
+
+    @staticmethod
+    def needs_retime(segments):
+        # whether the plain cut misses any output frame of the mapping, like sped up segments which are not removed.
+        return any(output_end - output_start != (0 if removed else end - start)
+                   for start, end, output_start, output_end, removed, _, _ in segments)
+
+    def get_chunk_filters(self, start, end, segments, seek, duration):
+        """
+        Returns the filters of the chunk of the input frames [start, end), seeked to frame start. Like
+        DirectVideoOutput, the removed input frames of a segment are [start_frame + 1, end_frame], so the chunk owns
+        its frames [start + 1, end + 1) and leaves its first frame to the chunk before. Sped up segments are re-timed
+        to their output frames in the mapping, with their audio time stretched by atempo.
+        """
+        frame_rate = self.parameter.frame_rate
+        removed_segments = [(a, b) for a, b, _, _, removed, _, _ in segments if removed]
+        # frames by their index in the chunk, and audio by its time since the seek.
+        video_removals = ([(0, 0)] if start > 0 else []) + [(a + 1 - start, b - start) for a, b in removed_segments] \
+            + [(end + 1 - start, end + 1 - start)]
+        video_removal = get_removal_expression('n', video_removals, self.parameter.cut_backend)
+
+        if not self.needs_retime(segments):
+            audio_removals = ([(0, (start + 1) / frame_rate - seek)] if start > 0 else []) \
+                + [((a + 1) / frame_rate - seek, (b + 1) / frame_rate - seek) for a, b in removed_segments] \
+                + [((end + 1) / frame_rate - seek, duration)]
+            audio_removal = get_removal_expression('t', audio_removals, self.parameter.cut_backend)
+            audio_filter = f"aselect='not(\n{audio_removal})', asetpts=N/SR/TB"
+            video_filter = f"select='not(\n{video_removal})',setpts=N/FR/TB"
+        else:
+            kept_segments = [segment for segment in segments if not segment[4]]
+            cut_lengths = np.array([b - a for a, b, *_ in kept_segments], dtype=np.int64)
+            retime = get_retime_expression('N', np.cumsum(cut_lengths) - cut_lengths,
+                                           [segment[2] - segments[0][2] for segment in kept_segments],
+                                           [(segment[3] - segment[2]) / max(1, segment[1] - segment[0])
+                                            for segment in kept_segments])
+            video_filter = DirectVideoOutput.get_retime_filter(video_removal, retime, frame_rate)
+            audio_filter = self.get_stretched_audio_filter(segments, seek)
+
+        if self.parameter.audio_only:
+            return [audio_filter]
+        return [video_filter, audio_filter]
+
+    def get_stretched_audio_filter(self, segments, seek):
+        # every segment is trimmed, time stretched and padded to the length it has in the mapping, then concatenated.
+        # the removed segments only leave silence, if anything.
+        frame_rate = self.parameter.frame_rate
+        pieces = []
+        for start, end, _, _, removed, speed, output_duration in segments:
+            if output_duration <= 0:
+                continue
+            stretch = 'volume=0' if removed else get_atempo_filters(speed)
+            pieces.append(f"atrim=start={start / frame_rate - seek}:end={end / frame_rate - seek},"
+                          f"asetpts=PTS-STARTPTS,{stretch + ',' if stretch else ''}"
+                          f"apad,atrim=duration={output_duration}")
+        if len(pieces) == 1:
+            return f"[0:a]{pieces[0]}"
+
+        labels = [f"[s{index}]" for index in range(len(pieces))]
+        return (f"[0:a]asplit={len(pieces)}{''.join(labels)}; \n"
+                + "".join(f"{label}{piece}[p{index}]; \n" for index, (label, piece) in enumerate(zip(labels, pieces)))
+                + "".join(f"[p{index}]" for index in range(len(pieces))) + f"concat=n={len(pieces)}:v=0:a=1")
+
+    def render_chunk(self, index, start, end, segments):
+        frame_rate = self.parameter.frame_rate
+        # seek half a frame early, so the first frame of the chunk is not lost to rounding. the chunk reads one frame
+        # past its end, its last frame is end when the last segment is kept.
+        seek = max(0.0, (start - 0.5) / frame_rate)
+        duration = (end + 1.5) / frame_rate - seek
+        filter_script = f"{self.parameter.temp_folder}/live_filter_script{index:05d}.txt"
+        DirectVideoOutput.write_filter_script(filter_script,
+                                              *self.get_chunk_filters(start, end, segments, seek, duration))
+
+        # the chunk plays the output frames of its segments in the mapping.
+        output_start, frame_count = segments[0][2], segments[-1][3] - segments[0][2]
+        chunk_name = f"{self.output_name}_{index:05d}.ts"
+        chunk_file = os.path.join(self.output_dir, chunk_name)
+        video_codec = '' if self.parameter.audio_only else f'-c:v libx264 -r {frame_rate} -frames:v {frame_count} '
+        # the timestamps of the chunks continue each other, as HLS players expect.
         do_shell(
-            f'ffmpeg -hide_banner -i "{self.parameter.input_file}" -qscale:v {str(self.parameter.frame_quality)} "{self.parameter.temp_folder}/frame%06d.jpg" -hide_banner')
-
-        self.last_existing_frame = None
-        self.output_audio_data = np.zeros((0, self.parameter.audio_data.shape[1]))
-
-    def apply_edit_point(self, edit_point: EditPoint, audio_data, start_output_frame, end_output_frame):
-        super().apply_edit_point(edit_point, audio_data, start_output_frame, end_output_frame)
-
-        self.output_audio_data = np.concatenate(
-            (self.output_audio_data, audio_data / self.parameter.max_audio_volume))
-
-        for outputFrame in range(start_output_frame, end_output_frame):
-            input_frame = int(
-                edit_point.start_frame + self.parameter.new_speed[int(edit_point.should_keep)] * (
-                            outputFrame - start_output_frame))
-            did_it_work = self.copy_frame(input_frame, outputFrame)
-            if did_it_work:
-                self.last_existing_frame = input_frame
-            else:
-                self.copy_frame(self.last_existing_frame, outputFrame)
-
-    def copy_frame(self, input_frame, output_frame):
-        src = f"{self.parameter.temp_folder}/frame{input_frame + 1:06d}.jpg"
-        dst = f"{self.parameter.temp_folder}/newFrame{output_frame + 1:06d}.jpg"
-        if not os.path.isfile(src):
-            return False
-        copyfile(src, dst)
-        if output_frame % 20 == 19:
-            print(str(output_frame + 1) + " time-altered frames saved.")
-        return True
+            f'ffmpeg -hide_banner -v warning -y -ss {seek} -t {duration} '
+            f'-i "{self.parameter.input_file}" -filter_complex_script "{filter_script}" {video_codec}-c:a aac '
+            f'-output_ts_offset {output_start / frame_rate} -f mpegts "{chunk_file}"'
+        )
+        if not os.path.exists(chunk_file):
+            raise FileExistsError(f"{chunk_file} is not existing. Check the errors before.")
+
+        self.chunks.append((chunk_name, frame_count / frame_rate))
+        self.write_playlist()
+
+    def write_playlist(self, complete=False):
+        target_duration = math.ceil(max([self.parameter.live_segment_duration]
+                                        + [duration for _, duration in self.chunks]))
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{target_duration}',
+                 '#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:EVENT']
+        for chunk_name, duration in self.chunks:
+            lines += [f'#EXTINF:{duration:.3f},', chunk_name]
+        if complete:
+            lines.append('#EXT-X-ENDLIST')
+
+        # written aside then renamed, so players polling the playlist never read a partial one.
+        playlist_file = f"{self.parameter.output_file}.tmp"
+        with open(playlist_file, "w", encoding='utf-8') as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(playlist_file, self.parameter.output_file)
 
     def close(self):
-        super().close()
-        wavfile.write(f'{self.parameter.temp_folder}/audioNew.wav', self.parameter.sample_rate, self.output_audio_data)
-
-        do_shell(
-            f'ffmpeg -hide_banner -thread_queue_size 1024 -framerate {str(self.parameter.frame_rate)} '
-            f'-i "{self.parameter.temp_folder}/newFrame%06d.jpg" -i "{self.parameter.temp_folder}/audioNew.wav" -strict -2 "{self.parameter.output_file}"'
-        )
+        if self.chunk_end > self.chunk_start:
+            self.submit_chunk()
+        self.executor.shutdown(wait=True)
+        for future in self.chunk_futures:
+            future.result()
+        self.write_playlist(complete=True)
+        print(f"Output file: {self.parameter.output_file}")
@@ -1,11 +1,27 @@
 from functools import reduce
 import re
 
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
 from timecode import Timecode
 
-from editor.edit_point import EditPoint
 from utils.timecode_utils import format_timecode
 
+# the height in pixels of the section bar at the bottom of the video.
+SECTION_BAR_HEIGHT = 50
+SECTION_FONT_SIZE = 24
+# Microsoft YaHei first, like the font of the drawtext filter, then fonts which are common elsewhere.
+SECTION_FONTS = ['msyh.ttc', 'msyh.ttf', 'PingFang.ttc', 'NotoSansCJK-Regular.ttc', 'DejaVuSans.ttf']
+
+
+def load_section_font():
+    for font in SECTION_FONTS:
+        try:
+            return ImageFont.truetype(font, SECTION_FONT_SIZE)
+        except OSError:
+            continue
+    return ImageFont.load_default(SECTION_FONT_SIZE)
+
 
 class Section:
 
@@ -16,12 +32,6 @@ class Section:
 
         self.edit_offset = 0
 
-    def apply_edit_point(self, edit_point: EditPoint):
-        if edit_point.end_frame < self.start_frame:
-            self.edit_offset -= edit_point.end_frame - edit_point.start_frame
-        elif edit_point.start_frame < self.start_frame:
-            self.edit_offset -= self.start_frame - edit_point.start_frame
-
     @property
     def frame_count(self):
         return self.end_frame - self.start_frame
@@ -41,6 +51,30 @@ class Section:
 
         return list(map(parse_section, text.splitlines(keepends=False)))
 
+    @staticmethod
+    def apply_edits(sections: list['Section'], start_frames, end_frames, output_frame_counts):
+        """
+        Shifts the sections by the frames the edits remove before them, for all sections at once.
+        The segments [start_frames, end_frames) must be sorted and contiguous, each one is played in
+        output_frame_counts frames: 0 when it's removed, fewer than its length when it's sped up.
+        """
+        if not sections or not len(start_frames):
+            return
+        start_frames = np.asarray(start_frames, dtype=np.int64)
+        frame_counts = np.asarray(end_frames, dtype=np.int64) - start_frames
+        output_frame_counts = np.asarray(output_frame_counts, dtype=np.int64)
+        removed_before = np.concatenate(([0], np.cumsum(frame_counts - output_frame_counts)))
+
+        section_starts = np.array([section.start_frame for section in sections], dtype=np.int64)
+        # the segment of every section start, the start is moved proportionally within it.
+        segments = np.maximum(np.searchsorted(start_frames, section_starts, side='right') - 1, 0)
+        into_segment = np.clip(section_starts - start_frames[segments], 0, frame_counts[segments])
+        into_output = into_segment * output_frame_counts[segments] // np.maximum(frame_counts[segments], 1)
+        edit_offsets = removed_before[segments] + into_segment - into_output
+
+        for section, edit_offset in zip(sections, edit_offsets.tolist()):
+            section.edit_offset -= edit_offset
+
     @staticmethod
     def compute_frames(sections: list['Section'], total_frame_count: int):
         if not sections:
@@ -59,3 +93,23 @@ class Section:
         reduce(apply_end_frame, map(lambda s: consume_edit(s), sections))
         # include the last frame.
         sections[-1].end_frame = total_frame_count + 1
+
+    @staticmethod
+    def render_bar(sections: list['Section'], width: int, total_frame_count: int, path: str):
+        """
+        Draws the boxes and titles of the sections once into a transparent image as wide as the video,
+        so the video is overlaid with one image instead of filtering every frame by every section.
+        """
+        boxes = Image.new('RGBA', (width, SECTION_BAR_HEIGHT), (0, 0, 0, 0))
+        titles = Image.new('RGBA', boxes.size, (0, 0, 0, 0))
+        box_draw, title_draw = ImageDraw.Draw(boxes), ImageDraw.Draw(titles)
+        font = load_section_font()
+        for section in sections:
+            x = section.start_frame * width / total_frame_count
+            w = section.frame_count * width / total_frame_count
+            box_draw.rectangle((round(x), 0, round(x + w - 1) - 1, SECTION_BAR_HEIGHT - 1),
+                               fill=(0x00, 0x00, 0x55, 0x55))
+            left, top, right, bottom = title_draw.textbbox((0, 0), section.title, font=font)
+            title_draw.text((x + (w - (right - left)) / 2 - left, (SECTION_BAR_HEIGHT - (bottom - top)) / 2 - top),
+                            section.title, font=font, fill=(0xff, 0xff, 0xff, 0xff))
+        Image.alpha_composite(boxes, titles).save(path)
@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+
+# thresholds evaluated at once, bounds the memory of the (thresholds x frames) masks.
+SWEEP_BLOCK_SIZE = 16
+# kept segments shorter than this (in seconds) are counted as short, they usually look jumpy.
+SHORT_SEGMENT_DURATION = 0.5
+MIN_VOLUME = 1e-4
+
+
+def get_output_lengths(lengths, speed):
+    # runs shorter than 2 output frames are cut off, like EditPlan.is_removed.
+    output_lengths = lengths / speed
+    return output_lengths[output_lengths >= 2]
+
+
+class SweepResult:
+    def __init__(self, threshold, frame_margin, frame_count, kept_frame_count, kept_lengths, silent_lengths, new_speed,
+                 frame_rate):
+        self.threshold = threshold
+        self.frame_margin = frame_margin
+        self.kept_frame_count = kept_frame_count
+        # the silent runs are sped up rather than cut, unless the silent speed leaves them shorter than 2 frames.
+        silent_output_lengths = get_output_lengths(silent_lengths, new_speed[0])
+        output_frame_count = float(np.sum(get_output_lengths(kept_lengths, new_speed[1]))
+                                   + np.sum(silent_output_lengths))
+        self.kept_ratio = output_frame_count / frame_count if frame_count else 0
+        self.kept_duration = output_frame_count / frame_rate
+        self.segment_count = kept_lengths.shape[0]
+        self.cut_count = silent_lengths.shape[0] - silent_output_lengths.shape[0]
+        self.shortest_segment = kept_lengths.min() / frame_rate if self.segment_count else 0
+        self.average_segment = kept_lengths.mean() / frame_rate if self.segment_count else 0
+        self.short_segment_count = int(np.count_nonzero(kept_lengths < SHORT_SEGMENT_DURATION * frame_rate))
+
+
+def dilate_rows(has_loud_audio, frame_margin):
+    # the same sliding window max as loudness.dilate_frames, applied to every row at once.
+    frame_count = has_loud_audio.shape[1]
+    loud_count = np.zeros((has_loud_audio.shape[0], frame_count + 1), dtype=np.int32)
+    np.cumsum(has_loud_audio, axis=1, out=loud_count[:, 1:])
+    indices = np.arange(frame_count)
+    window_start = np.maximum(indices - int(math.ceil(frame_margin)), 0)
+    window_end = np.minimum(indices + 1 + int(math.floor(frame_margin)), frame_count)
+    return loud_count[:, window_end] > loud_count[:, window_start]
+
+
+def get_run_lengths(should_include_frame):
+    # lengths of the runs of true values of every row.
+    padded = np.pad(should_include_frame.astype(np.int8), ((0, 0), (1, 1)))
+    flips = np.diff(padded, axis=1)
+    start_rows, start_columns = np.nonzero(flips == 1)
+    _, end_columns = np.nonzero(flips == -1)
+    lengths = end_columns - start_columns
+    row_ends = np.searchsorted(start_rows, np.arange(should_include_frame.shape[0] + 1))
+    return [lengths[row_ends[i]:row_ends[i + 1]] for i in range(should_include_frame.shape[0])]
+
+
+def sweep(frame_volumes, thresholds, frame_margins, frame_rate, keep_frames_from_start=0, keep_frames_from_end=0,
+          new_speed=(math.inf, 1)):
+    """
+    Evaluates every (threshold, frame_margin) pair over one normalized loudness envelope, without rendering.
+    new_speed is [silent speed, sounded speed], like InputParameter.new_speed, the silence is cut by default.
+    Returns the SweepResult of every pair, ordered by threshold then frame_margin.
+    """
+    frame_count = frame_volumes.shape[0]
+    keep_start = max(0, int(keep_frames_from_start))
+    cut_end = max(0, frame_count - int(keep_frames_from_end))
+
+    results = []
+    for block_start in range(0, len(thresholds), SWEEP_BLOCK_SIZE):
+        block_thresholds = np.asarray(thresholds[block_start:block_start + SWEEP_BLOCK_SIZE], dtype=np.float64)
+        has_loud_audio = frame_volumes[np.newaxis, :] >= block_thresholds[:, np.newaxis]
+        has_loud_audio[:, :keep_start] = True
+        has_loud_audio[:, cut_end:] = True
+
+        for frame_margin in frame_margins:
+            should_include_frame = dilate_rows(has_loud_audio, frame_margin)
+            kept_frame_counts = np.count_nonzero(should_include_frame, axis=1)
+            for threshold, kept_frame_count, kept_lengths, silent_lengths in zip(
+                    block_thresholds, kept_frame_counts, get_run_lengths(should_include_frame),
+                    get_run_lengths(~should_include_frame)):
+                results.append(SweepResult(float(threshold), frame_margin, frame_count, int(kept_frame_count),
+                                           kept_lengths, silent_lengths, new_speed, frame_rate))
+
+    results.sort(key=lambda result: (result.threshold, result.frame_margin))
+    return results
+
+
+def suggest_threshold(frame_volumes, noise_percentile=10, speech_percentile=90):
+    """
+    Suggests a silent threshold from the noise floor of a normalized loudness envelope.
+    The threshold is placed a third of the way from the noise floor to the speech level, in decibels.
+    """
+    if frame_volumes.shape[0] == 0:
+        return 0.0
+
+    # digital silence is counted as the quietest volume, -80dB.
+    volumes = np.maximum(frame_volumes, MIN_VOLUME)
+    noise_floor = np.log10(np.percentile(volumes, noise_percentile))
+    speech_level = np.log10(np.percentile(volumes, speech_percentile))
+    return float(10 ** (noise_floor + (speech_level - noise_floor) / 3))
+
+
+def print_sweep_results(results):
+    print(f"{'threshold':>10} {'margin':>6} {'output':>10} {'out %':>7} {'cuts':>6} "
+          f"{'shortest':>9} {'average':>8} {'short':>6}")
+    for result in results:
+        print(f"{result.threshold:10.4f} {result.frame_margin:6g} {result.kept_duration:9.1f}s "
+              f"{result.kept_ratio * 100:6.1f}% {result.cut_count:6d} {result.shortest_segment:8.2f}s "
+              f"{result.average_segment:7.2f}s {result.short_segment_count:6d}")
@@ -0,0 +1,117 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+from audiotsm import phasevocoder
+from audiotsm.io.array import ArrayReader, ArrayWriter
+
+TIME_STRETCH_PHASEVOCODER = 'phasevocoder'
+TIME_STRETCH_WSOLA = 'wsola'
+TIME_STRETCH_RESAMPLE = 'resample'
+TIME_STRETCH_BACKENDS = [TIME_STRETCH_PHASEVOCODER, TIME_STRETCH_WSOLA, TIME_STRETCH_RESAMPLE]
+
+
+class TimeStretcher(ABC):
+    """
+    Changes the speed of audio chunks of shape (samples, channels), keeping the pitch when the backend can.
+    Returns float32 arrays of the same shape.
+    """
+
+    @abstractmethod
+    def stretch(self, audio_chunk, speed):
+        pass
+
+
+class PhaseVocoderStretcher(TimeStretcher):
+    # the best quality, and the slowest.
+
+    def stretch(self, audio_chunk, speed):
+        channels = audio_chunk.shape[1]
+        # a fresh phase vocoder for every chunk. clear() keeps the input samples left to skip, which carry into the
+        # next chunk when the analysis hop is longer than the frame, at speeds above 4.
+        tsm = phasevocoder(channels, speed=speed)
+
+        # need channels * frames, transpose data first.
+        reader = ArrayReader(np.transpose(audio_chunk))
+        writer = ArrayWriter(channels)
+        tsm.run(reader, writer)
+        return np.transpose(writer.data)
+
+
+class WsolaStretcher(TimeStretcher):
+    """
+    Waveform similarity overlap-add. Every output frame is taken from around its nominal input position, at the
+    offset which best continues the previous frame. Only the synthesis is vectorized over all frames: every frame
+    is searched for against the frame aligned before it, so the offset search loops over the frames in python,
+    with the candidate offsets of one frame correlated at once on a decimated mono signal.
+    """
+
+    def __init__(self, frame_length=1024, tolerance=256, search_step=4):
+        self.frame_length = frame_length
+        self.hop = frame_length // 2
+        self.tolerance = tolerance
+        self.search_step = search_step
+        # a periodic hann window, the windows of frames half a frame apart sum to 1.
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_length) / frame_length)).astype(np.float32)
+
+    def align(self, mono, positions):
+        # the offsets depend on each other, so the frames are searched one by one. each step correlates all the
+        # candidate offsets of a frame in one product.
+        hop, tolerance = self.hop, self.tolerance
+        windows = np.lib.stride_tricks.sliding_window_view(mono, hop)[:, ::self.search_step]
+        aligned_positions = positions.copy()
+        for k in range(1, positions.shape[0]):
+            continuation = aligned_positions[k - 1] + hop
+            template = mono[continuation:continuation + hop:self.search_step]
+            position = positions[k]
+            correlation = windows[position - tolerance:position + tolerance + 1] @ template
+            aligned_positions[k] = position - tolerance + int(np.argmax(correlation))
+        return aligned_positions
+
+    def stretch(self, audio_chunk, speed):
+        sample_count, channels = audio_chunk.shape
+        hop = self.hop
+        output_length = int(sample_count / speed)
+        frame_count = output_length // hop + 2
+        padding = self.frame_length + self.tolerance + int(np.ceil(hop * speed))
+        audio = np.zeros((sample_count + 2 * padding, channels), dtype=np.float32)
+        audio[padding:padding + sample_count] = audio_chunk
+        mono = audio.mean(axis=1)
+
+        # frame k is centered on output sample k * hop, its nominal input position is k * hop * speed.
+        positions = padding + np.round(np.arange(frame_count) * hop * speed).astype(np.int64) - hop
+        aligned_positions = self.align(mono, positions)
+        frames = audio[aligned_positions[:, np.newaxis] + np.arange(self.frame_length)] * self.window[:, np.newaxis]
+
+        # frames are half a frame apart, so every hop of the output is the sum of two frame halves.
+        output = np.zeros(((frame_count + 1) * hop, channels), dtype=np.float32)
+        output[:frame_count * hop] += frames[:, :hop].reshape(-1, channels)
+        output[hop:] += frames[:, hop:].reshape(-1, channels)
+
+        # frame 0 is centered on output sample 0, the output starts at its center.
+        return output[hop:hop + output_length]
+
+
+class ResampleStretcher(TimeStretcher):
+    # linear interpolation, the pitch changes with the speed. it's meant for fast, barely audible segments.
+
+    def stretch(self, audio_chunk, speed):
+        sample_count, channels = audio_chunk.shape
+        output_length = int(sample_count / speed)
+        positions = np.arange(output_length) * speed
+        output = np.empty((output_length, channels), dtype=np.float32)
+        for channel in range(channels):
+            output[:, channel] = np.interp(positions, np.arange(sample_count), audio_chunk[:, channel])
+        return output
+
+
+TIME_STRETCHERS = {
+    TIME_STRETCH_PHASEVOCODER: PhaseVocoderStretcher,
+    TIME_STRETCH_WSOLA: WsolaStretcher,
+    TIME_STRETCH_RESAMPLE: ResampleStretcher,
+}
+
+
+def get_time_stretcher(backend):
+    if backend not in TIME_STRETCHERS:
+        raise ValueError(f"Unknown time stretch backend: {backend}")
+    return TIME_STRETCHERS[backend]()
@@ -1,43 +1,120 @@
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor
 
 from editor.editor import Editor
+from editor.live import LiveEditor
 from parameters import InputParameter
 import argparse
 import os
 
 
+class JobResult:
+
+    def __init__(self, input_file, output_file):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.input_size = os.path.getsize(input_file) if input_file and os.path.isfile(input_file) else 0
+        self.duration = 0
+        self.elapsed = 0
+        self.error = None
+
+    @property
+    def succeeded(self):
+        return self.error is None
+
+
 def execute(*args, input_file, **kwargs):
+    result = JobResult(input_file, kwargs.get('output_file'))
+    start_time = time.perf_counter()
     try:
         with InputParameter(*args, input_file=input_file, **kwargs) as parameter:
-            editor = Editor(parameter)
-            editor.execute()
+            result.input_file = parameter.input_file
+            result.duration = parameter.duration
+            if parameter.follow:
+                LiveEditor(parameter).execute()
+                result.duration = parameter.duration
+            else:
+                editor = Editor(parameter)
+                if parameter.output_type == 'sweep':
+                    editor.sweep()
+                else:
+                    editor.execute()
+            result.output_file = parameter.output_file
     except Exception as e:
-        print(f"Error process file {input_file} with exception: {e}")
+        print(f"Error process file {result.input_file} with exception: {e}")
+        result.error = f"{type(e).__name__}: {e}"
         # traceback.print_exc()
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+
+def execute_batch(args, input_files, output_files, jobs, temp_folder=None, profile=None, **kwargs):
+    jobs_kwargs = []
+    for index, (input_file, output_file) in enumerate(zip(input_files, output_files)):
+        job_kwargs = dict(kwargs, input_file=input_file, output_file=output_file)
+        if temp_folder:
+            # jobs must never share a temp folder, it's deleted when a job finishes.
+            os.makedirs(temp_folder, exist_ok=True)
+            job_kwargs['temp_folder'] = os.path.join(temp_folder, f'job{index:04d}')
+        if profile:
+            # one report per job, named after the profile file.
+            profile_name, profile_extension = os.path.splitext(profile)
+            job_kwargs['profile'] = f'{profile_name}.job{index:04d}{profile_extension}'
+        jobs_kwargs.append(job_kwargs)
+
+    start_time = time.perf_counter()
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(execute, args, **job_kwargs) for job_kwargs in jobs_kwargs]
+            results = [future.result() for future in futures]
+    else:
+        results = [execute(args, **job_kwargs) for job_kwargs in jobs_kwargs]
+
+    print_summary(results, time.perf_counter() - start_time, jobs)
+    return results
+
+
+def print_summary(results, elapsed, jobs):
+    failed_results = [result for result in results if not result.succeeded]
+    media_duration = sum(result.duration for result in results if result.succeeded)
+    input_size = sum(result.input_size for result in results)
+
+    print(f"\nProcessed {len(results)} files with {jobs} jobs in {elapsed:.1f}s: "
+          f"{len(results) - len(failed_results)} succeeded, {len(failed_results)} failed.")
+    if elapsed > 0:
+        print(f"Throughput: {len(results) * 60 / elapsed:.1f} files/min, "
+              f"{media_duration / elapsed:.1f}x realtime, {input_size / 1024 / 1024 / elapsed:.1f} MB/s.")
+    for result in failed_results:
+        print(f"Failed: {result.input_file}: {result.error}")
 
 
-def main(*args, input_file=None, output_file=None, **kwargs):
+def main(*args, input_file=None, output_file=None, jobs=None, **kwargs):
     parser = argparse.ArgumentParser()
     parser.add_argument('--input_file', type=str)
     parser.add_argument('--output_file', type=str)
+    parser.add_argument('--temp_folder', type=str)
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--profile', type=str)
     parsed_args, _ = parser.parse_known_args()
     input_dir: str = input_file or parsed_args.input_file
     output_dir: str = output_file or parsed_args.output_file
 
     if input_dir and os.path.isdir(input_dir):
-        input_file_names = filter(lambda f: os.path.isfile(f), os.listdir(input_dir))
-        input_files = list(map(lambda f: os.path.join(input_dir, f), input_file_names))
+        input_file_names = [f for f in sorted(os.listdir(input_dir)) if os.path.isfile(os.path.join(input_dir, f))]
+        input_files = [os.path.join(input_dir, f) for f in input_file_names]
 
         if output_dir and os.path.isdir(output_dir):
-            output_files = map(lambda f: os.path.join(output_dir, f), input_file_names)
+            output_files = [os.path.join(output_dir, f) for f in input_file_names]
         else:
             output_files = [None] * len(input_files)
 
-        for input_file, output_file in zip(input_files, output_files):
-            execute(args, input_file=input_file, output_file=output_file, **kwargs)
+        kwargs.setdefault('temp_folder', parsed_args.temp_folder)
+        kwargs.setdefault('profile', parsed_args.profile)
+        return execute_batch(args, input_files, output_files, jobs or parsed_args.jobs, **kwargs)
 
     else:
-        execute(args, input_file=input_file, output_file=output_file, **kwargs)
+        return execute(args, input_file=input_file, output_file=output_file, **kwargs)
 
 
 if __name__ == '__main__':
@@ -1,17 +1,36 @@
 import argparse
 import datetime
-import json
-import math
 import os.path
-import re
+import sys
 import tempfile
+import threading
+import time
 
 import numpy as np
 from scipy.io import wavfile
-from timecode import Timecode
 
-from utils import io_utils
-from utils.shell_utils import do_shell, STRING
+from editor.filters import CUT_BACKEND_TREE, CUT_BACKENDS
+from editor.loudness import FramePeakAccumulator, get_frame_peaks
+from editor.time_stretch import TIME_STRETCH_BACKENDS, TIME_STRETCH_PHASEVOCODER
+from utils import io_utils, profile_utils
+from utils.cache_utils import AnalysisCache, DEFAULT_CACHE_SIZE, DEFAULT_RENDER_CACHE_SIZE
+from utils.probe_utils import probe_media
+from utils.shell_utils import do_shell, open_shell, wait_shell
+
+# samples per channel read from the ffmpeg pipe at a time when streaming audio.
+AUDIO_STREAM_BLOCK_SIZE = 1 << 16
+# a followed input is probed once it holds this many bytes, or once it stopped growing.
+LIVE_PROBE_SIZE = 1 << 20
+LIVE_PIPE_BLOCK_SIZE = 1 << 16
+
+# the results of __enter__ which are stored in the analysis cache.
+CACHED_ATTRIBUTES = [
+    'duration', 'video_frame_count', 'video_width', 'video_height', 'video_codec', 'pixel_format', 'video_profile',
+    'video_level', 'audio_only', 'bit_rate', 'frame_rate', 'chapters', 'audio_sample_rate', 'audio_sample_count',
+    'max_audio_volume'
+]
+# changes whenever the cached attributes are computed differently.
+ANALYSIS_CACHE_VERSION = 2
 
 
 def get_max_volume(s):
@@ -20,15 +39,21 @@ def get_max_volume(s):
     return max(max_value, -min_value)
 
 
+def parse_floats(text):
+    return [float(value) for value in text.split(',') if value.strip()] if text else None
+
+
 class InputParameter:
 
     def __init__(self, *args,
+                 argv=None,
                  input_file=None,
                  input_sections=None,
                  url=None,
                  output_type=None,
                  output_file=None,
                  mapping=None,
+                 mapping_index=None,
                  silent_threshold=None,
                  sounded_speed=None,
                  silent_speed=None,
@@ -40,7 +65,35 @@ class InputParameter:
                  temp_folder=None,
                  keep_start=None,
                  keep_end=None,
-                 use_hardware_acc=None):
+                 use_hardware_acc=None,
+                 stream_audio=None,
+                 cut_backend=None,
+                 parallel_encode=None,
+                 encode_workers=None,
+                 analysis_cache=None,
+                 clear_cache=None,
+                 cache_folder=None,
+                 cache_size=None,
+                 sweep_thresholds=None,
+                 sweep_margins=None,
+                 profile=None,
+                 profile_python=None,
+                 mmap_audio=None,
+                 analysis_sample_rate=None,
+                 sounded_stretch=None,
+                 silent_stretch=None,
+                 resample_speed=None,
+                 follow=None,
+                 live_segment_duration=None,
+                 live_timeout=None,
+                 render_cache=None,
+                 render_cache_folder=None,
+                 render_cache_size=None,
+                 render_chunk_duration=None,
+                 smart_render=None,
+                 stretch_workers=None,
+                 cache=None,
+                 progress_callback=None):
 
         parser = argparse.ArgumentParser(
             description='Modifies a video file to play at different speeds '
@@ -51,7 +104,8 @@ class InputParameter:
             help='The file contains video sections information. '
                  'Each section contains a start time and a title like "00:12 section 1" separated by new lines.'
         )
-        parser.add_argument('--output_type', type=str, default="video", help='output type: video, edl')
+        parser.add_argument('--output_type', type=str, default="video", help='output type: video, edl, sweep. '
+                                 'sweep only reports the kept duration and cuts of many thresholds and margins.')
         parser.add_argument('--url', type=str, help='A youtube url to download and process')
         parser.add_argument('--output_file', type=str, default="",
                             help="the output file. "
@@ -59,6 +113,9 @@ class InputParameter:
         parser.add_argument('--mapping', type=str, default="",
                             help="Time mapping should be applied to the input file."
                                  "(optional)")
+        parser.add_argument('--mapping_index', type=str, default="",
+                            help="Also write the time mapping as an indexed npz file, which remap.py reads to remap "
+                                 "subtitles, sections and timestamps in bulk. (optional)")
         parser.add_argument('--silent_threshold', type=float, default=0.03,
                             help='the volume amount that frames\' audio needs to surpass to be consider "sounded". '
                                  'It ranges from 0 (silence) to 1 (max volume)')
@@ -66,6 +123,20 @@ class InputParameter:
                             help="the speed that sounded (spoken) frames should be played at. Typically 1.")
         parser.add_argument('--silent_speed', type=float, default=5.00,
                             help="the speed that silent frames should be played at. 999999 for jumpcutting.")
+        parser.add_argument('--sounded_stretch', type=str, default=TIME_STRETCH_PHASEVOCODER,
+                            choices=TIME_STRETCH_BACKENDS,
+                            help="How the speed of sounded audio is changed. phasevocoder: the best quality. "
+                                 "wsola: several times faster, keeps the pitch. only its synthesis is vectorized, "
+                                 "the search for the offset of every frame is still a loop in python. resample: the "
+                                 "fastest, changes the pitch.")
+        parser.add_argument('--silent_stretch', type=str, default=TIME_STRETCH_PHASEVOCODER,
+                            choices=TIME_STRETCH_BACKENDS, help="How the speed of silent audio is changed.")
+        parser.add_argument('--resample_speed', type=float, default=0,
+                            help="Segments at this speed or faster are always resampled, the quality of such fast "
+                                 "audio barely matters. 0 to disable.")
+        parser.add_argument('--stretch_workers', type=int, default=os.cpu_count() or 1,
+                            help="Count of the threads time stretching the audio segments. 1 stretches them one "
+                                 "after another.")
         parser.add_argument('--frame_margin', type=float, default=1,
                             help="some silent frames adjacent to sounded frames are included to provide context. "
                                  "How many frames on either the side of speech should be included? "
@@ -77,19 +148,84 @@ class InputParameter:
         parser.add_argument('--bit_rate', type=float, default=1000,
                             help="bit rate of the input and output videos. optional. Default 1000kbps")
         parser.add_argument('--frame_quality', type=int, default=3,
-                            help="quality of frames to be extracted from input video. "
-                                 "1 is highest, 31 is lowest, 3 is the default.")
+                            help="Unused, the video is no longer extracted to image files.")
         parser.add_argument('--temp_folder', type=str,
                             help="temp folder for intermediates process.")
 
+        parser.add_argument('--analysis_cache', type=int, default=0,
+                            help="Cache the probed metadata and the loudness of the input files in --cache_folder, "
+                                 "so re-running a file with other settings skips decoding. Off by default.")
+        parser.add_argument('--clear_cache', type=int, default=0,
+                            help="Clear the analysis cache before processing.")
+        parser.add_argument('--cache_folder', type=str,
+                            help="Folder of the analysis cache. Defaults to ~/.cache/jumpcutter.")
+        parser.add_argument('--cache_size', type=float, default=DEFAULT_CACHE_SIZE,
+                            help="Max size of the analysis cache in MB, least recently used entries are evicted.")
+        parser.add_argument('--sweep_thresholds', type=str,
+                            help="Comma separated silent thresholds evaluated by the sweep output type. "
+                                 "Defaults to the values around the suggested threshold.")
+        parser.add_argument('--sweep_margins', type=str,
+                            help="Comma separated frame margins evaluated by the sweep output type.")
+        parser.add_argument('--profile', type=str,
+                            help="Write the duration, temp folder growth and peak memory of every stage and the exit "
+                                 "code of every ffmpeg call to this JSON file. It's also a trace event file, "
+                                 "loadable by chrome://tracing or Perfetto.")
+        parser.add_argument('--profile_python', type=int, default=0,
+                            help="Also profile the Python stages with cProfile into a .prof file beside the profile.")
+        parser.add_argument('--jobs', type=int, default=1,
+                            help="Count of the files processed concurrently when input_file is a directory.")
+
         parser.add_argument('--keep_start', type=int, default=0,
                             help="Seconds for not cutting from start.")
         parser.add_argument('--keep_end', type=int, default=0,
                             help="Seconds for not cutting from end.")
         parser.add_argument('--use_hardware_acc', type=int, default=0,
                             help="[Experimental] Enable hardware acceleration when encoding.")
-
-        args = parser.parse_args()
+        parser.add_argument('--stream_audio', type=int, default=0,
+                            help="Analyze the audio streamed from ffmpeg block by block instead of extracting "
+                                 "the whole audio.wav. Memory use no longer grows with the input duration.")
+        parser.add_argument('--cut_backend', type=str, default=CUT_BACKEND_TREE, choices=CUT_BACKENDS,
+                            help="How the removed frames are selected in the ffmpeg filter graph. "
+                                 "tree: a binary search over the cuts, the cost per frame is almost constant. "
+                                 "expression: the legacy sum of all cuts, evaluated for every frame.")
+        parser.add_argument('--analysis_sample_rate', type=int, default=0,
+                            help="Detect the silence on a mono downmix decoded at this low rate, e.g. 8000, which is "
+                                 "much faster. The full rate audio is only decoded if the output renders audio. "
+                                 "0 analyzes the full rate stereo audio.")
+        parser.add_argument('--mmap_audio', type=int, default=1,
+                            help="Memory map the extracted audio instead of loading it, the samples stay int16 on "
+                                 "disk and only the pages in use are kept in memory. 0 to load the whole audio.")
+        parser.add_argument('--follow', type=int, default=0,
+                            help="Cut an input which is still being written, or a pipe with --input_file -, while it "
+                                 "grows. The output is an HLS playlist of rolling segments, or an appended EDL.")
+        parser.add_argument('--live_segment_duration', type=float, default=6,
+                            help="Duration in seconds of the rolling output segments when following an input.")
+        parser.add_argument('--live_timeout', type=float, default=10,
+                            help="A followed input is complete once it didn't grow for this many seconds.")
+        parser.add_argument('--parallel_encode', type=int, default=0,
+                            help="Encode the video in chunks split at the cuts with parallel ffmpeg workers, "
+                                 "then join the chunks losslessly.")
+        parser.add_argument('--render_cache', type=int, default=0,
+                            help="Encode the video in chunks kept in a persistent render cache. A re-run only "
+                                 "re-encodes the chunks whose cuts changed, and a failed render resumes from the "
+                                 "chunks finished before.")
+        parser.add_argument('--render_cache_folder', type=str,
+                            help="Folder of the render cache. Defaults to ~/.cache/jumpcutter/render.")
+        parser.add_argument('--render_cache_size', type=float, default=DEFAULT_RENDER_CACHE_SIZE,
+                            help="Max size of the render cache in MB, least recently used chunks are evicted.")
+        parser.add_argument('--render_chunk_duration', type=float, default=60,
+                            help="Duration in seconds of the input covered by every cached chunk.")
+        parser.add_argument('--smart_render', type=int, default=0,
+                            help="Copy the whole GOPs between the cuts and only re-encode the partial GOPs at the "
+                                 "cuts, for h264 and hevc inputs without sections. Much faster, no generation loss. "
+                                 "The output must be .ts or .mkv, the re-encoded GOPs carry their own codec "
+                                 "parameters, which a single mp4 header can't describe.")
+        parser.add_argument('--encode_workers', type=int, default=os.cpu_count() or 1,
+                            help="Count of the parallel ffmpeg workers when --parallel_encode is enabled. "
+                                 "Defaults to the count of CPU cores.")
+
+        # argv defaults to the command line, embedding processes pass their own, e.g. [].
+        args = parser.parse_args(argv)
 
         self.temp_folder = temp_folder or args.temp_folder or tempfile.mkdtemp('jumpcut_')
 
@@ -99,9 +235,12 @@ class InputParameter:
         self.silent_threshold = silent_threshold or args.silent_threshold
         self.frame_margin = frame_margin or args.frame_margin
         self.new_speed = [silent_speed or args.silent_speed, sounded_speed or args.sounded_speed]
+        self.time_stretch = [silent_stretch or args.silent_stretch, sounded_stretch or args.sounded_stretch]
+        self.resample_speed = resample_speed or args.resample_speed
+        self.stretch_workers = max(1, stretch_workers or args.stretch_workers)
         url = url or args.url
         if url:
-            self.input_file = io_utils.download_file(args.url)
+            self.input_file = io_utils.download_file(url)
         else:
             self.input_file = input_file or args.input_file
         self.input_sections = input_sections or args.input_sections
@@ -115,10 +254,16 @@ class InputParameter:
 
         self.output_type = output_type or args.output_type
         self.output_file = output_file or args.output_file
-        self.replace = self.output_type != 'edl' and not self.output_file
+        self.follow = follow or args.follow
+        self.live_segment_duration = live_segment_duration or args.live_segment_duration
+        self.live_timeout = live_timeout or args.live_timeout
+        # set once a piped input is closed, a followed file is complete once it stops growing.
+        self.live_input_complete = threading.Event()
+        self.replace = self.output_type not in ('edl', 'sweep') and not self.output_file and not self.follow
         if self.replace:
             print("The input file will be replaced with the output file.")
         self.mapping = mapping or args.mapping
+        self.mapping_index = mapping_index or args.mapping_index
 
         self.frame_rate = frame_rate or args.frame_rate
 
@@ -127,62 +272,251 @@ class InputParameter:
 
         self.audio_fade_envelope_size = 400
         self.use_hardware_acc = use_hardware_acc or args.use_hardware_acc
+        self.stream_audio = stream_audio or args.stream_audio
+        self.mmap_audio = args.mmap_audio if mmap_audio is None else mmap_audio
+        self.analysis_sample_rate = analysis_sample_rate or args.analysis_sample_rate
+        self.cut_backend = cut_backend or args.cut_backend
+        self.parallel_encode = parallel_encode or args.parallel_encode
+        self.encode_workers = max(1, encode_workers or args.encode_workers)
+        self.render_cache = render_cache or args.render_cache
+        self.render_cache_folder = render_cache_folder or args.render_cache_folder
+        self.render_cache_size = render_cache_size or args.render_cache_size
+        self.render_chunk_duration = render_chunk_duration or args.render_chunk_duration
+        self.smart_render = smart_render or args.smart_render
+        if analysis_cache is None:
+            # a cache instance given by the process is used unless the job opts out.
+            analysis_cache = 1 if cache else args.analysis_cache
+        self.analysis_cache = analysis_cache
+        self.clear_cache = clear_cache or args.clear_cache
+        self.cache_folder = cache_folder or args.cache_folder
+        self.cache_size = cache_size or args.cache_size
+        self.sweep_thresholds = sweep_thresholds or parse_floats(args.sweep_thresholds)
+        self.sweep_margins = sweep_margins or parse_floats(args.sweep_margins)
+        self.profile = profile or args.profile
+        self.profile_python = profile_python or args.profile_python
+        # an analysis cache instance shared by the jobs of a process, instead of the one from the options.
+        self.cache = cache
+        # called with the name of the current stage and its progress from 0 to 1, if it's known.
+        self.progress_callback = progress_callback
 
     def __enter__(self):
+        if self.profile:
+            profile_utils.start_profiling(self.profile, self.temp_folder, self.profile_python)
         io_utils.create_path(self.temp_folder)
 
-        do_shell(f'ffmpeg -hide_banner -i "{self.input_file}" -ab 160k -ac 2 -ar '
-                 f'{str(self.sample_rate)} -vn "{self.temp_folder}/audio.wav"')
-
-        self.audio_sample_rate, self.audio_data = wavfile.read(f"{self.temp_folder}/audio.wav")
-        self.audio_sample_count = self.audio_data.shape[0]
-        self.max_audio_volume = get_max_volume(self.audio_data)
-
-        # try to detect frame rate
-        video_parameters = do_shell(f'ffmpeg -i "{self.input_file}"', STRING, 'utf-8').split('\n')
-        auto_detected_frame_rate = None
-        auto_detected_bit_rate = None
-
-        self.video_width = None
-        self.video_height = None
-        for line in video_parameters:
-            match = re.search(r'Duration: ((\d{2}):(\d{2}):(\d{2})[;:.](\d+)), ', line)
-            if match:
-                self.duration = match.group(1)
+        self.report_progress('analyze')
+        try:
+            if self.follow:
+                # the input is analyzed while it grows, by the live editor.
+                with profile_utils.stage('prepare_live_input'):
+                    self.prepare_live_input()
             else:
-                # Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661),
-                # yuv420p(progressive), 1920x1080 [SAR 1:1 DAR 16:9], 131 kb/s, 30 fps, 30 tbr,
-                # 30k tbn (default)
-                match = re.search(r'Stream #.*Video.*, (\d+)x(\d+).* (\d+) kb/s.*?(\d+) fps', line)
-                if match is not None:
-                    self.video_width = int(match.group(1))
-                    self.video_height = int(match.group(2))
-                    auto_detected_bit_rate = float(match.group(3))
-                    auto_detected_frame_rate = float(match.group(4))
-
-        if not self.video_width:
-            self.audio_only = True
+                with profile_utils.stage('analyze_input'):
+                    self.analyze_input()
+        except Exception as e:
+            # __exit__ is not called when __enter__ fails.
+            self.__exit__(type(e), e, e.__traceback__)
+            raise
+        return self
+
+    def report_progress(self, stage, progress=None):
+        if self.progress_callback:
+            self.progress_callback(stage, progress)
+
+    def get_analysis_cache(self):
+        if not self.analysis_cache and not self.clear_cache:
+            return None
+        cache = self.cache or AnalysisCache(self.cache_folder, self.cache_size)
+        # the cache is cleared even when it's not used, the entries of earlier runs are removed.
+        if self.clear_cache:
+            cache.clear()
+        return cache if self.analysis_cache else None
+
+    def analyze_input(self):
+        cache = self.get_analysis_cache()
+        self.output_max_volume = None
+        cache_key = cache.get_key(self.input_file, ANALYSIS_CACHE_VERSION, self.sample_rate, self.frame_rate,
+                                  self.analysis_sample_rate) if cache else None
+        with profile_utils.stage('load_cache'):
+            cache_entry = cache.load(cache_key) if cache else None
+
+        if cache_entry:
+            # the cached analysis is complete, nothing needs to be decoded.
+            metadata, self.frame_peaks = cache_entry
+            for name, value in metadata.items():
+                setattr(self, name, value)
+            self.audio_data = None
+            self.samples_per_frame = self.audio_sample_rate / self.frame_rate
+            self.audio_frame_count = self.frame_peaks.shape[0]
+            print(f"Analysis cache hit: {self.input_file}")
+        else:
+            with profile_utils.stage('probe_media'):
+                self.probe_media()
+            # streamed audio is analyzed in python while it's decoded.
+            with profile_utils.stage('read_audio', python=self.stream_audio):
+                self.read_audio()
+            with profile_utils.stage('analyze_audio', python=True):
+                self.analyze_audio()
+
+        if self.audio_only:
             self.input_sections = None
         else:
-            self.audio_only = False
             self.detect_sections()
 
+        if cache and not cache_entry:
+            with profile_utils.stage('store_cache'):
+                cache.store(cache_key, {name: getattr(self, name) for name in CACHED_ATTRIBUTES}, self.frame_peaks)
+
+    def prepare_live_input(self):
+        if self.input_file == '-':
+            if not self.output_file:
+                raise Exception("output_file is required when the input is a pipe.")
+            # a pipe can't be seeked by the segment renders, it's followed through a file growing in the temp folder.
+            self.input_file = os.path.join(self.temp_folder, 'live_input')
+            threading.Thread(target=self.copy_live_pipe, args=(self.input_file,), daemon=True).start()
+
+        # the media is probed from the beginning of the input, once there is enough of it.
+        last_size, last_growth = -1, time.monotonic()
+        while not self.live_input_complete.is_set():
+            size = os.path.getsize(self.input_file) if os.path.exists(self.input_file) else -1
+            if size >= LIVE_PROBE_SIZE:
+                break
+            if size > last_size:
+                last_size, last_growth = size, time.monotonic()
+            elif time.monotonic() - last_growth >= self.live_timeout:
+                if size <= 0:
+                    raise FileNotFoundError(f"{self.input_file} is not existing or empty.")
+                break
+            time.sleep(0.2)
+
+        self.probe_media()
+        self.audio_data = None
+        self.frame_peaks = None
+        self.max_audio_volume = 0.0
+        self.output_max_volume = None
+        self.input_sections = None
+        self.set_audio_format(0, self.get_analysis_format()[0])
+
+    def copy_live_pipe(self, path):
+        with open(path, 'wb') as file:
+            while True:
+                data = sys.stdin.buffer.read1(LIVE_PIPE_BLOCK_SIZE)
+                if not data:
+                    break
+                file.write(data)
+                file.flush()
+        self.live_input_complete.set()
+
+    def probe_media(self):
+        media_info = probe_media(self.input_file)
+        # a followed input has no known duration yet.
+        if not media_info.duration and not self.follow:
+            raise RuntimeError("Video duration parse error.")
 
-        self.bit_rate = auto_detected_bit_rate or self.bit_rate
-        self.frame_rate = auto_detected_frame_rate or self.frame_rate
+        self.duration = media_info.duration or 0
+        self.video_width = media_info.video_width
+        self.video_height = media_info.video_height
+        self.video_codec = media_info.video_codec
+        self.pixel_format = media_info.pixel_format
+        self.video_profile = media_info.video_profile
+        self.video_level = media_info.video_level
+        self.chapters = media_info.chapters
+
+        self.audio_only = not media_info.has_video
+        self.bit_rate = media_info.bit_rate or self.bit_rate
+        self.frame_rate = media_info.frame_rate or self.frame_rate
+        self.video_frame_count = media_info.frame_count or int(round(self.duration * self.frame_rate))
+
+    def load_audio_data(self):
+        # the analysis may run without keeping the samples, outputs rendering audio load them on demand.
+        if self.audio_data is None:
+            _, self.audio_data = self.extract_audio('audio.wav', self.sample_rate, 2)
+            self.audio_sample_count = self.audio_data.shape[0]
+        return self.audio_data
+
+    def get_output_max_volume(self):
+        # the peaks of the low rate mono downmix are lower than the peaks of the audio being rendered.
+        if self.analysis_sample_rate:
+            if self.output_max_volume is None:
+                self.output_max_volume = get_max_volume(self.load_audio_data())
+            return self.output_max_volume
+        return self.max_audio_volume
+
+    def extract_audio(self, file_name, sample_rate, channels):
+        do_shell(f'ffmpeg -hide_banner -i "{self.input_file}" -ab 160k -ac {channels} -ar '
+                 f'{str(sample_rate)} -vn "{self.temp_folder}/{file_name}"')
+        return self.read_wav(f"{self.temp_folder}/{file_name}")
+
+    def read_wav(self, path):
+        # a memory mapped wav is copy on write, chunks sliced from it are views of the file.
+        return wavfile.read(path, mmap=bool(self.mmap_audio))
+
+    def get_analysis_format(self):
+        # the sample rate and the channels of the audio the silence is detected on.
+        if self.analysis_sample_rate:
+            return int(self.analysis_sample_rate), 1
+        return self.sample_rate, 2
+
+    def set_audio_format(self, analysis_sample_count, analysis_sample_rate):
+        self.audio_sample_rate = int(self.sample_rate)
         self.samples_per_frame = self.audio_sample_rate / self.frame_rate
+        self.analysis_samples_per_frame = analysis_sample_rate / self.frame_rate
+        # estimated from the analysis audio, it's exact once the full rate audio is loaded.
+        self.audio_sample_count = int(round(analysis_sample_count * self.audio_sample_rate / analysis_sample_rate))
 
-        self.audio_frame_count = int(math.ceil(self.audio_sample_count / self.samples_per_frame))
-
-        if self.duration:
-            tc = Timecode(self.frame_rate, start_timecode=self.duration)
-            self.duration = tc.secs
-            self.video_frame_count = tc.frames
+    def read_audio(self):
+        if self.stream_audio:
+            self.read_audio_stream()
         else:
-            raise RuntimeError("Video duration parse error.")
-        return self
+            self.read_audio_file()
+
+    def analyze_audio(self):
+        # streamed audio is analyzed while it's read.
+        if self.frame_peaks is None:
+            self.frame_peaks = get_frame_peaks(self.analysis_data, self.analysis_samples_per_frame)
+            # every sample belongs to a frame, the loudest frame is the loudest sample.
+            self.max_audio_volume = float(np.max(self.frame_peaks, initial=0))
+            self.analysis_data = None
+        self.audio_frame_count = self.frame_peaks.shape[0]
+
+    def read_audio_file(self):
+        analysis_sample_rate, channels = self.get_analysis_format()
+        _, self.analysis_data = self.extract_audio('analysis.wav' if self.analysis_sample_rate else 'audio.wav',
+                                                   analysis_sample_rate, channels)
+        # the full rate audio is analyzed itself, unless a low analysis rate is set.
+        self.audio_data = None if self.analysis_sample_rate else self.analysis_data
+        self.set_audio_format(self.analysis_data.shape[0], analysis_sample_rate)
+        self.frame_peaks = None
+
+    def read_audio_stream(self):
+        analysis_sample_rate, channels = self.get_analysis_format()
+        self.audio_data = None
+
+        accumulator = FramePeakAccumulator(analysis_sample_rate / self.frame_rate)
+        process = open_shell(f'ffmpeg -hide_banner -v error -i "{self.input_file}" -ac {channels} -ar '
+                             f'{str(analysis_sample_rate)} -vn -f s16le -')
+        block_bytes = AUDIO_STREAM_BLOCK_SIZE * channels * 2
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            block = np.frombuffer(data, dtype='<i2')
+            accumulator.update(block[:block.shape[0] // channels * channels].reshape(-1, channels))
+        process.stdout.close()
+        if wait_shell(process) != 0:
+            raise RuntimeError(f"Audio stream of {self.input_file} can not be decoded.")
+
+        self.set_audio_format(accumulator.sample_count, analysis_sample_rate)
+        self.max_audio_volume = accumulator.max_volume
+        self.frame_peaks = accumulator.finish()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        # written before the temp folder is deleted, so the last stages still see their files.
+        profile_utils.stop_profiling(input_file=self.input_file, output_file=self.output_file,
+                                     duration=getattr(self, 'duration', None),
+                                     error=f"{exc_type.__name__}: {exc_val}" if exc_type else None)
+        # the memory mapped audio.wav can't be deleted while it's mapped on Windows.
+        self.audio_data = None
         io_utils.delete_path(self.temp_folder)
 
     def detect_sections(self):
@@ -195,21 +529,14 @@ class InputParameter:
             print(f"Auto detected sections file: {detected_section_file}")
             return
 
-        # detect sections from video
-        raw_chapters = do_shell(f'ffprobe -i {self.input_file} -print_format json -show_chapters -loglevel fatal',
-                                STRING)
-        parsed_chapters = json.loads(raw_chapters)
-        print(parsed_chapters)
-
-        if 'chapters' in parsed_chapters:
-            chapters = parsed_chapters['chapters']
-            if chapters:
-                with open(detected_section_file, 'w') as file:
-                    for chapter in chapters:
-                        start_time_secs = int(float(chapter['start_time']))
-                        start_time = f'{start_time_secs // 60:02d}:{start_time_secs % 60:02d}'
-                        end_time_secs = int(float(chapter['end_time']))
-                        end_time = f'{end_time_secs // 60:02d}:{end_time_secs % 60:02d}'
-                        title = chapter['tags']['title']
-                        file.write(f'{start_time} {end_time} {title}\n')
-                self.input_sections = detected_section_file
+        # detect sections from the chapters of video
+        if self.chapters:
+            with open(detected_section_file, 'w') as file:
+                for chapter in self.chapters:
+                    start_time_secs = int(float(chapter['start_time']))
+                    start_time = f'{start_time_secs // 60:02d}:{start_time_secs % 60:02d}'
+                    end_time_secs = int(float(chapter['end_time']))
+                    end_time = f'{end_time_secs // 60:02d}:{end_time_secs % 60:02d}'
+                    title = chapter['tags']['title']
+                    file.write(f'{start_time} {end_time} {title}\n')
+            self.input_sections = detected_section_file
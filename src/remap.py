@@ -0,0 +1,207 @@
+"""
+Remaps subtitles, sections and timestamps from the time of an input to the time of its edited output, with the
+mapping written by --mapping_index, or the text one written by --mapping:
+
+    python remap.py --mapping_index a.npz --output_dir edited/ subtitles/ chapters.sec views.csv
+    python remap.py --mapping a.txt --frame_rate 30 --times 12.5,80
+
+.srt and .vtt cues are remapped at both ends, cues left without any duration are removed. .sec sections are moved
+to the output time of their start. In other files, the first field of every line holding a number of seconds is
+remapped, like CSV exports of analytics.
+"""
+import argparse
+import os
+import re
+
+import numpy as np
+
+from editor.mapping import REMOVED_POLICIES, REMOVED_SNAP, TimeMapping
+
+SUBTITLE_EXTENSIONS = ['.srt', '.vtt']
+SECTION_EXTENSIONS = ['.sec']
+
+SUBTITLE_TIME = re.compile(r'(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{3})')
+CUE_TIMING = re.compile(rf'^\s*({SUBTITLE_TIME.pattern})\s*-->\s*({SUBTITLE_TIME.pattern})(.*)$')
+SECTION_LINE = re.compile(r'^(\d+:\d+(?::\d+)?)(\s+\d+:\d+(?::\d+)?)?(\s.*)$')
+FIRST_FIELD = re.compile(r'^(\s*)([^,;\t]+)(.*)$', re.DOTALL)
+
+
+def parse_subtitle_time(text):
+    hours, minutes, seconds, milliseconds = SUBTITLE_TIME.fullmatch(text.strip()).groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(milliseconds) / 1000
+
+
+def format_subtitle_time(seconds, delimiter):
+    milliseconds = int(round(seconds * 1000))
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{delimiter}{milliseconds:03d}"
+
+
+def parse_section_time(text):
+    seconds = 0
+    for part in text.split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def format_section_time(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def remap_subtitles(mapping: TimeMapping, text, extension):
+    # the timings of all cues are remapped at once, the other lines of the blocks are kept as they are.
+    blocks = re.split(r'\n\s*\n', text.replace('\r\n', '\n').strip('\n'))
+    timings = []
+    for block_index, block in enumerate(blocks):
+        lines = block.split('\n')
+        for line_index, line in enumerate(lines):
+            match = CUE_TIMING.match(line)
+            if match:
+                timings.append((block_index, line_index, parse_subtitle_time(match.group(1)),
+                                parse_subtitle_time(match.group(6)), match.group(11)))
+                break
+
+    times = mapping.remap([timing[2] for timing in timings] + [timing[3] for timing in timings], REMOVED_SNAP)
+    starts, ends = times[:len(timings)].tolist(), times[len(timings):].tolist()
+    delimiter = ',' if extension == '.srt' else '.'
+    cues = {}
+    for (block_index, line_index, *_, settings), start, end in zip(timings, starts, ends):
+        cues[block_index] = (line_index, start, end, settings)
+
+    remapped_blocks = []
+    cue_count = 0
+    for block_index, block in enumerate(blocks):
+        if block_index not in cues:
+            remapped_blocks.append(block)
+            continue
+        line_index, start, end, settings = cues[block_index]
+        start, end = format_subtitle_time(start, delimiter), format_subtitle_time(end, delimiter)
+        if start == end:
+            # the cue was only shown during removed segments.
+            continue
+        cue_count += 1
+        lines = block.split('\n')
+        lines[line_index] = f"{start} --> {end}{settings}"
+        if extension == '.srt' and line_index > 0 and lines[line_index - 1].strip().isdigit():
+            # srt cues are numbered, the numbers stay consecutive.
+            lines[line_index - 1] = str(cue_count)
+        remapped_blocks.append('\n'.join(lines))
+    return '\n\n'.join(remapped_blocks) + '\n'
+
+
+def remap_sections(mapping: TimeMapping, text):
+    lines = text.splitlines()
+    matches = [SECTION_LINE.match(line.strip()) for line in lines]
+    starts = mapping.remap([parse_section_time(match.group(1)) for match in matches if match], REMOVED_SNAP).tolist()
+    ends = mapping.remap([parse_section_time(match.group(2)) if match.group(2) else 0 for match in matches if match],
+                         REMOVED_SNAP).tolist()
+
+    remapped_lines = []
+    remapped = iter(zip(starts, ends))
+    for line, match in zip(lines, matches):
+        if not match:
+            remapped_lines.append(line)
+            continue
+        start, end = next(remapped)
+        end = f" {format_section_time(end)}" if match.group(2) else ''
+        remapped_lines.append(f"{format_section_time(start)}{end}{match.group(3)}")
+    return '\n'.join(remapped_lines) + '\n'
+
+
+def parse_seconds(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def remap_timestamps(mapping: TimeMapping, text, removed=REMOVED_SNAP):
+    # lines without a number in their first field, like headers, are kept. lines in removed segments are dropped
+    # with the drop policy.
+    lines = text.splitlines()
+    matches = [FIRST_FIELD.match(line) for line in lines]
+    seconds = [parse_seconds(match.group(2)) if match else None for match in matches]
+    times = iter(mapping.remap([value for value in seconds if value is not None], removed).tolist())
+
+    remapped_lines = []
+    for line, match, value in zip(lines, matches, seconds):
+        if value is None:
+            remapped_lines.append(line)
+            continue
+        time = next(times)
+        if np.isnan(time):
+            continue
+        remapped_lines.append(f"{match.group(1)}{time:.3f}{match.group(3)}")
+    return '\n'.join(remapped_lines) + '\n'
+
+
+def remap_file(mapping: TimeMapping, input_file, output_file, removed=REMOVED_SNAP):
+    extension = os.path.splitext(input_file)[1].lower()
+    with open(input_file, 'r', encoding='utf-8-sig') as file:
+        text = file.read()
+    if extension in SUBTITLE_EXTENSIONS:
+        text = remap_subtitles(mapping, text, extension)
+    elif extension in SECTION_EXTENSIONS:
+        text = remap_sections(mapping, text)
+    else:
+        text = remap_timestamps(mapping, text, removed)
+    with open(output_file, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+
+def list_input_files(inputs):
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.isfile(os.path.join(path, name)):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def get_output_file(input_file, output_dir):
+    if output_dir:
+        return os.path.join(output_dir, os.path.basename(input_file))
+    name, extension = os.path.splitext(input_file)
+    return f"{name}_edited{extension}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remaps timestamps from the input time to the edited time.')
+    parser.add_argument('inputs', nargs='*', help="Subtitle, section or timestamp files, or folders of them.")
+    parser.add_argument('--mapping_index', type=str, help="The npz mapping written with --mapping_index.")
+    parser.add_argument('--mapping', type=str, help="The text mapping written with --mapping.")
+    parser.add_argument('--frame_rate', type=float, default=30, help="Frame rate of the text mapping.")
+    parser.add_argument('--output_dir', type=str,
+                        help="Folder of the remapped files. Defaults to _edited files beside the inputs.")
+    parser.add_argument('--removed', type=str, default=REMOVED_SNAP, choices=REMOVED_POLICIES,
+                        help="Timestamps in removed segments are moved to the cut, or dropped.")
+    parser.add_argument('--times', type=str, help="Comma separated seconds to remap and print.")
+    args = parser.parse_args()
+
+    if args.mapping_index:
+        mapping = TimeMapping.load(args.mapping_index)
+    elif args.mapping:
+        mapping = TimeMapping.load_text(args.mapping, args.frame_rate)
+    else:
+        parser.error("--mapping_index or --mapping is required.")
+
+    if args.times:
+        times = mapping.remap([float(time) for time in args.times.split(',') if time.strip()], args.removed)
+        print("\n".join('removed' if np.isnan(time) else f"{time:.3f}" for time in times.tolist()))
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    count = 0
+    for input_file in list_input_files(args.inputs):
+        remap_file(mapping, input_file, get_output_file(input_file, args.output_dir), args.removed)
+        count += 1
+    if count:
+        print(f"Remapped {count} files with {len(mapping)} segments.")
+
+
+if __name__ == '__main__':
+    main()
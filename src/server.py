@@ -0,0 +1,255 @@
+"""
+A long running job server. One warm process runs the jobs with a pool of worker threads, and keeps the analysis
+results in memory for repeated inputs. Jobs take the same options as the command line, as JSON:
+
+    python server.py --port 8765 --workers 4 --output_root /videos/edited
+    curl -X POST localhost:8765/jobs -H 'Content-Type: application/json' \
+        -d '{"input_file": "/videos/a.mp4", "output_file": "/videos/edited/a.mp4", "silent_speed": 99999}'
+    curl localhost:8765/jobs/1
+
+Every file a job writes must be within the output root, and the server owns the temp folders of the jobs. Requests
+from web pages of other origins are rejected, so a page visited by the user can't submit jobs.
+"""
+import argparse
+import inspect
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from jumpcutter import execute
+from parameters import InputParameter
+from utils import io_utils
+from utils.cache_utils import AnalysisCache, MemoryAnalysisCache
+
+# options of InputParameter which are owned by the server, or global to the process. every job may have its own
+# profile, but cProfile can only run for one of them at a time. temp folders are deleted with the job, so they're
+# always created by the server.
+SERVER_OPTIONS = {'args', 'argv', 'cache', 'progress_callback', 'profile_python', 'temp_folder', 'cache_folder',
+                  'cache_size', 'clear_cache'}
+JOB_OPTIONS = [name for name in inspect.signature(InputParameter.__init__).parameters
+               if name != 'self' and name not in SERVER_OPTIONS]
+# the options of the files and folders a job writes, they must be within the output root.
+OUTPUT_OPTIONS = ['output_file', 'mapping', 'mapping_index', 'profile', 'render_cache_folder']
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+
+def is_within(path, folder):
+    path, folder = os.path.realpath(path), os.path.realpath(folder)
+    return os.path.commonpath([path, folder]) == folder
+
+
+class Job:
+
+    def __init__(self, job_id, options):
+        self.id = job_id
+        self.options = options
+        self.state = 'queued'
+        self.stage = None
+        self.progress = None
+        self.submitted = time.time()
+        self.result = None
+        self.future = None
+
+    def set_progress(self, stage, progress):
+        self.stage = stage
+        self.progress = progress
+
+    def to_dict(self):
+        job = {
+            'id': self.id,
+            'state': self.state,
+            'stage': self.stage,
+            'progress': self.progress,
+            'submitted': self.submitted,
+            'options': self.options,
+        }
+        if self.result:
+            job.update(input_file=self.result.input_file, output_file=self.result.output_file,
+                       duration=self.result.duration, elapsed=self.result.elapsed, error=self.result.error)
+        return job
+
+
+class JobServer:
+    """
+    Runs the submitted jobs with a pool of worker threads. Jobs mostly wait for ffmpeg, so threads keep the
+    workers busy while sharing one warm interpreter and one in-memory analysis cache.
+    """
+
+    def __init__(self, workers, cache, output_root, history=1000):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = cache
+        self.output_root = os.path.abspath(output_root)
+        self.history = history
+        self.jobs = OrderedDict()
+        self.job_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def submit(self, options):
+        unknown_options = set(options) - set(JOB_OPTIONS)
+        if unknown_options:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown_options))}")
+        if not options.get('input_file') and not options.get('url'):
+            raise ValueError("input_file is required.")
+        if options.get('input_file') == '-':
+            raise ValueError("input_file can't be the input of the server.")
+        # without an output file, the input would be replaced, or the output written beside it.
+        if not options.get('output_file') and options.get('output_type') != 'sweep':
+            raise ValueError("output_file is required.")
+        for name in OUTPUT_OPTIONS:
+            if options.get(name) and not is_within(str(options[name]), self.output_root):
+                raise ValueError(f"{name} must be within the output root {self.output_root}.")
+
+        with self.lock:
+            job = Job(next(self.job_ids), options)
+            self.jobs[job.id] = job
+            self.forget_finished_jobs()
+        job.future = self.executor.submit(self.run, job)
+        return job
+
+    def run(self, job):
+        job.state = 'running'
+        options = dict(job.options)
+        options.setdefault('input_file', None)
+        temp_folder = tempfile.mkdtemp('jumpcut_job')
+        try:
+            # the command line of the server is not parsed by the jobs.
+            job.result = execute(argv=[], cache=self.cache, progress_callback=job.set_progress,
+                                 temp_folder=temp_folder, **options)
+        finally:
+            # jobs failing before they start, like failed downloads, don't delete their temp folder.
+            if os.path.exists(temp_folder):
+                io_utils.delete_path(temp_folder)
+        job.state = 'succeeded' if job.result.succeeded else 'failed'
+        job.set_progress('done', 1)
+
+    def forget_finished_jobs(self):
+        finished_jobs = [job_id for job_id, job in self.jobs.items() if job.state in ('succeeded', 'failed')]
+        for job_id in finished_jobs[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
+
+    def get_job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def get_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        # only queued jobs can be cancelled, ffmpeg is not interrupted.
+        job = self.get_job(job_id)
+        if job and job.future.cancel():
+            job.state = 'cancelled'
+        return job
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def get_job_id(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'jobs' and parts[1].isdigit():
+            return int(parts[1])
+        return None
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/jobs':
+            self.send_json(200, [job.to_dict() for job in self.server.job_server.get_jobs()])
+            return
+
+        job = self.server.job_server.get_job(self.get_job_id())
+        if job:
+            self.send_json(200, job.to_dict())
+        else:
+            self.send_json(404, {'error': 'Job not found.'})
+
+    def is_local_origin(self):
+        # browsers send the origin of cross-site requests, other clients usually send none.
+        origin = self.headers.get('Origin')
+        return not origin or urlparse(origin).hostname in LOCAL_HOSTS
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            self.send_json(404, {'error': 'Not found.'})
+            return
+        if not self.is_local_origin():
+            self.send_json(403, {'error': 'Cross-origin requests are not allowed.'})
+            return
+        # a web page can only post JSON to another origin after a CORS preflight, which the server never allows.
+        if (self.headers.get('Content-Type') or '').split(';')[0].strip().lower() != 'application/json':
+            self.send_json(415, {'error': 'Content-Type must be application/json.'})
+            return
+
+        try:
+            options = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            if not isinstance(options, dict):
+                raise ValueError("Options must be a JSON object.")
+            job = self.server.job_server.submit(options)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(202, job.to_dict())
+
+    def do_DELETE(self):
+        if not self.is_local_origin():
+            self.send_json(403, {'error': 'Cross-origin requests are not allowed.'})
+            return
+        job = self.server.job_server.cancel(self.get_job_id())
+        if job:
+            self.send_json(200, job.to_dict())
+        else:
+            self.send_json(404, {'error': 'Job not found.'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs jumpcutter jobs submitted over HTTP in one warm process.')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help="Address to listen on. Only local clients by default.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help="Count of the jobs processed concurrently.")
+    parser.add_argument('--memory_cache_size', type=float, default=256,
+                        help="Max size in MB of the analysis results kept in memory.")
+    parser.add_argument('--analysis_cache', type=int, default=0,
+                        help="Also keep the analysis results in the on-disk cache. They're kept in memory only by "
+                             "default.")
+    parser.add_argument('--cache_folder', type=str, help="Folder of the on-disk analysis cache.")
+    parser.add_argument('--history', type=int, default=1000, help="Count of the finished jobs kept for status.")
+    parser.add_argument('--output_root', type=str, default=os.getcwd(),
+                        help="Folder every output of the jobs must be written in. Defaults to the current folder.")
+    args = parser.parse_args()
+
+    backing_cache = AnalysisCache(args.cache_folder) if args.analysis_cache else None
+    job_server = JobServer(max(1, args.workers), MemoryAnalysisCache(args.memory_cache_size, backing_cache),
+                           args.output_root, args.history)
+    http_server = ThreadingHTTPServer((args.host, args.port), JobRequestHandler)
+    http_server.job_server = job_server
+    print(f"Serving jobs on http://{args.host}:{args.port}/jobs with {args.workers} workers, "
+          f"writing to {job_server.output_root}.")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        job_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_SIZE = 1024  # MB
+DEFAULT_RENDER_CACHE_SIZE = 10240  # MB
+TEMP_FILE_MAX_AGE = 24 * 3600  # seconds since a temp file was last written
+
+
+def get_default_cache_folder():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'jumpcutter')
+
+
+def get_file_identity(file):
+    # a file is considered unchanged as long as its path, size and modification time are.
+    stat = os.stat(file)
+    return [os.path.abspath(file), stat.st_size, stat.st_mtime_ns]
+
+
+def remove_entry(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:  # removed by another process
+        pass
+
+
+def get_temp_file_pid(name):
+    # temp files are named {key}[.{suffix}].{pid}[.{thread}].tmp[{extension}], the pid is the first number.
+    for part in name.split('.')[1:]:
+        if part.isdigit():
+            return int(part)
+    return None
+
+
+def is_process_alive(pid):
+    if os.name == 'nt':
+        # processes can't be probed with signals on windows, their temp files are removed by age only.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # a process of another user
+        return True
+    return True
+
+
+class FileCache:
+    """
+    An on-disk LRU cache of files in one folder. The modification time of an entry records its last use,
+    and the least recently used entries are removed once the folder outgrows max_size.
+    """
+    entry_suffix = ''
+    description = 'Cache'
+
+    def __init__(self, folder=None, max_size=DEFAULT_CACHE_SIZE):
+        self.folder = folder or get_default_cache_folder()
+        self.max_size = max_size * 1024 * 1024
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def get_key(input_file, *settings):
+        identity = json.dumps([get_file_identity(input_file), *settings])
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+    def is_entry(self, name):
+        # entries being written are temp files, they're not evicted.
+        return name.endswith(self.entry_suffix) and '.tmp' not in name
+
+    def get_entries(self):
+        entries = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if not self.is_entry(name) or not os.path.isfile(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def is_stale_temp_file(self, name, modified_time):
+        # temp files of crashed or killed runs are never renamed into entries.
+        if '.tmp' not in name:
+            return False
+        if time.time() - modified_time > TEMP_FILE_MAX_AGE:
+            return True
+        pid = get_temp_file_pid(name)
+        return pid is not None and pid != os.getpid() and not is_process_alive(pid)
+
+    def evict_temp_files(self):
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # renamed or removed by another process
+                continue
+            if os.path.isfile(path) and self.is_stale_temp_file(name, stat.st_mtime):
+                remove_entry(path)
+
+    def evict(self):
+        # remove the temp files left behind, then the least recently used entries until the cache fits into
+        # max_size.
+        self.evict_temp_files()
+        entries = self.get_entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            remove_entry(path)
+            total_size -= size
+
+    def clear(self):
+        for _, _, path in self.get_entries():
+            remove_entry(path)
+        print(f"{self.description} {self.folder} cleared.")
+
+
+class AnalysisCache(FileCache):
+    """
+    An on-disk LRU cache of the analysis results of input files: the probed media metadata and the
+    per-frame loudness envelope. Every entry is one npz file.
+    """
+    entry_suffix = '.npz'
+    description = 'Analysis cache'
+
+    def get_entry_path(self, key):
+        return os.path.join(self.folder, f'{key}.npz')
+
+    def load(self, key):
+        entry_path = self.get_entry_path(key)
+        if not os.path.exists(entry_path):
+            return None
+        try:
+            with np.load(entry_path) as entry:
+                metadata = json.loads(str(entry['metadata']))
+                frame_peaks = entry['frame_peaks']
+        except (OSError, ValueError, KeyError):
+            print(f"Broken analysis cache entry {entry_path} is ignored.")
+            return None
+
+        os.utime(entry_path)
+        return metadata, frame_peaks
+
+    @staticmethod
+    def encode_metadata(metadata):
+        return json.dumps(metadata, default=lambda value: value.item())
+
+    def store(self, key, metadata, frame_peaks):
+        entry_path = self.get_entry_path(key)
+        temp_path = f'{entry_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as entry_file:
+            np.savez(entry_file,
+                     metadata=np.array(self.encode_metadata(metadata)),
+                     frame_peaks=frame_peaks)
+        os.replace(temp_path, entry_path)
+        self.evict()
+
+
+class RenderCache(FileCache):
+    """
+    An on-disk LRU cache of rendered media chunks, which outlives the temp folder of a run. A chunk is
+    rendered to a temp file beside its entry and renamed once it's complete, so a failed render keeps the
+    chunks finished before and a re-run resumes from them.
+    """
+    description = 'Render cache'
+
+    def __init__(self, folder=None, max_size=DEFAULT_RENDER_CACHE_SIZE):
+        super().__init__(folder or os.path.join(get_default_cache_folder(), 'render'), max_size)
+
+    def get_entry_path(self, key, extension):
+        return os.path.join(self.folder, f'{key}{extension}')
+
+    def get_temp_path(self, key, extension):
+        # ffmpeg picks the format by the extension, it stays the last one.
+        return os.path.join(self.folder, f'{key}.{os.getpid()}.{threading.get_ident()}.tmp{extension}')
+
+    def load(self, key, extension):
+        entry_path = self.get_entry_path(key, extension)
+        if not os.path.exists(entry_path):
+            return None
+        os.utime(entry_path)
+        return entry_path
+
+    def store(self, key, extension, temp_path):
+        entry_path = self.get_entry_path(key, extension)
+        os.replace(temp_path, entry_path)
+        return entry_path
+
+
+class MemoryAnalysisCache:
+    """
+    An in-memory LRU cache of analysis results shared by the jobs of one process, optionally backed by an
+    AnalysisCache on disk. It has the same interface, and it's safe to use from many threads.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, backing_cache=None):
+        self.max_size = max_size * 1024 * 1024
+        self.backing_cache = backing_cache
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get_key(self, input_file, *settings):
+        return AnalysisCache.get_key(input_file, *settings)
+
+    def load(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+        if entry:
+            metadata, frame_peaks = entry
+            # every job gets its own copy of the metadata, the envelope is read-only.
+            return json.loads(metadata), frame_peaks
+
+        entry = self.backing_cache.load(key) if self.backing_cache else None
+        if entry:
+            self.remember(key, *entry)
+        return entry
+
+    def store(self, key, metadata, frame_peaks):
+        self.remember(key, metadata, frame_peaks)
+        if self.backing_cache:
+            self.backing_cache.store(key, metadata, frame_peaks)
+
+    def remember(self, key, metadata, frame_peaks):
+        frame_peaks = np.array(frame_peaks)
+        frame_peaks.setflags(write=False)
+        entry = (AnalysisCache.encode_metadata(metadata), frame_peaks)
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.get_entry_size(self.entries.pop(key))
+            self.entries[key] = entry
+            self.size += self.get_entry_size(entry)
+            # remove the least recently used entries until the cache fits into max_size.
+            while self.size > self.max_size and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= self.get_entry_size(evicted)
+
+    @staticmethod
+    def get_entry_size(entry):
+        metadata, frame_peaks = entry
+        return len(metadata) + frame_peaks.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        if self.backing_cache:
+            self.backing_cache.clear()
@@ -1,4 +1,5 @@
 import os
+import time
 from shutil import copyfile, rmtree
 from pytube import YouTube
 
@@ -25,3 +26,30 @@ def download_file(url):
     new_name = name.replace(' ', '_')
     os.rename(name, new_name)
     return new_name
+
+
+def follow_file(path, timeout, is_complete=None, block_size=1 << 16, poll_interval=0.2):
+    """
+    Yields the data of a file which is still being written, as it grows. The file is complete once is_complete()
+    returns true, or once it didn't grow for timeout seconds.
+    """
+    last_growth = time.monotonic()
+    while not os.path.exists(path):
+        if time.monotonic() - last_growth >= timeout:
+            raise FileNotFoundError(f"{path} is not existing.")
+        time.sleep(poll_interval)
+
+    with open(path, 'rb') as file:
+        while True:
+            data = file.read(block_size)
+            if data:
+                last_growth = time.monotonic()
+                yield data
+            elif (is_complete and is_complete()) or time.monotonic() - last_growth >= timeout:
+                # the last writes may land between the read and the check.
+                data = file.read()
+                if data:
+                    yield data
+                return
+            else:
+                time.sleep(poll_interval)
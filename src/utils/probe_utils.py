@@ -0,0 +1,142 @@
+import functools
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from utils.shell_utils import do_shell, STRING, take_until, ENV
+
+
+def parse_rational(text):
+    # ffprobe reports rates as "30000/1001", "0/0" when unknown.
+    if not text:
+        return None
+    numerator, _, denominator = str(text).partition('/')
+    try:
+        value = float(numerator) / float(denominator) if denominator else float(numerator)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return value or None
+
+
+def parse_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+class MediaInfo:
+    """
+    The streams, format and chapters of a media file, from one structured ffprobe call.
+    """
+
+    def __init__(self, probe_result: dict):
+        media_format = probe_result.get('format') or {}
+        streams = probe_result.get('streams') or []
+        video_streams = [stream for stream in streams if stream.get('codec_type') == 'video'
+                         and not (stream.get('disposition') or {}).get('attached_pic')]
+        audio_streams = [stream for stream in streams if stream.get('codec_type') == 'audio']
+        video_stream = video_streams[0] if video_streams else {}
+        audio_stream = audio_streams[0] if audio_streams else {}
+
+        self.duration = parse_float(media_format.get('duration')) or parse_float(video_stream.get('duration')) \
+            or parse_float(audio_stream.get('duration'))
+        self.format_name = media_format.get('format_name')
+
+        self.has_video = bool(video_stream)
+        self.video_width = video_stream.get('width')
+        self.video_height = video_stream.get('height')
+        self.video_codec = video_stream.get('codec_name')
+        self.pixel_format = video_stream.get('pix_fmt')
+        # like "High" and 41 for h264, or "Main 10" and 123 for hevc, whose level is 30 times the level number.
+        self.video_profile = video_stream.get('profile')
+        self.video_level = video_stream.get('level') if (video_stream.get('level') or 0) > 0 else None
+        self.frame_rate_text = video_stream.get('avg_frame_rate') if parse_rational(
+            video_stream.get('avg_frame_rate')) else video_stream.get('r_frame_rate')
+        self.frame_rate = parse_rational(self.frame_rate_text)
+        self.frame_count = int(video_stream['nb_frames']) if str(video_stream.get('nb_frames', '')).isdigit() \
+            else None
+        # kb/s, like the bit rate of the command line options.
+        bit_rate = parse_float(video_stream.get('bit_rate')) or parse_float(media_format.get('bit_rate'))
+        self.bit_rate = bit_rate / 1000 if bit_rate else None
+
+        self.has_audio = bool(audio_stream)
+        self.audio_codec = audio_stream.get('codec_name')
+        self.audio_sample_rate = int(audio_stream['sample_rate']) if audio_stream.get('sample_rate') else None
+        self.audio_channels = audio_stream.get('channels')
+
+        self.chapters = probe_result.get('chapters') or []
+
+
+def probe_media(input_file):
+    result = do_shell(f'ffprobe -loglevel fatal -print_format json -show_format -show_streams -show_chapters '
+                      f'-i "{input_file}"', STRING)
+    try:
+        return MediaInfo(json.loads(result))
+    except ValueError:
+        raise RuntimeError(f"{input_file} can not be probed: {result.strip()}")
+
+
+def get_ffmpeg_identity():
+    ffmpeg_path = shutil.which('ffmpeg', path=ENV['PATH'])
+    if not ffmpeg_path:
+        return None
+    stat = os.stat(ffmpeg_path)
+    return [os.path.realpath(ffmpeg_path), stat.st_size, stat.st_mtime_ns]
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoders(cache_folder=None):
+    """
+    Returns the (flags, name) of every encoder of ffmpeg. It's only queried once per process,
+    and once per ffmpeg binary when a cache folder is given.
+    """
+    identity = get_ffmpeg_identity()
+    cache_file = os.path.join(cache_folder, 'encoders.json') if cache_folder else None
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            cached = {}
+        if cached.get('ffmpeg') == identity:
+            return tuple(tuple(encoder) for encoder in cached['encoders'])
+
+    result = do_shell(f'ffmpeg -hide_banner -encoders', stdout=STRING)
+    encoders = tuple(tuple(line.strip().split(' ', 2)[:2]) for line in
+                     take_until(result.splitlines(), lambda line: line.strip() == '------') if line.strip())
+
+    if cache_file and identity:
+        os.makedirs(cache_folder, exist_ok=True)
+        # written aside then renamed, concurrent jobs never read a partial file.
+        temp_file = f'{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            json.dump({'ffmpeg': identity, 'encoders': encoders}, file)
+        os.replace(temp_file, cache_file)
+    return encoders
+
+
+def probe_keyframes(input_file, frame_rate):
+    """
+    Returns the sorted indices of the key frames of the first video stream, relative to the start of the input like the
+    seek positions of ffmpeg. Only the packet headers are read, nothing is decoded.
+    """
+    result = do_shell(f'ffprobe -loglevel fatal -select_streams v:0 '
+                      f'-show_entries format=start_time:packet=pts_time,flags -print_format compact -i "{input_file}"',
+                      STRING)
+    start_time = 0.0
+    keyframe_times = []
+    for line in result.splitlines():
+        section, _, fields = line.partition('|')
+        fields = dict(field.partition('=')[::2] for field in fields.split('|'))
+        if section == 'format':
+            start_time = parse_float(fields.get('start_time')) or 0.0
+        elif section == 'packet' and 'K' in fields.get('flags', ''):
+            pts_time = parse_float(fields.get('pts_time'))
+            if pts_time is not None:
+                keyframe_times.append(pts_time)
+
+    return np.unique(np.round((np.array(keyframe_times) - start_time) * frame_rate).astype(np.int64))
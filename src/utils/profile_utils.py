@@ -0,0 +1,224 @@
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# the active profiler of the job running in each thread, stages and shell commands are only recorded while one is
+# started. worker threads of a job get it with propagate().
+_local = threading.local()
+
+
+def get_folder_size(folder):
+    size = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:  # removed meanwhile
+                pass
+    return size
+
+
+def get_peak_rss():
+    # peak resident memory in bytes of this process and of its largest finished child process.
+    if not resource:
+        return None, None
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in KB on Linux, bytes on macOS.
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+def get_cpu_times():
+    if not resource:
+        return time.process_time(), 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, children_usage.ru_utime + children_usage.ru_stime
+
+
+class Profiler:
+    """
+    Records the duration, CPU time, temp folder growth and peak memory of the stages of a job, and every shell
+    command run meanwhile with its exit code. The report is one JSON file, which is also a trace event file
+    loadable by chrome://tracing or Perfetto.
+    """
+
+    def __init__(self, report_file, temp_folder=None, profile_python=False):
+        self.report_file = report_file
+        self.temp_folder = temp_folder
+        self.start_time = time.perf_counter()
+        self.stages = []
+        self.commands = []
+        # every thread has its own stack of open stages.
+        self.local = threading.local()
+        # cProfile only profiles the thread which enables it, the one of the job.
+        self.python_profile = cProfile.Profile() if profile_python else None
+        self.python_profile_thread = threading.get_ident()
+        self.python_profile_depth = 0
+        self.lock = threading.Lock()
+
+    def get_stage_stack(self):
+        stage_stack = getattr(self.local, 'stage_stack', None)
+        if stage_stack is None:
+            stage_stack = self.local.stage_stack = []
+        return stage_stack
+
+    def set_stage_stack(self, stage_stack):
+        self.local.stage_stack = stage_stack
+
+    def get_timestamp(self):
+        return time.perf_counter() - self.start_time
+
+    def get_temp_size(self):
+        return get_folder_size(self.temp_folder) if self.temp_folder and os.path.isdir(self.temp_folder) else 0
+
+    @contextlib.contextmanager
+    def stage(self, name, python=False):
+        stage_stack = self.get_stage_stack()
+        record = {'name': name, 'parent': stage_stack[-1]['name'] if stage_stack else None,
+                  'start': self.get_timestamp(), 'thread': threading.get_native_id()}
+        temp_size = self.get_temp_size()
+        cpu_time, children_cpu_time = get_cpu_times()
+        stage_stack.append(record)
+        if python:
+            self.enable_python_profile()
+        try:
+            yield record
+        finally:
+            if python:
+                self.disable_python_profile()
+            stage_stack.pop()
+
+            end_cpu_time, end_children_cpu_time = get_cpu_times()
+            temp_end_size = self.get_temp_size()
+            record['duration'] = self.get_timestamp() - record['start']
+            record['cpu_time'] = end_cpu_time - cpu_time
+            record['children_cpu_time'] = end_children_cpu_time - children_cpu_time
+            record['temp_size'] = temp_end_size
+            # files removed meanwhile hide the bytes written, it's the growth of the temp folder.
+            record['temp_bytes_written'] = max(0, temp_end_size - temp_size)
+            record['peak_rss'], record['children_peak_rss'] = get_peak_rss()
+            with self.lock:
+                self.stages.append(record)
+
+    def enable_python_profile(self):
+        if self.python_profile and threading.get_ident() == self.python_profile_thread:
+            if self.python_profile_depth == 0:
+                self.python_profile.enable()
+            self.python_profile_depth += 1
+
+    def disable_python_profile(self):
+        if self.python_profile and threading.get_ident() == self.python_profile_thread:
+            self.python_profile_depth -= 1
+            if self.python_profile_depth == 0:
+                self.python_profile.disable()
+
+    def record_command(self, command, start, exit_code):
+        # shell commands may run in worker threads, they belong to the innermost stage the thread is in.
+        stage_stack = self.get_stage_stack()
+        with self.lock:
+            self.commands.append({
+                'command': command,
+                'stage': stage_stack[-1]['name'] if stage_stack else None,
+                'start': start,
+                'duration': self.get_timestamp() - start,
+                'exit_code': exit_code,
+                'thread': threading.get_native_id(),
+            })
+
+    def get_trace_events(self, stages, commands):
+        pid = os.getpid()
+        events = []
+        for stage in stages:
+            events.append({
+                'name': stage['name'], 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': stage['thread'],
+                'ts': stage['start'] * 1e6, 'dur': stage['duration'] * 1e6,
+                'args': {key: value for key, value in stage.items()
+                         if key not in ('name', 'start', 'duration', 'thread')},
+            })
+        for command in commands:
+            events.append({
+                'name': command['command'].split(' ', 1)[0], 'cat': 'shell', 'ph': 'X', 'pid': pid,
+                'tid': command['thread'], 'ts': command['start'] * 1e6, 'dur': command['duration'] * 1e6,
+                'args': {'command': command['command'], 'exit_code': command['exit_code']},
+            })
+        return sorted(events, key=lambda event: event['ts'])
+
+    def write(self, **info):
+        with self.lock:
+            stages, commands = list(self.stages), list(self.commands)
+        report = dict(info, total_time=self.get_timestamp(), stages=stages, commands=commands,
+                      traceEvents=self.get_trace_events(stages, commands), displayTimeUnit='ms')
+
+        if self.python_profile:
+            python_profile_file = f"{self.report_file.rsplit('.', 1)[0]}.prof"
+            self.python_profile.dump_stats(python_profile_file)
+            report['python_profile'] = python_profile_file
+
+        with open(self.report_file, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"Profile: {self.report_file}")
+
+
+def get_profiler():
+    return getattr(_local, 'profiler', None)
+
+
+def start_profiling(report_file, temp_folder=None, profile_python=False):
+    # profiles the job of the calling thread, the jobs of other threads may have their own profilers.
+    _local.profiler = Profiler(report_file, temp_folder, profile_python)
+    return _local.profiler
+
+
+def stop_profiling(**info):
+    profiler, _local.profiler = get_profiler(), None
+    if profiler:
+        profiler.write(**info)
+
+
+def propagate(function):
+    """
+    Wraps a function run by a worker thread, so it's profiled by the profiler of the calling thread, within the
+    stage the calling thread is in.
+    """
+    profiler = get_profiler()
+    if not profiler:
+        return function
+    stage_stack = list(profiler.get_stage_stack())
+
+    def run(*args, **kwargs):
+        previous_profiler, previous_stage_stack = get_profiler(), profiler.get_stage_stack()
+        _local.profiler = profiler
+        profiler.set_stage_stack(list(stage_stack))
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.profiler = previous_profiler
+            profiler.set_stage_stack(previous_stage_stack)
+
+    return run
+
+
+def stage(name, python=False):
+    # python stages are also profiled by cProfile when enabled, the others mostly wait for ffmpeg.
+    profiler = get_profiler()
+    return profiler.stage(name, python) if profiler else contextlib.nullcontext()
+
+
+def get_command_start():
+    profiler = get_profiler()
+    return profiler.get_timestamp() if profiler else None
+
+
+def record_command(command, start, exit_code):
+    profiler = get_profiler()
+    if profiler and start is not None:
+        profiler.record_command(command, start, exit_code)
@@ -2,6 +2,8 @@ import os
 import subprocess
 import sys
 
+from utils import profile_utils
+
 
 def get_script_path():
     return os.path.dirname(os.path.realpath(sys.argv[0]))
@@ -15,10 +17,30 @@ ENV['PATH'] = f"{ENV['PATH']}{os.pathsep}{WORKING_DIR}"
 
 def do_shell(command, stdout=None, encoding='utf-8'):
     print(f"[Shell] {command}")
+    start = profile_utils.get_command_start()
     if stdout == STRING:
-        return subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, encoding=encoding, env=ENV).stdout
+        result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, encoding=encoding, env=ENV)
+        profile_utils.record_command(command, start, result.returncode)
+        return result.stdout
     else:
-        subprocess.run(command, shell=True, stdout=stdout, encoding=encoding, env=ENV)
+        result = subprocess.run(command, shell=True, stdout=stdout, encoding=encoding, env=ENV)
+        profile_utils.record_command(command, start, result.returncode)
+        return result.returncode
+
+
+def open_shell(command, stdin=None):
+    # starts the command with its stdout piped back, the caller reads and waits for it.
+    print(f"[Shell] {command}")
+    process = subprocess.Popen(command, shell=True, stdin=stdin, stdout=subprocess.PIPE, env=ENV)
+    process.profile_start = profile_utils.get_command_start()
+    return process
+
+
+def wait_shell(process):
+    # waits for a command started by open_shell, returns its exit code.
+    exit_code = process.wait()
+    profile_utils.record_command(process.args, process.profile_start, exit_code)
+    return exit_code
 
 
 def take_until(elements, condition):
@@ -1,3 +1,7 @@
+import numpy as np
+from timecode import Timecode
+
+
 def format_timecode(timecode_str: str):
     delimiters = iter([";", "."])
     for delimiter in delimiters:
@@ -16,6 +20,54 @@ def format_timecode(timecode_str: str):
     return ":".join(parts)
 
 
+def get_int_frame_rate(timecode: Timecode):
+    # the nominal frame rate of the timecode, from its public frame rate: 30 for 29.97, 24 for 23.976.
+    if str(timecode.framerate) in ('ms', '1000'):
+        return 1000
+    if str(timecode.framerate) == 'frames':
+        return 1
+    frame_rate = float(timecode.framerate)
+    ntsc_frame_rate = round(frame_rate * 1001 / 1000)
+    if abs(frame_rate - ntsc_frame_rate * 1000 / 1001) < 0.005:
+        return ntsc_frame_rate
+    return int(frame_rate)
+
+
+def format_frames(frames, frame_rate):
+    """
+    Formats the 0-based frame numbers like str(Timecode(frame_rate, frames=frame + 1)) does, for whole arrays at once.
+    Returns a numpy array of strings.
+    """
+    # the Timecode parses the frame rate, so the rounding and drop frame rules stay the same as the library's.
+    timecode = Timecode(frame_rate)
+    int_frame_rate = get_int_frame_rate(timecode)
+    if timecode.drop_frame:
+        float_frame_rate = float(timecode.framerate)
+        drop_frames = round(float_frame_rate * 0.066666)
+    else:
+        float_frame_rate = float(int_frame_rate)
+        drop_frames = 0
+    frames_per_10_minutes = round(float_frame_rate * 60 * 10)
+    frames_per_24_hours = round(float_frame_rate * 60 * 60 * 24)
+    frames_per_minute = int(round(float_frame_rate) * 60) - drop_frames
+
+    frame_number = np.asarray(frames, dtype=np.int64) % frames_per_24_hours
+    if timecode.drop_frame:
+        tens, remainder = np.divmod(frame_number, frames_per_10_minutes)
+        frame_number = frame_number + drop_frames * 9 * tens + np.where(
+            remainder > drop_frames, drop_frames * ((remainder - drop_frames) // frames_per_minute), 0)
+
+    seconds, frame_part = np.divmod(frame_number, int_frame_rate)
+    minutes, second_part = np.divmod(seconds, 60)
+    hours, minute_part = np.divmod(minutes, 60)
+
+    def pad(values):
+        return np.char.zfill(values.astype(str), 2)
+
+    return np.char.add(np.char.add(np.char.add(np.char.add(np.char.add(np.char.add(
+        pad(hours), ':'), pad(minute_part)), ':'), pad(second_part)), timecode.frame_delimiter), pad(frame_part))
+
+
 if __name__ == '__main__':
     print(format_timecode("00.12"))
     print(format_timecode("12"))
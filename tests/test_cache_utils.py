@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from utils.cache_utils import TEMP_FILE_MAX_AGE, RenderCache
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    input_file = tmp_path / 'input.mp4'
+    input_file.write_bytes(b'input')
+    return str(input_file)
+
+
+def render(cache, key, size=1024):
+    temp_path = cache.get_temp_path(key, '.mp4')
+    with open(temp_path, 'wb') as temp_file:
+        temp_file.write(b'\0' * size)
+    return cache.store(key, '.mp4', temp_path)
+
+
+def set_modified_time(path, modified_time):
+    os.utime(path, (modified_time, modified_time))
+
+
+def test_render_cache_hit_and_miss(tmp_path, input_file):
+    cache = RenderCache(str(tmp_path / 'render'))
+    key = cache.get_key(input_file, 1, 'chunk0000', 0, 300)
+
+    assert cache.load(key, '.mp4') is None
+    entry_path = render(cache, key)
+    assert cache.load(key, '.mp4') == entry_path
+    assert os.listdir(cache.folder) == [os.path.basename(entry_path)]
+    # other settings, or another extension, are other entries.
+    assert cache.load(cache.get_key(input_file, 1, 'chunk0000', 0, 301), '.mp4') is None
+    assert cache.load(key, '.mkv') is None
+
+
+def test_render_cache_key_changes_with_input(tmp_path, input_file):
+    cache = RenderCache(str(tmp_path / 'render'))
+    key = cache.get_key(input_file, 1)
+    with open(input_file, 'ab') as file:
+        file.write(b'changed')
+    assert cache.get_key(input_file, 1) != key
+
+
+def test_render_cache_evicts_least_recently_used(tmp_path, input_file):
+    cache = RenderCache(str(tmp_path / 'render'), max_size=2.5 / 1024)
+    keys = [cache.get_key(input_file, index) for index in range(3)]
+    now = time.time()
+    for index, key in enumerate(keys):
+        set_modified_time(render(cache, key), now - 100 + index)
+    # a hit makes the oldest entry the most recently used one.
+    assert cache.load(keys[0], '.mp4')
+
+    cache.evict()
+
+    assert cache.load(keys[1], '.mp4') is None
+    assert cache.load(keys[0], '.mp4') and cache.load(keys[2], '.mp4')
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="processes are not probed on windows")
+def test_render_cache_evicts_stale_temp_files(tmp_path, input_file):
+    cache = RenderCache(str(tmp_path / 'render'))
+    key = cache.get_key(input_file, 1)
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    dead_pid = process.pid
+    temp_files = {
+        'running': cache.get_temp_path(key, '.mp4'),
+        'dead': os.path.join(cache.folder, f'{key}.{dead_pid}.1.tmp.mp4'),
+        'old': os.path.join(cache.folder, f'{key}.{os.getpid()}.2.tmp.mp4'),
+    }
+    for temp_file in temp_files.values():
+        with open(temp_file, 'wb') as file:
+            file.write(b'\0')
+    set_modified_time(temp_files['old'], time.time() - TEMP_FILE_MAX_AGE - 60)
+
+    cache.evict()
+
+    assert os.path.exists(temp_files['running'])
+    assert not os.path.exists(temp_files['dead'])
+    assert not os.path.exists(temp_files['old'])
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from editor.loudness import dilate_frames, get_runs
+
+
+def get_edit_points_loop(has_loud_audio, frame_margin):
+    # the per-frame loop dilate_frames and get_runs replaced, as (start_frame, end_frame, should_keep).
+    frame_count = has_loud_audio.shape[0]
+    edit_points = [(0, 0, 0)]
+    should_include_frame = np.zeros(frame_count)
+    for i in range(frame_count):
+        start = int(max(0, i - frame_margin))
+        end = int(min(frame_count, i + 1 + frame_margin))
+        should_include_frame[i] = np.max(has_loud_audio[start:end])
+        if i >= 1 and should_include_frame[i] != should_include_frame[i - 1]:
+            edit_points.append((edit_points[-1][1], i, should_include_frame[i - 1]))
+
+    edit_points.append((edit_points[-1][1], frame_count, should_include_frame[frame_count - 1]))
+    return should_include_frame, edit_points[1:]
+
+
+@pytest.mark.parametrize('frame_margin', [0, 1, 2, 3, 0.5, 1.5, 2.7, 10])
+@pytest.mark.parametrize('loud_probability', [0.02, 0.2, 0.5, 0.95])
+def test_runs_match_loop(frame_margin, loud_probability):
+    random = np.random.default_rng(int(frame_margin * 10) + int(loud_probability * 100))
+    for frame_count in [1, 2, 7, 500]:
+        has_loud_audio = (random.random(frame_count) < loud_probability).astype(np.float64)
+        expected_frames, expected_edit_points = get_edit_points_loop(has_loud_audio, frame_margin)
+
+        should_include_frame = dilate_frames(has_loud_audio, frame_margin)
+        boundaries, should_keep = get_runs(should_include_frame)
+        np.testing.assert_array_equal(should_include_frame, expected_frames)
+        assert list(zip(boundaries[:-1].tolist(), boundaries[1:].tolist(), should_keep.tolist())) == \
+            expected_edit_points
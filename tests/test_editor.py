@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from editor.editor import Editor
+from editor.time_stretch import TIME_STRETCH_PHASEVOCODER, TIME_STRETCH_WSOLA
+
+
+def get_editor(stretch_workers, silent_backend):
+    return Editor(SimpleNamespace(stretch_workers=stretch_workers, audio_fade_envelope_size=400, resample_speed=0,
+                                  time_stretch=(silent_backend, TIME_STRETCH_PHASEVOCODER)))
+
+
+def get_segments(sample_count, random):
+    boundaries = np.unique(np.concatenate(([0, sample_count], random.integers(0, sample_count, 38))))
+    segments = []
+    for i, (start, end) in enumerate(zip(boundaries[:-1].tolist(), boundaries[1:].tolist())):
+        should_keep = i % 2 == 0
+        segments.append((start, end, 1.0 if should_keep else 5.0, should_keep))
+    # a sped up kept segment, stretched by the loud backend.
+    segments[0] = segments[0][:2] + (1.5, True)
+    return segments
+
+
+@pytest.mark.parametrize('silent_backend', [TIME_STRETCH_PHASEVOCODER, TIME_STRETCH_WSOLA])
+@pytest.mark.parametrize('workers', [3, 8])
+def test_pooled_segments_match_serial(silent_backend, workers):
+    random = np.random.default_rng(1)
+    audio_data = random.uniform(-1, 1, (44100 * 20, 2)).astype(np.float32)
+    segments = get_segments(audio_data.shape[0], random)
+
+    serial = list(get_editor(1, silent_backend).render_segments(audio_data, segments))
+    pooled = list(get_editor(workers, silent_backend).render_segments(audio_data, segments))
+    assert len(pooled) == len(serial)
+    for serial_segment, pooled_segment in zip(serial, pooled):
+        np.testing.assert_array_equal(pooled_segment, serial_segment)
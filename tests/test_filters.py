@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from editor.filters import get_kept_spans, split_fixed_chunks, split_smart_pieces
+
+
+def get_random_intervals(random, frame_count, interval_count):
+    bounds = np.unique(random.integers(0, frame_count, interval_count * 2))
+    # the closed removed intervals, sorted and disjoint.
+    return [(int(start), int(end) - 1) for start, end in zip(bounds[0::2], bounds[1::2]) if end - 1 >= start]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_smart_pieces_cover_kept_frames_once(seed):
+    random = np.random.default_rng(seed)
+    frame_count = int(random.integers(1, 3000))
+    intervals = get_random_intervals(random, frame_count, int(random.integers(0, 20)))
+    keyframes = np.unique(np.concatenate(([0], random.integers(0, frame_count, int(random.integers(1, 40))))))
+    min_copy_frame_count = int(random.integers(1, 100))
+    pieces = split_smart_pieces(intervals, frame_count, keyframes, min_copy_frame_count)
+
+    covered = np.zeros(frame_count, dtype=np.int64)
+    for start, end, copy in pieces:
+        assert start < end
+        covered[start:end] += 1
+        if copy:
+            # copied pieces are whole GOPs, long enough to be worth copying.
+            assert start in keyframes and (end in keyframes or end == frame_count)
+            assert end - start >= min_copy_frame_count
+
+    kept = np.ones(frame_count, dtype=np.int64)
+    for start, end in intervals:
+        kept[start:end + 1] = 0
+    np.testing.assert_array_equal(covered, kept)
+    assert [start for start, _, _ in pieces] == sorted(start for start, _, _ in pieces)
+
+
+def test_kept_spans_between_intervals():
+    assert get_kept_spans([(0, 4), (10, 19)], 30) == [(5, 10), (20, 30)]
+    assert get_kept_spans([(5, 29)], 30) == [(0, 5)]
+    assert get_kept_spans([], 30) == [(0, 30)]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_fixed_chunks_match_the_removed_frames(seed):
+    random = np.random.default_rng(seed)
+    frame_count = int(random.integers(1, 3000))
+    intervals = get_random_intervals(random, frame_count, int(random.integers(0, 20)))
+    chunk_frame_count = int(random.integers(1, 500))
+    chunks = split_fixed_chunks(intervals, frame_count, chunk_frame_count)
+
+    removed = np.zeros(frame_count, dtype=bool)
+    for start, end in intervals:
+        removed[start:end + 1] = True
+    kept_before = np.concatenate(([0], np.cumsum(~removed)))
+    expected_starts = [start for start in range(0, frame_count, chunk_frame_count)
+                       if not removed[start:start + chunk_frame_count].all()]
+    assert [chunk[0] for chunk in chunks] == expected_starts
+    for start, end, chunk_intervals, chunk_kept_before in chunks:
+        assert end == min(start + chunk_frame_count, frame_count)
+        assert chunk_kept_before == kept_before[start]
+        chunk_removed = np.zeros(end - start, dtype=bool)
+        for interval_start, interval_end in chunk_intervals:
+            assert 0 <= interval_start <= interval_end < end - start
+            chunk_removed[interval_start:interval_end + 1] = True
+        assert np.array_equal(chunk_removed, removed[start:end])
+
+
+def test_fixed_chunks_only_change_with_their_cuts():
+    intervals = [(10, 19), (95, 130), (250, 260)]
+    chunks = split_fixed_chunks(intervals, 400, 100)
+    # a cut in the third range changes it, and the kept frame count before the later ranges.
+    changed_chunks = split_fixed_chunks([(10, 19), (95, 130), (240, 260)], 400, 100)
+
+    assert [chunk[:3] for chunk in changed_chunks[:2]] == [chunk[:3] for chunk in chunks[:2]]
+    assert changed_chunks[2][2] != chunks[2][2]
+    assert changed_chunks[3][:3] == chunks[3][:3]
+    assert chunks[1][2] == [(0, 30)]
+    assert chunks[0][2] == [(10, 19), (95, 99)]
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from editor.edit_plan import EditPlan
+from editor.outputs import LiveSegmentOutput
+
+
+@pytest.fixture
+def output(tmp_path):
+    parameter = SimpleNamespace(input_file=str(tmp_path / 'input.mp4'), output_file=str(tmp_path / 'live.m3u8'),
+                                live_segment_duration=1000, frame_rate=10, samples_per_frame=4410,
+                                audio_sample_count=44100 * 100, audio_sample_rate=44100, cut_backend='expression',
+                                audio_only=False, mapping=None, mapping_index=None)
+    output = LiveSegmentOutput(parameter=parameter)
+    yield output
+    output.executor.shutdown()
+
+
+def get_segments(output, boundaries, should_keep, new_speed):
+    edit_plan = EditPlan.from_runs(np.array(boundaries), should_keep, new_speed)
+    edit_plan.set_output_lengths(edit_plan.get_stretched_lengths(4410, 44100 * 100), 4410)
+    output.apply_edit_plan(edit_plan)
+    return output.chunk_segments
+
+
+def test_cuts_match_direct_video_output(output):
+    # the removed input frames of the segment [10, 20) are [11, 20], like DirectVideoOutput.
+    segments = get_segments(output, [0, 10, 20, 30], [1, 0, 1], [99999, 1])
+    assert not output.needs_retime(segments)
+    video_filter, audio_filter = output.get_chunk_filters(0, 30, segments, 0, 3.15)
+    assert 'between(n, 11, 20)' in video_filter and 'setpts=N/FR/TB' in video_filter
+    assert 'between(t, 1.1, 2.1)' in audio_filter
+
+    # later chunks leave their first frame to the chunk before.
+    video_filter, _ = output.get_chunk_filters(10, 30, segments[1:], 0.95, 2.15)
+    assert 'between(n, 0, 0)' in video_filter and 'between(n, 1, 10)' in video_filter
+
+
+def test_sped_up_segments_are_retimed(output):
+    segments = get_segments(output, [0, 10, 40, 50], [1, 0, 1], [5, 1])
+    assert output.needs_retime(segments)
+    video_filter, audio_filter = output.get_chunk_filters(0, 50, segments, 0, 5.15)
+    assert 'setpts=' in video_filter and 'fps=10' in video_filter
+    assert 'atempo=2.0,atempo=1.25' in audio_filter and 'concat=n=3' in audio_filter
@@ -0,0 +1,121 @@
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from editor import loudness
+from editor.editor import Editor
+from editor.loudness import FramePeakAccumulator, get_frame_peaks
+
+# 44100 / 30 is an integer, the others are not, 48000 / 29.97 and 44100 / 23.976 are fractional.
+SAMPLES_PER_FRAME = [1470, 48000 / 29.97, 44100 / 23.976, 22050 / 60, 7.5, 1]
+
+
+def get_max_volume(s):
+    max_value = float(np.max(s))
+    min_value = float(np.min(s))
+    return max(max_value, -min_value)
+
+
+def get_loop_frame_peaks(audio_data, samples_per_frame):
+    # the per-frame loop get_frame_peaks replaced.
+    sample_count = audio_data.shape[0]
+    frame_count = int(math.ceil(sample_count / samples_per_frame))
+    frame_peaks = np.zeros(frame_count)
+    for i in range(frame_count):
+        start = int(i * samples_per_frame)
+        end = min(int((i + 1) * samples_per_frame), sample_count)
+        frame_peaks[i] = get_max_volume(audio_data[start:end])
+    return frame_peaks
+
+
+def get_audio(random, sample_count, channels=2):
+    shape = (sample_count, channels) if channels else (sample_count,)
+    return random.integers(-32768, 32768, shape).astype(np.int16)
+
+
+@pytest.mark.parametrize('samples_per_frame', SAMPLES_PER_FRAME)
+@pytest.mark.parametrize('channels', [0, 1, 2])
+def test_frame_peaks_match_the_frame_loop(samples_per_frame, channels):
+    random = np.random.default_rng(int(samples_per_frame * 1000) + channels)
+    # the last frame is partial.
+    sample_count = int(samples_per_frame * 97) + 3
+    audio_data = get_audio(random, sample_count, channels)
+
+    expected = get_loop_frame_peaks(audio_data, samples_per_frame)
+    assert np.array_equal(get_frame_peaks(audio_data, samples_per_frame), expected)
+
+
+@pytest.mark.parametrize('samples_per_frame', SAMPLES_PER_FRAME)
+def test_frame_peaks_match_the_frame_loop_across_blocks(monkeypatch, samples_per_frame):
+    # small blocks, so most frames start near a block boundary.
+    monkeypatch.setattr(loudness, 'BLOCK_SAMPLES', 4000)
+    audio_data = get_audio(np.random.default_rng(7), int(samples_per_frame * 301) + 1)
+
+    expected = get_loop_frame_peaks(audio_data, samples_per_frame)
+    assert np.array_equal(get_frame_peaks(audio_data, samples_per_frame), expected)
+
+
+def get_loop_loud_frame(parameter):
+    # Editor.get_loud_frame before it was vectorized.
+    has_loud_audio = np.zeros(parameter.audio_frame_count)
+    for i in range(0, parameter.keep_frames_from_start):
+        has_loud_audio[i] = 1
+    frames_count_to_cut = parameter.audio_frame_count - parameter.keep_frames_from_end
+    for i in range(parameter.keep_frames_from_start, frames_count_to_cut):
+        start = int(i * parameter.samples_per_frame)
+        end = min(int((i + 1) * parameter.samples_per_frame), parameter.audio_sample_count)
+        max_chunks_volume = float(get_max_volume(parameter.audio_data[start:end])) / parameter.max_audio_volume
+        if max_chunks_volume >= parameter.silent_threshold:
+            has_loud_audio[i] = 1
+    for i in range(frames_count_to_cut, parameter.audio_frame_count):
+        has_loud_audio[i] = 1
+    return has_loud_audio
+
+
+@pytest.mark.parametrize('samples_per_frame', SAMPLES_PER_FRAME)
+@pytest.mark.parametrize('keep_frames', [(0, 0), (3, 5)])
+def test_loud_frame_matches_the_frame_loop(samples_per_frame, keep_frames):
+    random = np.random.default_rng(3)
+    sample_count = int(samples_per_frame * 200) + 1
+    # mostly quiet audio with loud bursts, so the threshold decides for many frames.
+    audio_data = (get_audio(random, sample_count) // 64).astype(np.int16)
+    audio_data[random.integers(0, sample_count, 40)] = 20000
+    parameter = SimpleNamespace(
+        audio_data=audio_data, samples_per_frame=samples_per_frame, audio_sample_count=sample_count,
+        audio_frame_count=int(math.ceil(sample_count / samples_per_frame)), frame_peaks=None,
+        max_audio_volume=get_max_volume(audio_data), silent_threshold=0.03,
+        keep_frames_from_start=keep_frames[0], keep_frames_from_end=keep_frames[1])
+
+    assert np.array_equal(Editor(parameter).get_loud_frame(), get_loop_loud_frame(parameter))
+
+
+@pytest.mark.parametrize('samples_per_frame', SAMPLES_PER_FRAME)
+@pytest.mark.parametrize('seed', range(5))
+def test_accumulated_frame_peaks_match_the_whole_audio(samples_per_frame, seed):
+    random = np.random.default_rng(seed)
+    audio_data = get_audio(random, int(samples_per_frame * random.integers(50, 300)) + int(random.integers(0, 5)))
+    expected = get_frame_peaks(audio_data, samples_per_frame)
+
+    accumulator = FramePeakAccumulator(samples_per_frame)
+    taken = []
+    position = 0
+    while position < audio_data.shape[0]:
+        # chunks smaller than a frame, and chunks splitting frames anywhere, including empty ones.
+        chunk_size = int(random.integers(0, max(2, int(samples_per_frame * 3))))
+        accumulator.update(audio_data[position:position + chunk_size])
+        position += chunk_size
+        if random.random() < 0.3:
+            taken.append(accumulator.take())
+            # the taken frames are complete, the whole audio gives them the same peaks.
+            taken_count = sum(frame_peaks.shape[0] for frame_peaks in taken)
+            assert np.array_equal(np.concatenate(taken), expected[:taken_count])
+
+    frame_peaks = accumulator.finish()
+    taken.append(accumulator.take())
+
+    assert np.array_equal(frame_peaks, expected)
+    assert np.array_equal(np.concatenate(taken), expected)
+    assert accumulator.sample_count == audio_data.shape[0]
+    assert accumulator.max_volume == get_max_volume(audio_data)
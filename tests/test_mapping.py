@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from editor.edit_plan import EditPlan
+from editor.mapping import REMOVED_DROP, REMOVED_SNAP, TimeMapping
+from utils.timecode_utils import format_frames
+
+
+def get_mapping():
+    # kept, removed, sped up twice and kept segments of 1 second at 10 fps.
+    return TimeMapping(start_frames=[0, 10, 20, 40], end_frames=[10, 20, 40, 50],
+                       output_start_frames=[0, 10, 10, 20], output_end_frames=[10, 10, 20, 30],
+                       is_removed=[False, True, False, False], frame_rate=10)
+
+
+def assert_same_mapping(mapping, expected):
+    for name in ['start_frames', 'end_frames', 'output_start_frames', 'output_end_frames', 'is_removed']:
+        assert np.array_equal(getattr(mapping, name), getattr(expected, name)), name
+    assert mapping.frame_rate == expected.frame_rate
+
+
+@pytest.mark.parametrize('frame, snapped, dropped', [
+    (0, 0, 0),
+    (9.5, 9.5, 9.5),
+    # the first frame of the removed segment, and one inside it, go to the cut.
+    (10, 10, np.nan),
+    (15, 10, np.nan),
+    (19.9, 10, np.nan),
+    # the first frame after the cut, and the proportional positions in the sped up segment.
+    (20, 10, 10),
+    (30, 15, 15),
+    (39, 19.5, 19.5),
+    (40, 20, 20),
+    # positions past the ends are clamped.
+    (-5, 0, 0),
+    (50, 30, 30),
+    (70, 30, 30),
+])
+def test_remap_frames(frame, snapped, dropped):
+    mapping = get_mapping()
+    assert mapping.remap_frames([frame], REMOVED_SNAP)[0] == pytest.approx(snapped)
+    assert mapping.remap_frames([frame], REMOVED_DROP)[0] == pytest.approx(dropped, nan_ok=True)
+
+
+def test_remap_seconds():
+    mapping = get_mapping()
+    assert mapping.remap([0.5, 1.5, 3, 4.5]).tolist() == pytest.approx([0.5, 1, 1.5, 2.5])
+    assert np.isnan(mapping.remap([1.5], REMOVED_DROP)).all()
+    with pytest.raises(ValueError):
+        mapping.remap([1], 'keep')
+
+
+def test_remap_without_segments():
+    mapping = TimeMapping([], [], [], [], [], 30)
+    assert mapping.remap([1, 2]).tolist() == [0, 0]
+
+
+def test_from_edit_plan():
+    edit_plan = EditPlan([0, 10, 20, 40], [10, 20, 40, 50], [True, False, True, True], [1, 99999, 2, 1])
+    edit_plan.set_output_lengths([1000, 0, 1000, 1000], 100)
+    assert_same_mapping(TimeMapping.from_edit_plan(edit_plan, 10), get_mapping())
+
+
+def test_save_and_load(tmp_path):
+    mapping = get_mapping()
+    mapping.save(tmp_path / 'mapping.npz')
+    assert_same_mapping(TimeMapping.load(tmp_path / 'mapping.npz'), mapping)
+
+
+@pytest.mark.parametrize('frame_rate', [10, 30, 29.97])
+def test_load_text(tmp_path, frame_rate):
+    mapping = get_mapping()
+    mapping.frame_rate = float(frame_rate)
+    # the lines written by --mapping.
+    lines = np.char.add(np.char.add(format_frames(mapping.end_frames, frame_rate), ' '),
+                        format_frames(mapping.output_end_frames, frame_rate)).tolist()
+    (tmp_path / 'mapping.txt').write_text("".join(f"{line}\n" for line in lines))
+    assert_same_mapping(TimeMapping.load_text(str(tmp_path / 'mapping.txt'), frame_rate), mapping)
+
+
+def test_concatenate():
+    mapping = get_mapping()
+    first = TimeMapping(mapping.start_frames[:2], mapping.end_frames[:2], mapping.output_start_frames[:2],
+                        mapping.output_end_frames[:2], mapping.is_removed[:2], 10)
+    second = TimeMapping(mapping.start_frames[2:], mapping.end_frames[2:], mapping.output_start_frames[2:],
+                         mapping.output_end_frames[2:], mapping.is_removed[2:], 10)
+    assert_same_mapping(TimeMapping.concatenate([first, second]), mapping)
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from editor.edit_plan import EditPlan
+from editor.outputs import DirectVideoOutput
+
+
+def get_output(tmp_path, frame_count):
+    return DirectVideoOutput(parameter=SimpleNamespace(
+        input_file=str(tmp_path / 'input.mp4'), output_file=str(tmp_path / 'output.mp4'), temp_folder=str(tmp_path),
+        video_frame_count=frame_count, audio_frame_count=frame_count, frame_rate=30, input_sections=None,
+        new_speed=[99999, 1]))
+
+
+@pytest.mark.parametrize('silent_speed, variable_speed', [(99999, False), (5, True), (100, False), (20, True)])
+def test_variable_speed_follows_the_segments(tmp_path, silent_speed, variable_speed):
+    # a long input of 30 frame runs, the silent ones removed unless they last longer than 1 output frame.
+    frame_count = 300000
+    boundaries = np.arange(0, frame_count + 1, 30)
+    edit_plan = EditPlan.from_runs(boundaries, np.arange(boundaries.shape[0] - 1) % 2 == 0, [silent_speed, 1])
+    output = get_output(tmp_path, frame_count)
+    output.plan_edit(edit_plan)
+    assert output.variable_speed == variable_speed
+    assert output.needs_audio == variable_speed
+
+
+@pytest.mark.parametrize('codec, profile, level, options', [
+    ('h264', 'High', 41, '-profile:v high -level:v 4.1 '),
+    ('h264', 'Constrained Baseline', 30, '-profile:v baseline -level:v 3 '),
+    ('hevc', 'Main 10', 123, '-profile:v main10 -x265-params level-idc=4.1 '),
+    ('hevc', 'Rext', None, ''),
+])
+def test_smart_encoder_matches_input_profile_and_level(tmp_path, codec, profile, level, options):
+    output = get_output(tmp_path, 300)
+    output.parameter.__dict__.update(video_codec=codec, video_profile=profile, video_level=level, bit_rate=2000,
+                                     pixel_format=None)
+    assert output.get_smart_encoder().endswith(f'2000k {options}')
+
+
+@pytest.mark.parametrize('output_file, smart_render', [('output.mp4', False), ('output.ts', True),
+                                                       ('output.mkv', True)])
+def test_smart_render_needs_in_band_codec_parameters(tmp_path, output_file, smart_render):
+    output = get_output(tmp_path, 300)
+    output.parameter.__dict__.update(smart_render=1, video_codec='h264', output_file=str(tmp_path / output_file))
+    assert output.can_smart_render() == smart_render
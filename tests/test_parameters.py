@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from parameters import InputParameter
+from utils.cache_utils import AnalysisCache
+
+
+def get_parameter(tmp_path, analysis_cache, clear_cache):
+    parameter = SimpleNamespace(analysis_cache=analysis_cache, clear_cache=clear_cache, cache=None,
+                                cache_folder=str(tmp_path), cache_size=100)
+    parameter.get_analysis_cache = InputParameter.get_analysis_cache.__get__(parameter)
+    return parameter
+
+
+@pytest.mark.parametrize('analysis_cache', [0, 1])
+def test_clear_cache_without_analysis_cache(tmp_path, analysis_cache):
+    cache = AnalysisCache(str(tmp_path))
+    input_file = tmp_path / 'input.mp4'
+    input_file.write_bytes(b'input')
+    key = cache.get_key(str(input_file))
+    cache.store(key, {'duration': 1.0}, np.zeros(4))
+    assert cache.load(key)
+
+    parameter = get_parameter(tmp_path, analysis_cache, clear_cache=1)
+
+    assert (parameter.get_analysis_cache() is not None) == bool(analysis_cache)
+    assert not cache.get_entries()
+    assert cache.load(key) is None
+
+
+def test_analysis_cache_is_disabled_by_default(tmp_path):
+    assert get_parameter(tmp_path, analysis_cache=0, clear_cache=0).get_analysis_cache() is None
+    assert isinstance(get_parameter(tmp_path, analysis_cache=1, clear_cache=0).get_analysis_cache(), AnalysisCache)
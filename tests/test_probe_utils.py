@@ -0,0 +1,32 @@
+import os
+
+from utils import probe_utils
+
+ENCODERS_OUTPUT = """Encoders:
+ V..... = Video
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10 (codec h264)
+ A....D aac                  AAC (Advanced Audio Coding)
+"""
+
+
+def test_encoders_cache_is_replaced_atomically(monkeypatch, tmp_path):
+    queries = []
+
+    def do_shell(command, stdout=None):
+        queries.append(command)
+        return ENCODERS_OUTPUT
+
+    monkeypatch.setattr(probe_utils, 'do_shell', do_shell)
+    monkeypatch.setattr(probe_utils, 'get_ffmpeg_identity', lambda: ['/usr/bin/ffmpeg', 1, 2])
+    # a partial file left by an older version is queried again, and replaced.
+    (tmp_path / 'encoders.json').write_text('{"ffmpeg": ["/usr/bin/ff', encoding='utf-8')
+    probe_utils.get_encoders.cache_clear()
+    expected_encoders = (('V....D', 'libx264'), ('A....D', 'aac'))
+    assert probe_utils.get_encoders(str(tmp_path)) == expected_encoders
+    assert os.listdir(tmp_path) == ['encoders.json']
+
+    probe_utils.get_encoders.cache_clear()
+    assert probe_utils.get_encoders(str(tmp_path)) == expected_encoders
+    assert len(queries) == 1
+    probe_utils.get_encoders.cache_clear()
@@ -0,0 +1,37 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import profile_utils
+
+
+def run_job(name, report_file, barrier):
+    profile_utils.start_profiling(str(report_file))
+    with profile_utils.stage(f'{name}_outer'):
+        # both jobs are within their outer stage before any inner stage starts.
+        barrier.wait()
+        with profile_utils.stage(f'{name}_inner'):
+            barrier.wait()
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                executor.submit(profile_utils.propagate(profile_utils.record_command), f'{name} command',
+                                profile_utils.get_command_start(), 0).result()
+    profile_utils.stop_profiling()
+
+
+def test_concurrent_jobs_have_their_own_profiles(tmp_path):
+    barrier = threading.Barrier(2)
+    threads = [threading.Thread(target=run_job, args=(name, tmp_path / f'{name}.json', barrier))
+               for name in ['a', 'b']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for name in ['a', 'b']:
+        with open(tmp_path / f'{name}.json', encoding='utf-8') as report_file:
+            report = json.load(report_file)
+        assert {stage['name']: stage['parent'] for stage in report['stages']} == \
+            {f'{name}_outer': None, f'{name}_inner': f'{name}_outer'}
+        assert [(command['command'], command['stage']) for command in report['commands']] == \
+            [(f'{name} command', f'{name}_inner')]
+    assert profile_utils.get_profiler() is None
@@ -0,0 +1,87 @@
+import sys
+
+import pytest
+
+import remap
+from editor.mapping import REMOVED_DROP, TimeMapping
+
+
+@pytest.fixture
+def mapping():
+    # kept, removed, sped up twice and kept segments of 1 second at 10 fps.
+    return TimeMapping(start_frames=[0, 10, 20, 40], end_frames=[10, 20, 40, 50],
+                       output_start_frames=[0, 10, 10, 20], output_end_frames=[10, 10, 20, 30],
+                       is_removed=[False, True, False, False], frame_rate=10)
+
+
+SRT = """1
+00:00:00,500 --> 00:00:00,900
+kept
+
+2
+00:00:01,200 --> 00:00:01,800
+removed
+
+3
+00:00:02,000 --> 00:00:04,500
+sped up
+and kept
+"""
+
+VTT = """WEBVTT
+
+00:00.500 --> 00:01.500 align:start
+cut at the end
+
+00:01.200 --> 00:01.800
+removed
+"""
+
+
+def test_remap_srt_file(tmp_path, mapping):
+    (tmp_path / 'a.srt').write_text(SRT)
+    remap.remap_file(mapping, str(tmp_path / 'a.srt'), str(tmp_path / 'b.srt'))
+    # the cue in the removed segment is gone, and the cues are numbered again.
+    assert (tmp_path / 'b.srt').read_text() == """1
+00:00:00,500 --> 00:00:00,900
+kept
+
+2
+00:00:01,000 --> 00:00:02,500
+sped up
+and kept
+"""
+
+
+def test_remap_vtt_file(tmp_path, mapping):
+    (tmp_path / 'a.vtt').write_text(VTT)
+    remap.remap_file(mapping, str(tmp_path / 'a.vtt'), str(tmp_path / 'b.vtt'))
+    assert (tmp_path / 'b.vtt').read_text() == """WEBVTT
+
+00:00:00.500 --> 00:00:01.000 align:start
+cut at the end
+"""
+
+
+def test_remap_sections(mapping):
+    assert remap.remap_sections(mapping, "00:00 intro\n00:03 00:05 outro\n") == \
+        "00:00:00 intro\n00:00:02 00:00:03 outro\n"
+
+
+@pytest.mark.parametrize('removed, expected', [
+    ('snap', "time,views\n0.500,3\n1.000,4\n1.500,5\n"),
+    (REMOVED_DROP, "time,views\n0.500,3\n1.500,5\n"),
+])
+def test_remap_csv_end_to_end(tmp_path, monkeypatch, mapping, capsys, removed, expected):
+    mapping.save(tmp_path / 'a.npz')
+    (tmp_path / 'inputs').mkdir()
+    (tmp_path / 'inputs' / 'views.csv').write_text("time,views\n0.5,3\n1.5,4\n3,5\n")
+    monkeypatch.setattr(sys, 'argv', ['remap.py', '--mapping_index', str(tmp_path / 'a.npz'), '--removed', removed,
+                                      '--output_dir', str(tmp_path / 'outputs'), '--times', '1.5,3',
+                                      str(tmp_path / 'inputs')])
+    remap.main()
+
+    assert (tmp_path / 'outputs' / 'views.csv').read_text() == expected
+    printed = capsys.readouterr().out.splitlines()
+    assert printed[:2] == (['removed', '1.500'] if removed == REMOVED_DROP else ['1.000', '1.500'])
+    assert printed[2] == "Remapped 1 files with 4 segments."
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from editor.section import Section
+
+
+def get_random_plan(random, frame_count, segment_count):
+    boundaries = np.unique(np.concatenate(([0, frame_count], random.integers(1, frame_count, segment_count))))
+    return boundaries[:-1], boundaries[1:]
+
+
+def get_loop_edit_offsets(section_starts, start_frames, end_frames, removed):
+    # the per-cut loop of Section.apply_edit_point that apply_edits replaced.
+    edit_offsets = []
+    for section_start in section_starts:
+        edit_offset = 0
+        for start_frame, end_frame in zip(start_frames[removed].tolist(), end_frames[removed].tolist()):
+            if end_frame < section_start:
+                edit_offset -= end_frame - start_frame
+            elif start_frame < section_start:
+                edit_offset -= section_start - start_frame
+        edit_offsets.append(edit_offset)
+    return edit_offsets
+
+
+def apply_edits(section_starts, start_frames, end_frames, output_frame_counts):
+    sections = [Section(int(section_start), f"section {index}") for index, section_start in enumerate(section_starts)]
+    Section.apply_edits(sections, start_frames, end_frames, output_frame_counts)
+    return [section.edit_offset for section in sections]
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_removed_segments_match_the_cut_loop(seed):
+    random = np.random.default_rng(seed)
+    frame_count = int(random.integers(2, 5000))
+    start_frames, end_frames = get_random_plan(random, frame_count, int(random.integers(0, 60)))
+    removed = random.random(start_frames.shape[0]) < 0.5
+    # sections starting at segment boundaries, inside segments, and at the ends.
+    section_starts = np.unique(np.concatenate((
+        [0, frame_count], random.choice(start_frames, 5), random.integers(0, frame_count, 10))))
+
+    edit_offsets = apply_edits(section_starts, start_frames, end_frames,
+                               np.where(removed, 0, end_frames - start_frames))
+    assert edit_offsets == get_loop_edit_offsets(section_starts, start_frames, end_frames, removed)
+
+
+@pytest.mark.parametrize('section_start, expected_start', [
+    # before, at the start of, and within the segment sped up 4 times.
+    (50, 50),
+    (100, 100),
+    (140, 110),
+    (199, 124),
+    # after the sped up segment, which plays 25 of its 100 frames, and the removed one.
+    (200, 125),
+    (250, 175),
+    (300, 225),
+    (310, 225),
+    (400, 275),
+])
+def test_sped_up_segments_move_sections_proportionally(section_start, expected_start):
+    start_frames, end_frames = [0, 100, 200, 300, 350], [100, 200, 300, 350, 500]
+    output_frame_counts = [100, 25, 100, 0, 150]
+    edit_offset, = apply_edits([section_start], start_frames, end_frames, output_frame_counts)
+    assert section_start + edit_offset == expected_start
+
+
+def test_compute_frames_consumes_the_edits():
+    sections = [Section(150, "b"), Section(0, "a"), Section(400, "c")]
+    Section.apply_edits(sections, [0, 100, 200, 300, 350], [100, 200, 300, 350, 500], [100, 25, 100, 0, 150])
+    Section.compute_frames(sections, 375)
+    assert [(section.title, section.start_frame, section.end_frame) for section in sections] == \
+        [("a", 0, 112), ("b", 112, 275), ("c", 275, 376)]
@@ -0,0 +1,95 @@
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from server import JobRequestHandler, JobServer
+from utils import io_utils
+
+
+def test_url_job_downloads_its_url(monkeypatch, tmp_path):
+    downloaded_urls = []
+
+    def download_file(url):
+        downloaded_urls.append(url)
+        raise RuntimeError("download stubbed")
+
+    monkeypatch.setattr(io_utils, 'download_file', download_file)
+    job_server = JobServer(workers=1, cache=None, output_root=tmp_path)
+    try:
+        job = job_server.submit({'url': 'https://www.youtube.com/watch?v=test',
+                                 'output_file': str(tmp_path / 'test.mp4')})
+        job.future.result()
+    finally:
+        job_server.shutdown()
+
+    assert downloaded_urls == ['https://www.youtube.com/watch?v=test']
+    assert job.state == 'failed'
+    assert 'download stubbed' in job.result.error
+
+
+@pytest.mark.parametrize('options', [
+    {'input_file': 'a.mp4', 'output_file': 'a_edited.mp4', 'temp_folder': '/'},
+    {'input_file': 'a.mp4', 'output_file': 'a_edited.mp4', 'cache_folder': '/'},
+    {'input_file': 'a.mp4'},
+    {'input_file': '-', 'output_file': 'a_edited.mp4'},
+    {'input_file': 'a.mp4', 'output_file': '/etc/a_edited.mp4'},
+    {'input_file': 'a.mp4', 'output_file': 'a_edited.mp4', 'mapping': '../a.txt'},
+    {'input_file': 'a.mp4', 'output_file': 'a_edited.mp4', 'render_cache_folder': '/tmp'},
+])
+def test_submit_rejects_unsafe_options(tmp_path, monkeypatch, options):
+    # relative outputs are within the output root.
+    monkeypatch.chdir(tmp_path)
+    job_server = JobServer(workers=1, cache=None, output_root=tmp_path)
+    try:
+        with pytest.raises(ValueError):
+            job_server.submit(options)
+    finally:
+        job_server.shutdown()
+    assert not job_server.jobs
+
+
+@pytest.fixture
+def http_server(tmp_path):
+    job_server = JobServer(workers=1, cache=None, output_root=tmp_path)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), JobRequestHandler)
+    server.job_server = job_server
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    job_server.shutdown()
+
+
+def post_job(server, body, headers):
+    connection = http.client.HTTPConnection(*server.server_address)
+    try:
+        connection.request('POST', '/jobs', json.dumps(body), headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_post_requires_json_content_type(http_server):
+    status, body = post_job(http_server, {'input_file': 'a.mp4'}, {'Content-Type': 'text/plain'})
+    assert status == 415
+    assert not http_server.job_server.jobs
+
+
+def test_post_rejects_foreign_origins(http_server):
+    status, body = post_job(http_server, {'input_file': 'a.mp4'},
+                            {'Content-Type': 'application/json', 'Origin': 'https://example.com'})
+    assert status == 403
+    assert not http_server.job_server.jobs
+
+
+def test_post_accepts_local_origins(http_server):
+    # the job itself is invalid, the request gets to the validation of its options.
+    status, body = post_job(http_server, {'input_file': 'a.mp4'},
+                            {'Content-Type': 'application/json; charset=utf-8', 'Origin': 'http://localhost:3000'})
+    assert status == 400
+    assert body['error'] == "output_file is required."
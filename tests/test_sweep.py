@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from editor.sweep import sweep
+
+
+@pytest.mark.parametrize('silent_speed, output_frame_count, cut_count', [
+    # runs of 30 silent frames become 6 frames at speed 5.
+    (5, 100 + 3 * 6, 0),
+    # 30 / 20 is shorter than 2 frames, so they're cut.
+    (20, 100, 3),
+    (99999, 100, 3),
+])
+def test_sped_up_silence_is_counted(silent_speed, output_frame_count, cut_count):
+    # 4 loud runs of 25 frames between 3 silent runs of 30 frames.
+    frame_volumes = np.zeros(190)
+    for start in [0, 55, 110, 165]:
+        frame_volumes[start:start + 25] = 1
+    result, = sweep(frame_volumes, [0.5], [0], 30, new_speed=[silent_speed, 1])
+    assert result.kept_frame_count == 100
+    assert result.kept_duration == pytest.approx(output_frame_count / 30)
+    assert result.kept_ratio == pytest.approx(output_frame_count / 190)
+    assert result.cut_count == cut_count
+
+
+def test_silence_is_cut_by_default():
+    frame_volumes = np.array([1, 1, 1, 0, 0, 0, 1, 1], dtype=np.float64)
+    result, = sweep(frame_volumes, [0.5], [0], 10)
+    assert result.kept_duration == pytest.approx(0.5)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from audiotsm import phasevocoder
+from audiotsm.io.array import ArrayReader, ArrayWriter
+
+from editor.time_stretch import PhaseVocoderStretcher, TimeStretcher
+
+
+def stretch_fresh(audio_chunk, speed):
+    channels = audio_chunk.shape[1]
+    writer = ArrayWriter(channels)
+    phasevocoder(channels, speed=speed).run(ArrayReader(np.transpose(audio_chunk)), writer)
+    return np.transpose(writer.data)
+
+
+@pytest.mark.parametrize('speed', [1.5, 5.0, 8.0])
+def test_reused_stretcher_matches_fresh_phasevocoder(speed):
+    random = np.random.default_rng(0)
+    stretcher = PhaseVocoderStretcher()
+    for sample_count in [44648, 45196, 1000, 44100]:
+        audio_chunk = random.uniform(-1, 1, (sample_count, 2)).astype(np.float32)
+        np.testing.assert_array_equal(stretcher.stretch(audio_chunk, speed), stretch_fresh(audio_chunk, speed))
+
+
+def test_time_stretcher_is_abstract():
+    with pytest.raises(TypeError):
+        TimeStretcher()
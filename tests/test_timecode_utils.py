@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+from timecode import Timecode
+
+from utils.timecode_utils import format_frames
+
+
+@pytest.mark.parametrize('frame_rate', [23.976, 24, 25, 29.97, 30, 50, 59.94, 60, '30000/1001', '24000/1001'])
+def test_format_frames_matches_timecode(frame_rate):
+    random = np.random.default_rng(0)
+    # the minute and ten minute boundaries, where drop frame timecodes skip frame numbers.
+    frames = np.concatenate((np.arange(0, 4000), np.arange(17970, 18010), np.arange(107880, 107900),
+                             random.integers(0, 5000000, 2000)))
+    expected = [str(Timecode(frame_rate, frames=frame + 1)) for frame in frames.tolist()]
+    assert format_frames(frames, frame_rate).tolist() == expected